@@ -0,0 +1,161 @@
+# ai_client.py - Shared Groq clients, client-side rate limiting and retries
+import os
+import random
+import threading
+import time
+
+# Groq account limits (0 disables the corresponding bucket)
+GROQ_REQUESTS_PER_MINUTE = int(os.environ.get('GROQ_REQUESTS_PER_MINUTE', '30'))
+GROQ_TOKENS_PER_MINUTE = int(os.environ.get('GROQ_TOKENS_PER_MINUTE', '12000'))
+
+# Retry policy for 429 / 5xx / timeouts
+MAX_ATTEMPTS = int(os.environ.get('GROQ_MAX_ATTEMPTS', '5'))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_ERROR_NAMES = {'APITimeoutError', 'APIConnectionError', 'TimeoutError'}
+
+# Longest a request waits for rate limiter capacity before giving up
+MAX_LIMITER_WAIT = 120.0
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    # Refills continuously at capacity per minute. take() may drive the level
+    # negative (a completion used more tokens than reserved); later callers
+    # then wait until the debt is paid back.
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._rate = self.capacity / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    # Seconds until `amount` can be taken (amount is capped at the capacity)
+    def wait_time(self, amount, now):
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self._rate) if self._rate else 0.0
+
+    # A negative amount gives tokens back (never beyond the capacity)
+    def take(self, amount):
+        self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    # Requests-per-minute and tokens-per-minute buckets shared by every thread using one API key
+    def __init__(self, requests_per_minute=GROQ_REQUESTS_PER_MINUTE, tokens_per_minute=GROQ_TOKENS_PER_MINUTE):
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    # Block until a request that may use up to `tokens` (prompt plus the
+    # completion's max_tokens) fits in both buckets, and reserve them
+    def acquire(self, tokens, max_wait=MAX_LIMITER_WAIT, sleep=time.sleep):
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(
+                    self._requests.wait_time(1, now) if self._requests else 0.0,
+                    self._tokens.wait_time(tokens, now) if self._tokens else 0.0,
+                )
+                if wait == 0.0:
+                    if self._requests:
+                        self._requests.take(1)
+                    if self._tokens:
+                        self._tokens.take(tokens)
+                    return
+            if now + wait > deadline:
+                raise RateLimitExceeded("Groq rate limit reached, please try again in a minute")
+            sleep(wait)
+
+    # Settle a reservation once the real usage is known: refund what wasn't
+    # used (or charge the excess). Unknown usage (0) keeps the whole reservation.
+    def settle(self, reserved, actual):
+        if self._tokens and actual:
+            with self._lock:
+                self._tokens.take(actual - reserved)
+
+    # Give back the tokens of a request that failed without producing a completion
+    def release(self, reserved):
+        if self._tokens and reserved:
+            with self._lock:
+                self._tokens.take(-reserved)
+
+
+_clients = {}
+_limiters = {}
+_lock = threading.Lock()
+
+
+# One Groq client per API key for the whole process; the SDK's own retries are
+# disabled because call_with_retries handles them with the rate limiter in mind
+def get_client(api_key):
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from groq import Groq
+            client = _clients[api_key] = Groq(api_key=api_key, max_retries=0)
+        return client
+
+
+def get_limiter(api_key):
+    with _lock:
+        limiter = _limiters.get(api_key)
+        if limiter is None:
+            limiter = _limiters[api_key] = RateLimiter()
+        return limiter
+
+
+def _status_code(error):
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status
+
+
+def is_retryable(error):
+    if _status_code(error) in RETRY_STATUSES:
+        return True
+    return any(cls.__name__ in RETRY_ERROR_NAMES for cls in type(error).__mro__)
+
+
+# Seconds requested by a Retry-After header, if the error carries one
+def retry_after(error):
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    # Exponential backoff with jitter so clients that failed together don't retry together
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+# Call fn() through the limiter, retrying retryable errors with jittered exponential backoff
+def call_with_retries(fn, limiter=None, estimated_tokens=0, attempts=MAX_ATTEMPTS, sleep=time.sleep):
+    for attempt in range(attempts):
+        if limiter:
+            limiter.acquire(estimated_tokens, sleep=sleep)
+        try:
+            return fn()
+        except Exception as e:
+            if limiter:
+                limiter.release(estimated_tokens)
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            sleep(max(backoff_delay(attempt), retry_after(e) or 0.0))
+
+
+# Rough prompt size in tokens (~4 characters per token)
+def estimate_tokens(*texts):
+    return sum(len(text) for text in texts) // 4 + 1
@@ -1,31 +1,52 @@
 # app.py - Main Streamlit Application
 import streamlit as st
-import sqlite3
 import os
-import subprocess
-import threading
 import time
-from groq import Groq
 import json
 from datetime import datetime
-import signal
-import sys
 from threading import Timer
-import time
 import webbrowser
 
 # Authentication helpers
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 import jwt
 
+import ai_client
+import code_view
+import exporter
+import generation_cache
+import importer
+import jobs
+import launcher
+import migrations
+import project_files
+import project_logs
+import resource_limits
+import run_modes
+import supervisor
+import versions
+from stats import get_stats
+from repository import (
+    create_user, get_user_by_email, save_project, get_project,
+    list_projects, count_projects, search_projects, has_fts, fts_query,
+    delete_project, update_project, save_generation_history, clear_all_data,
+    get_run_settings, update_run_settings, get_resource_limits, update_resource_limits,
+    get_last_limit_event, get_blob_usage, restore_project_version,
+)
+
 # Secret for JWT (override with env var in production)
 SECRET_KEY = os.environ.get('SECRET_KEY', 'dev_secret_key')
 
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "<PUT_YOUR_GROQ_API_KEY_HERE>")  # Set via env var or replace the placeholder (do NOT commit secrets)
 
-if 'running_projects' not in st.session_state:
-    st.session_state.running_projects = {}  # {project_id: {'port': port, 'process': process}}
+# Number of project expanders rendered per page in "My Projects"
+PROJECTS_PAGE_SIZE = 20
+
+# Seconds between reruns while a generation job is in progress
+JOB_POLL_INTERVAL = 1.0
 
+# Bytes of output shown in a project's log panel
+LOG_PANEL_BYTES = 16 * 1024
 
 # Initialize Groq client
 def init_groq():
@@ -41,108 +62,17 @@ def init_groq():
         return None
 
     try:
-        return Groq(api_key=api_key)
+        # Shared by every session using this key, along with its rate limiter
+        return ai_client.get_client(api_key)
     except Exception as e:
         st.warning(f"Failed to initialize Groq client: {e}")
         return None
 
-# Database initialization
+# Database initialization (schema migrations run once per process)
 def init_database():
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    
-    # Projects table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            prompt TEXT NOT NULL,
-            backend_code TEXT,
-            frontend_code TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status TEXT DEFAULT 'created',
-            port INTEGER,
-            framework TEXT DEFAULT 'react'
-        )
-    ''')
-    
-    # Project runs table for tracking deployments
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS project_runs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER,
-            pid INTEGER,
-            port INTEGER,
-            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            stopped_at TIMESTAMP,
-            status TEXT DEFAULT 'running',
-            FOREIGN KEY (project_id) REFERENCES projects (id)
-        )
-    ''')
-    
-    # Template history for learning from past generations
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS generation_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER,
-            prompt TEXT,
-            response TEXT,
-            tokens_used INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-    # Ensure users table exists
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-    # Ensure projects table has owner_id column for multi-user support
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    try:
-        cursor.execute("ALTER TABLE projects ADD COLUMN owner_id INTEGER")
-    except Exception:
-        # Column probably exists or table missing - ignore
-        pass
-    conn.commit()
-    conn.close()
-
-def create_user(email, password):
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    pw_hash = generate_password_hash(password)
-    try:
-        cursor.execute('INSERT INTO users (email, password_hash) VALUES (?, ?)', (email, pw_hash))
-        conn.commit()
-        user_id = cursor.lastrowid
-    except sqlite3.IntegrityError:
-        user_id = None
-    conn.close()
-    return user_id
-
-def get_user_by_email(email):
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, email, password_hash FROM users WHERE email = ?', (email,))
-    user = cursor.fetchone()
-    conn.close()
-    return user
+    migrations.ensure_schema()
+    # The supervisor reconciles project_runs/projects.status with live PIDs when created
+    supervisor.get_supervisor()
 
 def authenticate_user(email, password):
     user = get_user_by_email(email)
@@ -169,438 +99,72 @@ def verify_jwt_token(token):
     except Exception:
         return None
 
-# Generate project code using Groq AI
-def generate_project_code(client, prompt, framework='react'):
-    system_prompt = f"""You are an expert full-stack developer. Generate complete, production-ready code for the requested application.
-
-Requirements:
-1. Backend: Flask Python - single file (app.py)
-   - Include all necessary routes with TODO comments for database integration
-   - Add CORS support for frontend
-   - Include error handling and logging
-   - Add placeholder routes for CRUD operations, with placeholder data
-   - Use proper Flask best practices
-   - It is only provides rest api endpoints
-
-2. Frontend: Single index.html file with vanilla js
-- Tailwind CSS has to be used, through script tag
-- can use ajax if needed
-- Responsive design
-- Modern UI components
-- API integration ready
-- Include loading states and error handling
-- USE RELATIVE URLs for API calls (e.g., '/todos' not 'http://localhost:5000/todos')
-- Add this at top of scripts: const API_BASE_URL = window.location.origin;
-- Use fetch(`${{API_BASE_URL}}/endpoint`) for all API calls
-
-3. Return ONLY valid JSON with this structure:
-{{
-    "project_name": "descriptive-project-name",
-    "description": "brief description",
-    "backend": "complete Flask app.py code",
-    "frontend": "complete index.html code",
-    "setup_instructions": "how to run",
-    "features": ["feature1", "feature2"]
-}}
-
-Make the code production-ready, well-commented, and easy to extend."""
-
-    # If no client is provided (no API key), use a deterministic local stub so UI can be tested offline
-    if client is None:
-        # Create a simple stubbed project
-        stub_backend = '''from flask import Flask, jsonify
-app = Flask(__name__)
-
-@app.route('/health')
-def health():
-    return jsonify({'status':'ok'})
-
-if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000)
-'''
-        stub_frontend = '''<!doctype html>
-<html>
-<head><meta charset="utf-8"><title>Stub App</title></head>
-<body>
-<h1>Stub Project</h1>
-<p>This is an offline stub project generated for testing.</p>
-</body>
-</html>'''
-        result = {
-            'project_name': 'stub-project',
-            'description': 'Offline stub project for testing (no AI key)',
-            'backend': stub_backend,
-            'frontend': stub_frontend,
-            'setup_instructions': 'Run `python app.py` in the project folder',
-            'features': ['stub-backend', 'stub-frontend']
-        }
-        return result, 0
-
-    try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=7000
-        )
-
-        response_text = chat_completion.choices[0].message.content
-        cleaned = response_text.strip()
-        try:
-            result = json.loads(cleaned)
-            tokens_used = getattr(getattr(chat_completion, "usage", None), "total_tokens", 0)
-            return result, tokens_used
-        except json.JSONDecodeError:
-            pass
-
-        import re
-        
-        # Find the main JSON structure
-        match = re.search(r'\{[\s\S]*\}', cleaned)
-        if match:
-            cleaned = match.group(0)
-        
-        
-        # Method 2: Manual extraction (more reliable for code fields)
-        try:
-            # Extract fields manually with regex
-            project_name_match = re.search(r'"project_name"\s*:\s*"([^"]+)"', cleaned)
-            description_match = re.search(r'"description"\s*:\s*"([^"]+)"', cleaned)
-            
-            backend_match = re.search(r'"backend"\s*:\s*"((?:[^"\\]|\\.)*)"\s*,', cleaned, re.DOTALL)
-            frontend_match = re.search(r'"frontend"\s*:\s*"((?:[^"\\]|\\.)*)"\s*,', cleaned, re.DOTALL)
-            setup_match = re.search(r'"setup_instructions"\s*:\s*"([^"]*)"', cleaned)
-            features_match = re.search(r'"features"\s*:\s*\[(.*?)\]', cleaned, re.DOTALL)
-            
-            # Build result manually
-            result = {}
-            
-            if project_name_match:
-                result["project_name"] = project_name_match.group(1)
-            if description_match:
-                result["description"] = description_match.group(1)
-            if backend_match:
-                # Decode escape sequences
-                backend_raw = backend_match.group(1)
-                backend_code = backend_raw.replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"')
-                result["backend"] = backend_code
-            if frontend_match:
-                frontend_raw = frontend_match.group(1)
-                frontend_code = frontend_raw.replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"')
-                result["frontend"] = frontend_code
-            if setup_match:
-                result["setup_instructions"] = setup_match.group(1)
-            if features_match:
-                features_str = features_match.group(1)
-                features = re.findall(r'"([^"]+)"', features_str)
-                result["features"] = features
-            
-            if len(result) >= 4:  # At least name, description, backend, frontend
-                tokens_used = getattr(getattr(chat_completion, "usage", None), "total_tokens", 0)
-                st.success("✅ Successfully extracted project data using manual parsing")
-                return result, tokens_used
-        except Exception as manual_error:
-            st.error(f"Manual extraction failed: {manual_error}")
-        
-        # If all else fails, show error
-        st.error("❌ Failed to parse AI response after multiple attempts")
-        with st.expander("🔍 View Raw Response (first 2000 chars)"):
-            st.code(response_text[:2000], language="text")
-        return None, 0
-
-    except Exception as e:
-        st.error(f"❌ Error generating code: {type(e).__name__}: {e}")
-        if "response_text" in locals():
-            with st.expander("🔍 View Response"):
-                st.code(response_text[:2000], language="text")
-        return None, 0
-
-# Save project to database
-def save_project(name, description, prompt, backend, frontend, framework='react', owner_id=None):
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    if owner_id:
-        cursor.execute('''
-            INSERT INTO projects (name, description, prompt, backend_code, frontend_code, framework, owner_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (name, description, prompt, backend, frontend, framework, owner_id))
-    else:
-        cursor.execute('''
-            INSERT INTO projects (name, description, prompt, backend_code, frontend_code, framework)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (name, description, prompt, backend, frontend, framework))
-    project_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return project_id
-
-# Get all projects
-def get_all_projects():
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM projects ORDER BY created_at DESC')
-    projects = cursor.fetchall()
-    conn.close()
-    return projects
-
-# Get project by ID
-def get_project(project_id):
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM projects WHERE id = ?', (project_id,))
-    project = cursor.fetchone()
-    conn.close()
-    return project
-
-# Delete project
-def delete_project(project_id):
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
-    cursor.execute('DELETE FROM project_runs WHERE project_id = ?', (project_id,))
-    cursor.execute('DELETE FROM generation_history WHERE project_id = ?', (project_id,))
-    conn.commit()
-    conn.close()
-
-# Update project
-def update_project(project_id, backend_code, frontend_code):
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE projects 
-        SET backend_code = ?, frontend_code = ?, last_modified = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (backend_code, frontend_code, project_id))
-    conn.commit()
-    conn.close()
-
-# Find available port
-def find_available_port(start_port=5000):
-    import socket
-    port = start_port
-    while port < 65535:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            if s.connect_ex(('localhost', port)) != 0:
-                return port
-        port += 1
-    return None
+# Partial fields of a generation that is still streaming
+def show_generation_progress(fields):
+    if 'project_name' in fields:
+        st.markdown(f"## {fields['project_name']}")
+    if 'description' in fields:
+        st.markdown(f"*{fields['description']}*")
+    if 'backend' in fields or 'frontend' in fields:
+        backend_tab, frontend_tab = st.tabs(["Backend (app.py)", "Frontend (index.html)"])
+        with backend_tab:
+            if 'backend' in fields:
+                st.code(fields['backend'], language='python')
+            else:
+                st.caption("Waiting for backend code...")
+        with frontend_tab:
+            if 'frontend' in fields:
+                st.code(fields['frontend'], language='html')
+            else:
+                st.caption("Waiting for frontend code...")
+
+# Make a finished generation job the current result on the Create Project page
+def load_job_result(job):
+    if job['cached']:
+        st.info("♻️ Served from the generation cache (no tokens used)")
+    if job['truncated']:
+        st.warning("⚠️ The AI response was cut off; the last field may be incomplete. Review the code before running it.")
+    st.session_state.current_result = job['result']
+    st.session_state.current_tokens = job['tokens_used'] or 0
+    st.session_state.current_cache_key = job['cache_key']
+    st.session_state.current_prompt = job['prompt']
+    st.session_state.current_framework = job['framework']
+    st.session_state.project_generated = True
+    st.session_state.project_saved = False  # Reset saved status
+    st.session_state.saved_project_id = None
 
-# Run project
 # Run project
 def run_project(project_id):
-    project = get_project(project_id)
-    if not project:
-        return None, "Project not found"
+    port, error = launcher.start(project_id)
+    if error:
+        return None, error
     
-    # Create project directory
-    project_dir = f"./projects/project_{project_id}"
-    os.makedirs(project_dir, exist_ok=True)
-    
-    # Find available port
-    port = find_available_port()
-    if not port:
-        return None, "No available ports"
-    
-    # Modify Flask code to use specific port and serve index.html
-    backend_code = project[4]
-    
-    # Add route to serve index.html if not present
-    if "send_from_directory" not in backend_code:
-        if "from flask import" in backend_code:
-            backend_code = backend_code.replace(
-                "from flask import",
-                "from flask import send_from_directory,"
-            )
-        else:
-            backend_code = "from flask import send_from_directory\n" + backend_code
-    
-    # Add index route
-    if "@app.route('/')" not in backend_code:
-        index_route = """
-@app.route('/')
-def index():
-    return send_from_directory('.', 'index.html')
-"""
-        # Insert before if __name__
-        if "if __name__" in backend_code:
-            backend_code = backend_code.replace("if __name__", index_route + "\nif __name__")
-        else:
-            backend_code += "\n" + index_route
-    
-    # Modify app.run
-    if "app.run(" in backend_code:
-        backend_code = backend_code.replace("app.run(debug=True)", f"app.run(debug=True, port={port}, host='127.0.0.1')")
-        backend_code = backend_code.replace("app.run()", f"app.run(debug=True, port={port}, host='127.0.0.1')")
-    else:
-        backend_code += f"\n\nif __name__ == '__main__':\n    app.run(debug=True, port={port}, host='127.0.0.1')"
-    
-    # Write backend code
-    backend_path = os.path.join(project_dir, "app.py")
-    with open(backend_path, 'w', encoding='utf-8') as f:
-        f.write(backend_code)
-    
-    # Write frontend code
-    frontend_code = project[5]
-    frontend_path = os.path.join(project_dir, "index.html")
-    frontend_code = frontend_code.replace('localhost:5000', f'localhost:{port}')
-    frontend_code = frontend_code.replace('127.0.0.1:5000', f'127.0.0.1:{port}')
-    frontend_code = frontend_code.replace("localhost:5000", f"localhost:{port}")  # Handle both quote types
-    frontend_code = frontend_code.replace("127.0.0.1:5000", f"127.0.0.1:{port}")
+    # Open browser automatically after 1 second
+    Timer(1.0, webbrowser.open, args=(project_url(project_id, port),)).start()
+    return port, None
 
-    # Also handle relative URLs like '/todos' -> need to update API base
-    # Add base URL replacement for fetch calls
-    if "fetch('/" in frontend_code or 'fetch("/' in frontend_code:
-        # Inject port info at the top of script tags
-        if "<script" in frontend_code:
-            frontend_code = frontend_code.replace(
-                "<script",
-                f"<script>\nconst API_BASE_URL = 'http://localhost:{port}';\n</script>\n<script",
-                1
-            )
-            # Update fetch calls to use API_BASE_URL
-            frontend_code = frontend_code.replace("fetch('/", "fetch(`${API_BASE_URL}/")
-            frontend_code = frontend_code.replace('fetch("/', 'fetch(`${API_BASE_URL}/')
+# URL of a running project; shared-host projects are mounted under /p/<id>/
+def project_url(project_id, port):
+    return launcher.url(project_id, port)
 
-    with open(frontend_path, 'w', encoding='utf-8') as f:
-        f.write(frontend_code)
-
-    # Write a Dockerfile for the generated project
-    dockerfile_path = os.path.join(project_dir, 'Dockerfile')
-    try:
-        with open(dockerfile_path, 'w', encoding='utf-8') as df:
-            df.write(generate_dockerfile(get_project(project_id)))
-    except Exception:
-        pass
-    
-    # Start Flask server
+# Stop project
+def stop_project(project_id):
     try:
-        process = subprocess.Popen(
-            [sys.executable, "app.py"],
-            cwd=project_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1
-        )
-        
-        # Wait a bit and check if process is still running
-        time.sleep(2)
-        poll_result = process.poll()
-        
-        if poll_result is not None:
-            # Process died, get error
-            stderr_output = process.stderr.read() if process.stderr else ""
-            return None, f"Flask failed to start: {stderr_output[:500]}"
-        
-        # Save run info
-        conn = sqlite3.connect('project_builder.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO project_runs (project_id, pid, port, status)
-            VALUES (?, ?, ?, 'running')
-        ''', (project_id, process.pid, port))
-        
-        # Update project port and status
-        cursor.execute('UPDATE projects SET port = ?, status = ? WHERE id = ?', (port, 'running', project_id))
-        conn.commit()
-        conn.close()
-        
-        # Store in session state for quick access
-        if 'running_projects' not in st.session_state:
-            st.session_state.running_projects = {}
-        st.session_state.running_projects[project_id] = {
-            'pid': process.pid,
-            'port': port,
-            'process': process
-        }
-        
-        # Open browser automatically after 1 second
-        def open_browser():
-            webbrowser.open(f'http://127.0.0.1:{port}')
-        
-        Timer(1.0, open_browser).start()
-        
-        return port, None
+        return launcher.stop(project_id)
     except Exception as e:
-        return None, f"Error starting Flask: {str(e)}"
+        st.error(f"Error stopping project: {e}")
+        return False
 
-# Stop project
-def stop_project(project_id):
-    # Try session state first (faster)
-    if 'running_projects' in st.session_state and project_id in st.session_state.running_projects:
-        try:
-            proj_info = st.session_state.running_projects[project_id]
-            pid = proj_info['pid']
-            
-            # Try graceful termination
-            try:
-                os.kill(pid, signal.SIGTERM)
-            except:
-                # Force kill on Windows
-                if sys.platform == 'win32':
-                    subprocess.run(['taskkill', '/F', '/PID', str(pid)], capture_output=True)
-                else:
-                    os.kill(pid, signal.SIGKILL)
-            
-            # Remove from session state
-            del st.session_state.running_projects[project_id]
-            
-            # Update database
-            conn = sqlite3.connect('project_builder.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE project_runs 
-                SET status = 'stopped', stopped_at = CURRENT_TIMESTAMP
-                WHERE pid = ?
-            ''', (pid,))
-            cursor.execute('UPDATE projects SET status = ? WHERE id = ?', ('stopped', project_id))
-            conn.commit()
-            conn.close()
-            
-            return True
-        except Exception as e:
-            st.error(f"Error stopping from session: {e}")
-    
-    # Fallback to database lookup
-    conn = sqlite3.connect('project_builder.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT pid FROM project_runs 
-        WHERE project_id = ? AND status = 'running'
-        ORDER BY started_at DESC LIMIT 1
-    ''', (project_id,))
-    result = cursor.fetchone()
-    
-    if result:
-        pid = result[0]
-        try:
-            # Try graceful termination
-            try:
-                os.kill(pid, signal.SIGTERM)
-            except:
-                # Force kill on Windows
-                if sys.platform == 'win32':
-                    subprocess.run(['taskkill', '/F', '/PID', str(pid)], capture_output=True)
-                else:
-                    os.kill(pid, signal.SIGKILL)
-            
-            cursor.execute('''
-                UPDATE project_runs 
-                SET status = 'stopped', stopped_at = CURRENT_TIMESTAMP
-                WHERE pid = ?
-            ''', (pid,))
-            cursor.execute('UPDATE projects SET status = ? WHERE id = ?', ('stopped', project_id))
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            conn.close()
-            return False
-    conn.close()
-    return False
+# Start or stop the selected projects together; returns {project_id: (port, error)} / {project_id: stopped}
+def run_projects(project_ids):
+    return launcher.start_many(project_ids)
+
+def stop_projects(project_ids):
+    try:
+        return launcher.stop_many(project_ids)
+    except Exception as e:
+        st.error(f"Error stopping projects: {e}")
+        return {}
 
 # Export project
 def export_project(project_id):
@@ -622,34 +186,30 @@ def export_project(project_id):
     return json.dumps(export_data, indent=2)
 
 def generate_dockerfile(project):
-    # project is a row from the DB — indices: id, name, description, prompt, backend, frontend, created_at,...
-    name = project[1].lower().replace(' ', '_')
-    dockerfile = f'''# Simple Dockerfile for Flask app
-FROM python:3.12-slim
-WORKDIR /app
-COPY . /app
-RUN pip install --no-cache-dir flask flask_cors
-ENV PYTHONUNBUFFERED=1
-EXPOSE 5000
-CMD ["python","app.py"]
-'''
-    return dockerfile
-
-# Import project
-def import_project(json_data):
-    try:
-        data = json.loads(json_data)
-        project_id = save_project(
-            data["name"],
-            data["description"],
-            data.get("prompt", "Imported project"),
-            data["backend"],
-            data["frontend"],
-            data.get("framework", "react")
-        )
-        return project_id
-    except Exception as e:
-        return None
+    return project_files.dockerfile(project)
+
+# Export every project for st.download_button; returns (data, counts). The
+# database is read in batches into a spooled temp file, but download_button
+# only takes str, bytes or real file objects (not SpooledTemporaryFile) and
+# buffers the whole payload in memory anyway, so the export is handed over as bytes.
+def export_database(fmt, include_history=False, include_runs=False):
+    export_file, counts = exporter.export_to_tempfile(fmt, include_history, include_runs)
+    with export_file:
+        return export_file.read(), counts
+
+# Import a project export, a JSONL/JSON-array export or a ZIP export in batches
+def import_projects(uploaded_file, owner_id=None):
+    progress = st.progress(0.0, text="Importing...")
+    size = max(1, getattr(uploaded_file, 'size', 0))
+    
+    def report(records_done):
+        # Uploaded files are in memory, so the read position tracks progress
+        position = uploaded_file.tell() if hasattr(uploaded_file, 'tell') else size
+        progress.progress(min(1.0, position / size), text=f"Imported {records_done} record(s)...")
+    
+    result = importer.import_file(uploaded_file, default_owner_id=owner_id, progress=report)
+    progress.progress(1.0, text="Import finished")
+    return result
 
 # Streamlit UI
 def main():
@@ -754,19 +314,21 @@ def main():
         if 'saved_project_id' not in st.session_state:
             st.session_state.saved_project_id = None
         # Statistics
-        projects = get_all_projects()
+        counts = get_stats()
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Projects", len(projects))
+            st.metric("Total Projects", counts['projects'])
         with col2:
-            running = sum(1 for p in projects if p[8] == 'running')
-            st.metric("Running Projects", running)
+            st.metric("Running Projects", counts['running'])
         with col3:
-            recent = sum(1 for p in projects if (datetime.now() - datetime.fromisoformat(p[6])).days < 7)
-            st.metric("Created This Week", recent)
+            st.metric("Created This Week", counts['created_this_week'])
     
     elif menu == "➕ Create Project":
         st.title("Create New Project")
+
+        if st.session_state.get('user') and jobs.DAILY_TOKEN_BUDGET:
+            used = jobs.tokens_used_today(st.session_state['user']['id'])
+            st.caption(f"Tokens used today: {used:,} / {jobs.DAILY_TOKEN_BUDGET:,}")
         
         with st.form("project_form"):
             prompt = st.text_area(
@@ -791,6 +353,16 @@ def main():
                 include_db = st.checkbox("Include database schema comments")
                 include_tests = st.checkbox("Include test examples")
             
+            bypass_cache = st.checkbox(
+                "Bypass generation cache",
+                help="Always ask the model, even if this exact request was generated before"
+            )
+            stream_output = st.checkbox(
+                "Stream output",
+                value=True,
+                help="Show the project name, description and code as soon as each is generated"
+            )
+            
             submit = st.form_submit_button("🚀 Generate Project", use_container_width=True)
         
 
@@ -800,29 +372,59 @@ def main():
             if st.session_state.get('user') is None:
                 st.error("You must be signed in to generate projects.")
             else:
-                with st.spinner("🤖 AI is generating your project..."):
-                    # Enhance prompt with advanced options
-                    enhanced_prompt = prompt
-                    if advanced:
-                        if include_auth:
-                            enhanced_prompt += "\n- Include authentication route placeholders (login, register, logout)"
-                        if include_db:
-                            enhanced_prompt += "\n- Add detailed database schema as comments"
-                        if include_tests:
-                            enhanced_prompt += "\n- Include example unit tests as comments"
-
-                    result, tokens = generate_project_code(client, enhanced_prompt, framework)
-
-                    if result:
-                        # Store in session state instead of local variables
-                        st.session_state.current_result = result
-                        st.session_state.current_tokens = tokens
-                        st.session_state.project_generated = True
-                        st.session_state.project_saved = False  # Reset saved status
-                        st.session_state.saved_project_id = None
+                # Enhance prompt with advanced options
+                enhanced_prompt = prompt
+                if advanced:
+                    if include_auth:
+                        enhanced_prompt += "\n- Include authentication route placeholders (login, register, logout)"
+                    if include_db:
+                        enhanced_prompt += "\n- Add detailed database schema as comments"
+                    if include_tests:
+                        enhanced_prompt += "\n- Include example unit tests as comments"
+
+                # Generation runs on the background job queue; this run only polls it
+                job_id, error = jobs.get_queue().submit(
+                    client, prompt, enhanced_prompt, framework,
+                    owner_id=st.session_state['user']['id'],
+                    use_cache=not bypass_cache,
+                    stream=stream_output
+                )
+                if error:
+                    st.error(error)
+                else:
+                    st.session_state.pending_job_id = job_id
+
+        # Pick up the job started from this session once it finishes
+        pending_job_id = st.session_state.get('pending_job_id')
+        if pending_job_id:
+            job = jobs.get_job(pending_job_id)
+            if job is None or job['status'] == 'failed':
+                st.error(f"❌ {job['error'] if job else 'Generation job not found'}")
+                st.session_state.pending_job_id = None
+            elif job['status'] == 'done':
+                load_job_result(job)
+                st.session_state.pending_job_id = None
+            else:
+                st.info(f"🤖 AI is generating your project... ({job['status']})")
+                show_generation_progress(jobs.get_queue().progress(pending_job_id))
+
+        # Recent generations, including ones running concurrently
+        user_jobs = jobs.list_jobs(st.session_state['user']['id']) if st.session_state.get('user') else []
+        if user_jobs:
+            with st.expander("🗂️ Recent generations", expanded=False):
+                for job in user_jobs:
+                    col1, col2 = st.columns([4, 1])
+                    with col1:
+                        label = job['prompt'] if len(job['prompt']) <= 80 else job['prompt'][:77] + '...'
+                        st.markdown(f"**#{job['id']}** {label} — {job['status']}")
+                        if job['error']:
+                            st.caption(job['error'])
+                    with col2:
+                        if job['status'] == 'done' and st.button("Open", key=f"open_job_{job['id']}"):
+                            load_job_result(jobs.get_job(job['id']))
 
         # Display generated project if it exists in session state
-        if st.session_state.project_generated and st.session_state.current_result:
+        if st.session_state.get('project_generated') and st.session_state.get('current_result'):
             result = st.session_state.current_result
             tokens = st.session_state.current_tokens
 
@@ -856,25 +458,22 @@ def main():
                     owner_id = None
                     if st.session_state.get('user'):
                         owner_id = st.session_state['user']['id']
+                    project_prompt = st.session_state.get('current_prompt') or prompt
                     project_id = save_project(
                         result['project_name'],
                         result['description'],
-                        prompt,
+                        project_prompt,
                         result['backend'],
                         result['frontend'],
-                        framework,
+                        st.session_state.get('current_framework') or framework,
                         owner_id=owner_id
                     )
                     
                     # Save generation history
-                    conn = sqlite3.connect('project_builder.db')
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        INSERT INTO generation_history (project_id, prompt, response, tokens_used)
-                        VALUES (?, ?, ?, ?)
-                    """, (project_id, prompt, json.dumps(result), tokens))
-                    conn.commit()
-                    conn.close()
+                    save_generation_history(
+                        project_id, project_prompt, json.dumps(result), tokens,
+                        cache_key=st.session_state.get('current_cache_key')
+                    )
                     
                     # Update session state
                     st.session_state.project_saved = True
@@ -890,53 +489,212 @@ def main():
                 if st.button("▶️ Run Now", key="run_btn"):
                     port, error = run_project(st.session_state.saved_project_id)
                     if port:
-                        st.success(f"🎉 Project running at: http://localhost:{port}")
+                        st.success(f"🎉 Project running at: {project_url(st.session_state.saved_project_id, port)}")
                     else:
                         st.error(f"Failed to run: {error}")
         
+        # Poll while a generation from this session is still in progress
+        if st.session_state.get('pending_job_id'):
+            time.sleep(JOB_POLL_INTERVAL)
+            st.rerun()
+        
     elif menu == "📁 My Projects":
         st.title("My Projects")
         
-        projects = get_all_projects()
+        owner_id = st.session_state['user']['id'] if st.session_state.get('user') else None
         
-        if not projects:
+        if count_projects(owner_id) == 0:
             st.info("No projects yet. Create your first project!")
             return
         
         # Search and filter
         col1, col2, col3 = st.columns([2, 1, 1])
         with col1:
-            search = st.text_input("🔍 Search projects", placeholder="Search by name or description")
+            search = st.text_input("🔍 Search projects", placeholder="Search names, descriptions, prompts and code")
         with col2:
             filter_status = st.selectbox("Status", ["All", "Running", "Stopped"])
         with col3:
-            sort_by = st.selectbox("Sort by", ["Recent", "Name", "Oldest"])
+            sort_by = st.selectbox("Sort by", ["Recent", "Name", "Oldest", "Relevance"])
+        
+        # Filtering, sorting and paging happen in SQL; only summary columns are loaded
+        status_filter = None if filter_status == "All" else filter_status.lower()
+        total = count_projects(owner_id, search, status_filter)
+        page_count = max(1, -(-total // PROJECTS_PAGE_SIZE))
+        page = 1
+        if page_count > 1:
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+        st.caption(f"{total} project(s)")
         
-        # Filter projects
-        filtered_projects = projects
-        if search:
-            filtered_projects = [p for p in filtered_projects if search.lower() in p[1].lower() or search.lower() in (p[2] or '').lower()]
+        sort_key = sort_by.lower()
+        offset = (page - 1) * PROJECTS_PAGE_SIZE
+        if search and has_fts() and fts_query(search):
+            # Full-text search also returns a highlighted snippet per project
+            filtered_projects = search_projects(
+                search, owner_id, status=status_filter, sort=sort_key,
+                limit=PROJECTS_PAGE_SIZE, offset=offset
+            )
+        else:
+            filtered_projects = [
+                (*row, None) for row in list_projects(
+                    owner_id,
+                    search=search,
+                    status=status_filter,
+                    sort=sort_key if sort_key != 'relevance' else 'recent',
+                    limit=PROJECTS_PAGE_SIZE,
+                    offset=offset
+                )
+            ]
         
+        # Bulk actions on projects of this page; they start (or stop) in parallel
+        project_names = {p[0]: p[1] for p in filtered_projects}
+        selected = st.multiselect(
+            "Select projects", list(project_names),
+            format_func=lambda pid: f"{project_names[pid]} (ID: {pid})",
+            key=f"bulk_select_{page}"
+        )
+        # Both bulk actions rerun so statuses and ports refresh; their outcome is shown after the rerun
+        bulk_report = st.session_state.pop('bulk_report', None)
+        if bulk_report:
+            summary, errors = bulk_report
+            st.success(summary)
+            for error in errors:
+                st.error(error)
+        bcol1, bcol2, _ = st.columns([1, 1, 4])
+        with bcol1:
+            if st.button("▶️ Run selected", disabled=not selected):
+                with st.spinner(f"Starting {len(selected)} project(s)..."):
+                    results = run_projects(selected)
+                failed = {pid: error for pid, (port, error) in results.items() if error}
+                st.session_state.bulk_report = (
+                    f"Started {len(results) - len(failed)} of {len(results)} project(s)",
+                    [f"{project_names[pid]}: {error}" for pid, error in failed.items()],
+                )
+                st.rerun()
+        with bcol2:
+            if st.button("⏹️ Stop selected", disabled=not selected):
+                with st.spinner(f"Stopping {len(selected)} project(s)..."):
+                    results = stop_projects(selected)
+                st.session_state.bulk_report = (f"Stopped {sum(results.values())} of {len(selected)} project(s)", [])
+                st.rerun()
+
         # Display projects
         for project in filtered_projects:
-            # projects table now includes owner_id as the last column; unpack accordingly
-            project_id, name, description, prompt, backend, frontend, created_at, modified_at, status, port, framework, owner_id = project
+            project_id, name, description, created_at, modified_at, status, port, framework, project_owner_id, snippet = project
             
             with st.expander(f"📦 {name} - ID: {project_id}", expanded=False):
                 col1, col2 = st.columns([3, 1])
                 
                 with col1:
                     st.markdown(f"**Description:** {description or 'No description'}")
+                    if snippet:
+                        st.markdown(f"**Match:** {snippet}")
                     st.markdown(f"**Created:** {created_at}")
                     st.markdown(f"**Framework:** {framework}")
                     if port:
                         st.markdown(f"**Port:** {port}")
-                        st.markdown(f"**URL:** [http://localhost:{port}](http://localhost:{port})")
+                        url = project_url(project_id, port)
+                        st.markdown(f"**URL:** [{url}]({url})")
                 
                 with col2:
                     status_emoji = "🟢" if status == "running" else "⚪"
                     st.markdown(f"**Status:** {status_emoji} {status}")
                 
+                # Serving mode used by the next Run
+                if st.checkbox("⚙️ Run settings", key=f"run_settings_{project_id}"):
+                    run_mode, workers, threads = get_run_settings(project_id)
+                    run_mode = run_mode or run_modes.DEFAULT_RUN_MODE
+                    rcol1, rcol2, rcol3 = st.columns(3)
+                    with rcol1:
+                        new_mode = st.selectbox(
+                            "Mode", run_modes.RUN_MODES, index=run_modes.RUN_MODES.index(run_mode),
+                            key=f"run_mode_{project_id}",
+                            help="wsgi: production server without the reloader; debug: Flask debug server; "
+                                 "shared: mounted under /p/<id>/ in one shared server process"
+                        )
+                    with rcol2:
+                        new_workers = st.number_input("Workers", min_value=1, max_value=16, step=1,
+                                                      value=workers or run_modes.DEFAULT_WORKERS,
+                                                      key=f"workers_{project_id}")
+                    with rcol3:
+                        new_threads = st.number_input("Threads", min_value=1, max_value=64, step=1,
+                                                      value=threads or run_modes.DEFAULT_THREADS,
+                                                      key=f"threads_{project_id}")
+                    # Resource limits; 0 means unlimited, CPU % only applies with cgroup v2.
+                    # Shared projects run inside this process, where limits can't apply.
+                    shared = new_mode == 'shared'
+                    if shared:
+                        st.info("Shared projects run inside the builder process without isolation; "
+                                "resource limits don't apply, and saving clears them")
+                    limits = resource_limits.Limits.from_row(get_resource_limits(project_id))
+                    lcol1, lcol2, lcol3, lcol4, lcol5 = st.columns(5)
+                    with lcol1:
+                        new_memory = st.number_input("Memory (MB)", min_value=0, step=64,
+                                                     value=limits.memory_mb or 0, key=f"memory_{project_id}",
+                                                     disabled=shared)
+                    with lcol2:
+                        new_cpu_seconds = st.number_input("CPU seconds", min_value=0, step=60,
+                                                          value=limits.cpu_seconds or 0, key=f"cpu_seconds_{project_id}",
+                                                          disabled=shared)
+                    with lcol3:
+                        new_files = st.number_input("Open files", min_value=0, step=64,
+                                                    value=limits.max_open_files or 0, key=f"files_{project_id}",
+                                                    disabled=shared)
+                    with lcol4:
+                        new_nice = st.number_input("Nice", min_value=0, max_value=19, step=1,
+                                                   value=limits.nice or 0, key=f"nice_{project_id}",
+                                                   disabled=shared)
+                    with lcol5:
+                        new_cpu_percent = st.number_input("CPU %", min_value=0, max_value=800, step=10,
+                                                          value=limits.cpu_percent or 0, key=f"cpu_percent_{project_id}",
+                                                          disabled=shared)
+                    server, server_warning = run_modes.describe(new_mode, int(new_workers), int(new_threads))
+                    st.caption(f"Served by: {server}")
+                    if server_warning:
+                        st.warning(server_warning)
+                    limit_event = get_last_limit_event(project_id)
+                    if limit_event:
+                        st.warning(f"The last run was stopped by its {limit_event} limit")
+                    if st.button("Save run settings", key=f"save_run_settings_{project_id}"):
+                        update_run_settings(project_id, new_mode, int(new_workers), int(new_threads))
+                        if shared:
+                            new_memory = new_cpu_seconds = new_files = new_nice = new_cpu_percent = 0
+                        update_resource_limits(project_id, int(new_memory), int(new_cpu_seconds), int(new_files),
+                                               int(new_nice), int(new_cpu_percent))
+                        st.success("Run settings saved; they apply the next time the project is started")
+                
+                # Tail of the app's output, read from memory or projects/project_<id>/app.log
+                if st.checkbox("📜 Show logs", key=f"logs_{project_id}"):
+                    log_text = project_logs.tail(project_id, f"./projects/project_{project_id}", LOG_PANEL_BYTES)
+                    st.code(log_text or "No output yet", language="log")
+                    if st.button("🔄 Refresh logs", key=f"refresh_logs_{project_id}"):
+                        st.rerun()
+                
+                # Saved versions of the code; diff against the current one and restore
+                if st.checkbox("🕘 History", key=f"history_{project_id}"):
+                    project_versions = versions.list_versions(project_id)
+                    if not project_versions:
+                        st.info("No saved versions yet")
+                    else:
+                        latest = project_versions[0][0]
+                        labels = {v: f"v{v} · {created} · {source or 'edit'}"
+                                  for v, created, source, _, _ in project_versions}
+                        picked = st.selectbox("Version", list(labels), format_func=labels.get,
+                                              index=min(1, len(labels) - 1), key=f"version_{project_id}")
+                        field = st.radio("File", versions.FIELDS, horizontal=True, key=f"version_field_{project_id}")
+                        st.code(versions.diff(project_id, picked, latest, field) or "No differences",
+                                language='diff')
+                        if picked != latest and st.button(f"⏪ Restore v{picked}", key=f"restore_{project_id}"):
+                            restored, error = restore_project_version(project_id, picked)
+                            if error:
+                                st.error(error)
+                            elif restored is None:
+                                st.info(f"The code is already at v{picked}; no new version was recorded")
+                            else:
+                                code_view.forget(project_id)
+                                st.success(f"Restored v{picked} as v{restored}")
+                                time.sleep(1)
+                                st.rerun()
+                
                 # Action buttons
                 col1, col2, col3, col4, col5, col6 = st.columns(6)
                 
@@ -944,7 +702,7 @@ def main():
                     if st.button("▶️ Run", key=f"run_{project_id}"):
                         port, error = run_project(project_id)
                         if port:
-                            st.success(f"Running at http://localhost:{port}")
+                            st.success(f"Running at {project_url(project_id, port)}")
                             time.sleep(1)
                             st.rerun()
                         else:
@@ -989,60 +747,56 @@ def main():
                             st.session_state[f"confirm_delete_{project_id}"] = True
                             st.warning("Click again to confirm")
         
-        # View project details
-        # If editing a project, show code editors and save
-        if st.session_state.get('edit_project'):
-            edit_id = st.session_state.get('edit_project')
-            proj = get_project(edit_id)
-            if not proj:
+        # The opened project's code is fetched here (cached per last_modified), never for the list
+        if st.session_state.get('view_project'):
+            view_id = st.session_state.view_project
+            code = code_view.get(view_id)
+            if not code:
                 st.error("Project not found")
+                del st.session_state.view_project
             else:
-                st.markdown(f"## Editing: {proj[1]} (ID: {edit_id})")
-                backend_code = st.text_area("Backend (app.py)", value=proj[4] or '', height=300, key=f'backend_{edit_id}')
-                frontend_code = st.text_area("Frontend (index.html)", value=proj[5] or '', height=300, key=f'frontend_{edit_id}')
-                colA, colB = st.columns(2)
-                with colA:
-                    if st.button("Save Changes", key=f'save_project_{edit_id}'):
-                        update_project(edit_id, backend_code, frontend_code)
-                        st.success("Saved")
-                        # clear edit state
-                        st.session_state.edit_project = None
-                        st.experimental_rerun()
-                with colB:
-                    if st.button("Cancel", key=f'cancel_edit_{edit_id}'):
-                        st.session_state.edit_project = None
-                        st.experimental_rerun()
-        if 'view_project' in st.session_state:
-            project = get_project(st.session_state.view_project)
-            if project:
                 st.markdown("---")
-                st.subheader(f"Viewing: {project[1]}")
+                st.subheader(f"Viewing: {code.name}")
                 
+                # Long files are shown a page of lines at a time
                 tab1, tab2 = st.tabs(["Backend", "Frontend"])
-                with tab1:
-                    st.code(project[4], language='python')
-                with tab2:
-                    st.code(project[5], language='html')
+                for tab, field, language in ((tab1, 'backend', 'python'), (tab2, 'frontend', 'html')):
+                    with tab:
+                        shown_key = f"shown_{field}_{view_id}"
+                        shown = st.session_state.get(shown_key, code_view.PAGE_LINES)
+                        text, total = code.window(field, shown)
+                        st.code(text, language=language)
+                        if total > shown:
+                            st.caption(f"Showing {shown} of {total} lines")
+                            if st.button("Load more", key=f"more_{field}_{view_id}"):
+                                st.session_state[shown_key] = shown + code_view.PAGE_LINES
+                                st.rerun()
                 
                 if st.button("Close"):
                     del st.session_state.view_project
                     st.rerun()
         
         # Edit project
-        if 'edit_project' in st.session_state:
-            project = get_project(st.session_state.edit_project)
-            if project:
+        if st.session_state.get('edit_project'):
+            edit_id = st.session_state.edit_project
+            code = code_view.get(edit_id)
+            if not code:
+                st.error("Project not found")
+                del st.session_state.edit_project
+            else:
                 st.markdown("---")
-                st.subheader(f"Editing: {project[1]}")
+                st.subheader(f"Editing: {code.name}")
                 
-                with st.form("edit_form"):
-                    new_backend = st.text_area("Backend Code", project[4], height=300)
-                    new_frontend = st.text_area("Frontend Code", project[5], height=300)
+                # A form, so typing doesn't rerun the page on every keystroke
+                with st.form(f"edit_form_{edit_id}"):
+                    new_backend = st.text_area("Backend (app.py)", code.backend, height=300)
+                    new_frontend = st.text_area("Frontend (index.html)", code.frontend, height=300)
                     
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.form_submit_button("💾 Save Changes"):
-                            update_project(st.session_state.edit_project, new_backend, new_frontend)
+                            update_project(edit_id, new_backend, new_frontend)
+                            code_view.forget(edit_id)
                             st.success("Project updated!")
                             del st.session_state.edit_project
                             time.sleep(1)
@@ -1075,53 +829,52 @@ def main():
             save_history = st.checkbox("Save generation history", value=True)
         
         with tab2:
-            st.subheader("Import Project")
-            uploaded_file = st.file_uploader("Upload project JSON", type=['json'])
+            st.subheader("Import Projects")
+            uploaded_file = st.file_uploader("Upload a project JSON or a database export",
+                                             type=['json', 'jsonl', 'zip'])
             if uploaded_file:
-                json_data = uploaded_file.read().decode('utf-8')
                 if st.button("Import"):
-                    project_id = import_project(json_data)
-                    if project_id:
-                        st.success(f"Project imported with ID: {project_id}")
+                    owner_id = st.session_state['user']['id'] if st.session_state.get('user') else None
+                    result = import_projects(uploaded_file, owner_id)
+                    if result.imported or result.duplicates:
+                        st.success(f"Import finished: {result.summary()}")
                     else:
-                        st.error("Failed to import project")
+                        st.error(f"Nothing imported: {result.summary()}")
+                    if result.errors:
+                        with st.expander(f"⚠️ {len(result.errors)} record(s) failed"):
+                            for number, message in result.errors[:200]:
+                                st.text(f"Record {number}: {message}")
             
             st.markdown("---")
             st.subheader("Export All Projects")
+            # Read from the database in batches; Streamlit holds the finished download in memory
+            ecol1, ecol2, ecol3 = st.columns(3)
+            with ecol1:
+                export_format = st.selectbox("Format", exporter.EXPORT_FORMATS,
+                                             help="zip: a folder per project with app.py, index.html and Dockerfile; "
+                                                  "jsonl: one JSON record per line")
+            with ecol2:
+                include_history = st.checkbox("Include generation history")
+            with ecol3:
+                include_runs = st.checkbox("Include run history")
             if st.button("Export Database"):
-                projects = get_all_projects()
-                all_projects = []
-                for p in projects:
-                    all_projects.append({
-                        "id": p[0],
-                        "name": p[1],
-                        "description": p[2],
-                        "backend": p[4],
-                        "frontend": p[5]
-                    })
+                with st.spinner("Exporting..."):
+                    export_data, counts = export_database(export_format, include_history, include_runs)
+                st.caption(", ".join(f"{count} {table.replace('_', ' ')}" for table, count in counts.items() if count))
                 st.download_button(
                     "Download All Projects",
-                    json.dumps(all_projects, indent=2),
-                    file_name="all_projects.json",
-                    mime="application/json"
+                    export_data,
+                    file_name=f"all_projects.{export_format}",
+                    mime="application/zip" if export_format == 'zip' else "application/x-ndjson"
                 )
         
         with tab3:
             st.subheader("Database Management")
             
-            conn = sqlite3.connect('project_builder.db')
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT COUNT(*) FROM projects")
-            project_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM project_runs")
-            runs_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM generation_history")
-            history_count = cursor.fetchone()[0]
-            
-            conn.close()
+            counts = get_stats()
+            project_count = counts['projects']
+            runs_count = counts['project_runs']
+            history_count = counts['generation_history']
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -1131,17 +884,33 @@ def main():
             with col3:
                 st.metric("Generation History", history_count)
             
+            # Code and responses are stored once per distinct text, compressed
+            blob_count, stored_bytes, original_bytes = get_blob_usage()
+            if blob_count:
+                st.caption(f"Code storage: {stored_bytes / 1024 / 1024:.1f} MB for "
+                           f"{original_bytes / 1024 / 1024:.1f} MB of code and responses in {blob_count} blobs")
+            
+            st.markdown("---")
+            st.subheader("Generation Cache")
+            cache = generation_cache.cache_stats()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Cached Responses", cache['entries'])
+            with col2:
+                st.metric("Cache Size", f"{cache['bytes'] / 1024:.0f} KB")
+            with col3:
+                st.metric("Hits", cache['hits'] + cache['history_hits'])
+            with col4:
+                st.metric("Misses", cache['misses'])
+            if st.button("Clear generation cache"):
+                generation_cache.clear()
+                st.success("Generation cache cleared")
+            
             st.markdown("---")
             st.warning("⚠️ Danger Zone")
             if st.button("🗑️ Clear All Data", type="secondary"):
                 if st.session_state.get("confirm_clear"):
-                    conn = sqlite3.connect('project_builder.db')
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM projects")
-                    cursor.execute("DELETE FROM project_runs")
-                    cursor.execute("DELETE FROM generation_history")
-                    conn.commit()
-                    conn.close()
+                    clear_all_data()
                     st.success("All data cleared")
                     st.session_state.confirm_clear = False
                 else:
@@ -1151,8 +920,7 @@ def main():
     # Footer
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 📊 Quick Stats")
-    projects = get_all_projects()
-    st.sidebar.metric("Total Projects", len(projects))
+    st.sidebar.metric("Total Projects", get_stats()['projects'])
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("Made with ❤️ using Streamlit & Groq AI")
@@ -0,0 +1,193 @@
+# backend_transform.py - AST-based preparation of generated Flask backends
+import ast
+import collections
+import hashlib
+import threading
+
+# Prepared backends kept in memory, keyed by the sha256 of the generated code
+MAX_CACHED = 256
+
+INJECTED_HEADER = '# --- added by Project Builder ---'
+
+# Serves index.html from the project directory whatever the working directory
+INDEX_ROUTE = '''
+@{app}.route('/')
+def _pb_index():
+    return _pb_send_from_directory(_pb_os.path.dirname(_pb_os.path.abspath(__file__)), 'index.html')
+'''
+
+_cache = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def _is_flask_call(node):
+    if not isinstance(node, ast.Call):
+        return False
+    func = node.func
+    return (isinstance(func, ast.Name) and func.id == 'Flask') or \
+        (isinstance(func, ast.Attribute) and func.attr == 'Flask')
+
+
+def _is_main_guard(node):
+    if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+        return False
+    test = node.test
+    if len(test.ops) != 1 or not isinstance(test.ops[0], ast.Eq):
+        return False
+    sides = [test.left, test.comparators[0]]
+    return any(isinstance(s, ast.Name) and s.id == '__name__' for s in sides) and \
+        any(isinstance(s, ast.Constant) and s.value == '__main__' for s in sides)
+
+
+def _is_app_call(node, app_name, methods):
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+        and node.func.attr in methods \
+        and isinstance(node.func.value, ast.Name) and node.func.value.id == app_name
+
+
+def _first_arg(call):
+    if call.args and isinstance(call.args[0], ast.Constant):
+        return call.args[0].value
+    for kw in call.keywords:
+        if kw.arg == 'rule' and isinstance(kw.value, ast.Constant):
+            return kw.value.value
+    return None
+
+
+def _has_index_route(tree, app_name):
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in node.decorator_list:
+                if _is_app_call(decorator, app_name, ('route', 'get')) and _first_arg(decorator) == '/':
+                    return True
+        elif _is_app_call(node, app_name, ('add_url_rule',)) and _first_arg(node) == '/':
+            return True
+    return False
+
+
+def _find_app(tree):
+    # Module-level `name = Flask(...)`; factory-style apps are left alone
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and _is_flask_call(node.value):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    return target.id, node
+    return None, None
+
+
+# Flask.run(host, port, debug, load_dotenv): positionals after host/port
+# become keywords, since host and port are passed as keywords
+RUN_POSITIONALS = ('host', 'port', 'debug', 'load_dotenv')
+
+
+def _run_call(call):
+    # Same call without host/port (keyword or the first two positional
+    # arguments), reading them from the environment instead
+    port = 5000
+    if len(call.args) > 1 and isinstance(call.args[1], ast.Constant):
+        port = call.args[1].value
+    keywords = []
+    for kw in call.keywords:
+        if kw.arg == 'port':
+            if isinstance(kw.value, ast.Constant):
+                port = kw.value.value
+        elif kw.arg != 'host':
+            keywords.append(kw)
+    for name, arg in zip(RUN_POSITIONALS[2:], call.args[2:]):
+        if not isinstance(arg, ast.Starred):
+            keywords.append(ast.keyword(name, arg))
+    if not any(kw.arg == 'debug' for kw in keywords):
+        keywords.append(ast.keyword('debug', ast.Constant(True)))
+    keywords.append(ast.keyword('port', ast.parse(f"int(_pb_os.environ.get('PORT', '{port}'))", mode='eval').body))
+    keywords.append(ast.keyword('host', ast.parse("_pb_os.environ.get('HOST', '127.0.0.1')", mode='eval').body))
+    return ast.unparse(ast.Call(func=call.func, args=[], keywords=keywords))
+
+
+class _Source:
+    # Byte offsets for AST positions (col_offset counts UTF-8 bytes)
+    def __init__(self, code):
+        self.data = code.encode('utf-8')
+        self.line_starts = [0]
+        for line in self.data.splitlines(keepends=True):
+            self.line_starts.append(self.line_starts[-1] + len(line))
+
+    def start(self, node):
+        return self.line_starts[node.lineno - 1] + node.col_offset
+
+    def end(self, node):
+        return self.line_starts[node.end_lineno - 1] + node.end_col_offset
+
+    def line_start(self, node):
+        return self.line_starts[node.lineno - 1]
+
+
+def _transform(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        # Left as-is; the launch reports the error
+        return code
+    app_name, app_node = _find_app(tree)
+    if app_name is None:
+        return code
+
+    source = _Source(code)
+    edits = []   # (start, end, replacement bytes)
+    insert_at = len(source.data)
+    has_main_run = False
+    for node in tree.body:
+        if node.lineno <= app_node.lineno:
+            continue
+        if _is_main_guard(node):
+            insert_at = min(insert_at, source.line_start(node))
+            for call in ast.walk(node):
+                if _is_app_call(call, app_name, ('run',)):
+                    edits.append((source.start(call), source.end(call), _run_call(call)))
+                    has_main_run = True
+        elif isinstance(node, ast.Expr) and _is_app_call(node.value, app_name, ('run',)):
+            # An unguarded app.run() would start a dev server whenever the module is imported
+            insert_at = min(insert_at, source.line_start(node))
+            edits.append((source.start(node), source.end(node),
+                          f"if __name__ == '__main__':\n    {_run_call(node.value)}"))
+            has_main_run = True
+
+    block = [INJECTED_HEADER, 'import os as _pb_os',
+             'from flask import send_from_directory as _pb_send_from_directory']
+    if app_name != 'app':
+        # serve.py and gunicorn look for `app`
+        block.append(f'app = {app_name}')
+    if not _has_index_route(tree, app_name):
+        block.append(INDEX_ROUTE.format(app=app_name))
+    if not has_main_run:
+        block.append(f"\nif __name__ == '__main__':\n    {app_name}.run(debug=True, "
+                     "port=int(_pb_os.environ.get('PORT', '5000')), "
+                     "host=_pb_os.environ.get('HOST', '127.0.0.1'))")
+    injected = '\n' + '\n'.join(block) + '\n\n'
+    if insert_at == len(source.data) and not source.data.endswith(b'\n'):
+        injected = '\n' + injected
+    edits.append((insert_at, insert_at, injected))
+
+    data = source.data
+    for start, end, text in sorted(edits, key=lambda e: e[0], reverse=True):
+        data = data[:start] + text.encode('utf-8') + data[end:]
+    return data.decode('utf-8')
+
+
+# Generated Flask code made runnable by Project Builder:
+# - the module-level Flask app object is found (and aliased as `app`)
+# - a `/` route serving index.html is added unless one exists
+# - every app.run() in the __main__ block reads PORT/HOST from the environment
+#   (unguarded app.run() calls are moved under a __main__ guard)
+# Code that doesn't parse or has no module-level app is returned unchanged.
+def transform(code):
+    key = hashlib.sha256(code.encode('utf-8')).hexdigest()
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    result = _transform(code)
+    with _lock:
+        _cache[key] = result
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,79 @@
+# bench_parser.py - Parse time and success rate of the response parser vs the old regex chain
+#
+# Run from the ProjectBuilder directory:
+#     python -m benchmarks.bench_parser [repeats]
+import json
+import re
+import sys
+import time
+
+import response_parser
+from benchmarks.parser_corpus import CASES, matches
+
+
+# The fallback chain app.py used before response_parser, kept for comparison
+def legacy_parse(response_text):
+    cleaned = response_text.strip()
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+
+    match = re.search(r'\{[\s\S]*\}', cleaned)
+    if match:
+        cleaned = match.group(0)
+
+    project_name_match = re.search(r'"project_name"\s*:\s*"([^"]+)"', cleaned)
+    description_match = re.search(r'"description"\s*:\s*"([^"]+)"', cleaned)
+    backend_match = re.search(r'"backend"\s*:\s*"((?:[^"\\]|\\.)*)"\s*,', cleaned, re.DOTALL)
+    frontend_match = re.search(r'"frontend"\s*:\s*"((?:[^"\\]|\\.)*)"\s*,', cleaned, re.DOTALL)
+    setup_match = re.search(r'"setup_instructions"\s*:\s*"([^"]*)"', cleaned)
+    features_match = re.search(r'"features"\s*:\s*\[(.*?)\]', cleaned, re.DOTALL)
+
+    result = {}
+    if project_name_match:
+        result["project_name"] = project_name_match.group(1)
+    if description_match:
+        result["description"] = description_match.group(1)
+    if backend_match:
+        result["backend"] = backend_match.group(1).replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"')
+    if frontend_match:
+        result["frontend"] = frontend_match.group(1).replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"')
+    if setup_match:
+        result["setup_instructions"] = setup_match.group(1)
+    if features_match:
+        result["features"] = re.findall(r'"([^"]+)"', features_match.group(1))
+    return result if len(result) >= 4 else None
+
+
+def current_parse(response_text):
+    return response_parser.parse_response(response_text)[0]
+
+
+def measure(parse, text, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = parse(text)
+    return result, (time.perf_counter() - start) / repeats * 1000
+
+
+def main(repeats=20):
+    parsers = [('legacy', legacy_parse), ('response_parser', current_parse)]
+    totals = {name: [0, 0.0] for name, _ in parsers}
+    print(f"{'case':<18}{'size':>8}  " + ''.join(f"{name:>24}" for name, _ in parsers))
+    for case, text, expected, truncated in CASES:
+        cells = []
+        for name, parse in parsers:
+            result, ms = measure(parse, text, repeats)
+            ok = matches(result, expected, truncated)
+            totals[name][0] += ok
+            totals[name][1] += ms
+            cells.append(f"{'ok' if ok else 'FAIL':>6} {ms:>9.2f} ms")
+        print(f"{case:<18}{len(text):>8}  " + ''.join(f"{cell:>24}" for cell in cells))
+    print()
+    for name, (ok, ms) in totals.items():
+        print(f"{name:<16} success {ok}/{len(CASES)}  total {ms:.2f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
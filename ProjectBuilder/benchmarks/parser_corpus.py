@@ -0,0 +1,95 @@
+# parser_corpus.py - Malformed model answers for the response parser benchmark
+#
+# Each case is modelled on a failure mode seen in answers from the generation
+# model: prose around the JSON, code fences, trailing commas, raw newlines,
+# unescaped quotes in HTML, escapes the old .replace() chain mangled, and
+# answers cut off at max_tokens. The code fields are padded to the ~30 KB
+# size of a typical generated project.
+import json
+import re
+
+ROUTE = '''
+@app.route('/api/items/<int:item_id>', methods=['GET', 'PUT', 'DELETE'])
+def item_{n}(item_id):
+    """Placeholder CRUD handler {n}."""
+    logger.info("item %s requested\\n", item_id)  # TODO: database lookup
+    if request.method == 'DELETE':
+        return jsonify({{"deleted": item_id, "path": "C:\\\\data\\\\items"}}), 200
+    return jsonify({{"id": item_id, "name": "Item {n}", "tags": ["a", "b"]}})
+'''
+
+CARD = '''
+<div class="card p-4 rounded shadow" data-id="{n}">
+  <h2 class="text-xl">Café item {n} 🚀</h2>
+  <button onclick="deleteItem({n})" class="btn">Delete</button>
+  <script>fetch(`${{API_BASE_URL}}/api/items/{n}`).then(r => r.json());</script>
+</div>
+'''
+
+BACKEND = (
+    "from flask import Flask, jsonify, request\nfrom flask_cors import CORS\nimport logging\n\n"
+    "app = Flask(__name__)\nCORS(app)\nlogger = logging.getLogger(__name__)\n"
+    + ''.join(ROUTE.format(n=n) for n in range(60))
+    + "\nif __name__ == '__main__':\n    app.run(debug=True)\n"
+)
+
+FRONTEND = (
+    '<!doctype html>\n<html>\n<head><script src="https://cdn.tailwindcss.com"></script></head>\n<body>\n'
+    + ''.join(CARD.format(n=n) for n in range(60))
+    + '</body>\n</html>\n'
+)
+
+PROJECT = {
+    'project_name': 'inventory-manager',
+    'description': 'Track items with tags and categories',
+    'backend': BACKEND,
+    'frontend': FRONTEND,
+    'setup_instructions': 'pip install flask flask_cors && python app.py',
+    'features': ['CRUD items', 'tags', 'search'],
+}
+
+VALID = json.dumps(PROJECT, indent=2)
+
+
+def _raw_newlines(text):
+    # Model wrote real line breaks instead of \n escapes inside strings
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(0), text)
+
+
+def _unescaped_html_quotes(project):
+    # Quotes inside the frontend string left unescaped
+    body = json.dumps({k: v for k, v in project.items() if k != 'frontend'}, indent=2)[:-2]
+    escaped = json.dumps(project['frontend'])[1:-1].replace('\\"', '"')
+    return body + ',\n  "frontend": "' + escaped + '"\n}'
+
+
+def _trailing_commas(project):
+    text = json.dumps(project, indent=2)
+    return text.replace('\n  ]', ',\n  ]').replace('\n}', ',\n}')
+
+
+# (name, response text, expected project, truncated)
+CASES = [
+    ('valid', VALID, PROJECT, False),
+    ('prose-and-fence', "Sure! Here is your project:\n\n```json\n" + VALID + "\n```\n\nLet me know if you need changes.", PROJECT, False),
+    ('trailing-commas', _trailing_commas(PROJECT), PROJECT, False),
+    ('raw-newlines', _raw_newlines(VALID), None, False),
+    ('unescaped-quotes', _unescaped_html_quotes(PROJECT), PROJECT, False),
+    ('unicode-escapes', json.dumps(PROJECT, indent=2, ensure_ascii=True), PROJECT, False),
+    ('python-literals', VALID[:-2] + ',\n  "has_tests": True\n}', dict(PROJECT, has_tests=True), False),
+    ('truncated', VALID[:VALID.index('"setup_instructions"') - 400], None, True),
+]
+
+
+# Whether a parsed result counts as a successful parse of the given case
+def matches(result, expected, truncated):
+    if not isinstance(result, dict):
+        return False
+    if any(field not in result for field in ('project_name', 'description', 'backend', 'frontend')):
+        return False
+    if truncated:
+        return result['backend'] == PROJECT['backend'] and PROJECT['frontend'].startswith(result['frontend'])
+    if expected is None:
+        # Raw newlines: the code must round-trip to the original text
+        return result['backend'] == PROJECT['backend'] and result['frontend'] == PROJECT['frontend']
+    return all(result.get(k) == v for k, v in expected.items())
@@ -0,0 +1,139 @@
+# blobs.py - Content-addressed, compressed storage for code and AI responses
+import collections
+import hashlib
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Stored data starts with a one-byte codec tag, so blobs written with zstd
+# and zlib can live side by side
+CODEC_RAW = b'r'
+CODEC_ZLIB = b'z'
+CODEC_ZSTD = b's'
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+# Texts shorter than this aren't worth compressing
+MIN_COMPRESS_BYTES = 64
+
+# Decompressed texts kept in memory, keyed by hash (content-addressed, so never stale)
+MAX_CACHED_TEXTS = 128
+MAX_CACHED_BYTES = 16 * 1024 * 1024
+
+_texts = collections.OrderedDict()
+_cached_bytes = 0
+_lock = threading.Lock()
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def encode(text):
+    data = text.encode('utf-8')
+    if len(data) < MIN_COMPRESS_BYTES:
+        return CODEC_RAW + data
+    if zstandard is not None:
+        return CODEC_ZSTD + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return CODEC_ZLIB + zlib.compress(data, ZLIB_LEVEL)
+
+
+def decode(data):
+    if data is None:
+        return None
+    data = bytes(data)
+    codec, payload = data[:1], data[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload).decode('utf-8')
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This blob is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+    return payload.decode('utf-8')
+
+
+# Make blob_text(data) available to SQL on conn. The projects full-text index
+# reads code through it, so every connection that writes projects needs it
+# (db.py registers it on each pooled connection).
+def register(conn):
+    conn.create_function('blob_text', 1, decode, deterministic=True)
+
+
+# SQL expression for the text stored under the hash in column
+def text_sql(column):
+    return f'blob_text((SELECT data FROM blobs WHERE hash = {column}))'
+
+
+# Store text (once per distinct content) and return its hash; None stays None
+def put(conn, text):
+    if text is None:
+        return None
+    digest = content_hash(text)
+    conn.execute('''
+        INSERT OR IGNORE INTO blobs (hash, data, size) VALUES (?, ?, ?)
+    ''', (digest, encode(text), len(text.encode('utf-8'))))
+    return digest
+
+
+def _remember(digest, text):
+    global _cached_bytes
+    with _lock:
+        if digest in _texts:
+            return
+        _texts[digest] = text
+        _cached_bytes += len(text)
+        while len(_texts) > MAX_CACHED_TEXTS or _cached_bytes > MAX_CACHED_BYTES:
+            _, old = _texts.popitem(last=False)
+            _cached_bytes -= len(old)
+
+
+# Text stored under a hash (None for a missing blob)
+def get(conn, digest):
+    if digest is None:
+        return None
+    with _lock:
+        if digest in _texts:
+            _texts.move_to_end(digest)
+            return _texts[digest]
+    row = conn.execute('SELECT data FROM blobs WHERE hash = ?', (digest,)).fetchone()
+    if row is None:
+        return None
+    text = decode(row[0])
+    _remember(digest, text)
+    return text
+
+
+# Columns that reference blobs; release() and collect_garbage() check all of them
+REFERENCES = [
+    ('projects', 'backend_hash'),
+    ('projects', 'frontend_hash'),
+    ('generation_history', 'response_hash'),
+    ('project_versions', 'backend_ref'),
+    ('project_versions', 'frontend_ref'),
+]
+
+
+def _unreferenced_sql():
+    return ' AND '.join(f'NOT EXISTS (SELECT 1 FROM {table} WHERE {column} = blobs.hash)'
+                        for table, column in REFERENCES)
+
+
+# Delete the given blobs if nothing references them any more (call after the
+# rows that used them were updated or deleted, in the same transaction)
+def release(conn, hashes):
+    hashes = [(h,) for h in set(hashes) if h]
+    conn.executemany(f'DELETE FROM blobs WHERE hash = ? AND {_unreferenced_sql()}', hashes)
+
+
+# Delete every unreferenced blob; returns how many were removed
+def collect_garbage(conn):
+    return conn.execute(f'DELETE FROM blobs WHERE {_unreferenced_sql()}').rowcount
+
+
+# (blob count, stored bytes, original bytes)
+def usage(conn):
+    return conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0) FROM blobs').fetchone()
@@ -0,0 +1,65 @@
+# code_view.py - Project code fetched on demand, cached per (project_id, last_modified)
+import collections
+import threading
+
+import db
+import repository
+
+# Lines shown per page of the code viewer; "Load more" adds another page
+PAGE_LINES = 400
+# Projects whose code is kept in memory
+MAX_CACHED_PROJECTS = 32
+
+
+class ProjectCode:
+    def __init__(self, name, last_modified, backend, frontend):
+        self.name = name
+        self.last_modified = last_modified
+        self.backend = backend or ''
+        self.frontend = frontend or ''
+        # Split once, so showing a window costs the window, not the whole file
+        self.lines = {
+            'backend': self.backend.splitlines(keepends=True),
+            'frontend': self.frontend.splitlines(keepends=True),
+        }
+
+    # First `shown` lines of a file and how many lines it has in total
+    def window(self, field, shown=PAGE_LINES):
+        lines = self.lines[field]
+        return ''.join(lines[:shown]), len(lines)
+
+
+_cache = collections.OrderedDict()   # {(project_id, last_modified): ProjectCode}
+_lock = threading.Lock()
+
+
+# Code of a project, or None if it doesn't exist. Only the project's
+# last_modified is read unless the code changed since it was cached.
+def get(project_id):
+    row = db.query_one('SELECT name, last_modified FROM projects WHERE id = ?', (project_id,))
+    if row is None:
+        return None
+    key = (project_id, row[1])
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    project = repository.get_project(project_id)
+    if project is None:
+        return None
+    code = ProjectCode(project[1], project[7], project[4], project[5])
+    with _lock:
+        for old_key in [k for k in _cache if k[0] == project_id]:
+            del _cache[old_key]
+        _cache[(project_id, code.last_modified)] = code
+        while len(_cache) > MAX_CACHED_PROJECTS:
+            _cache.popitem(last=False)
+    return code
+
+
+# Drop a project's cached code; last_modified has one-second resolution, so
+# callers that just saved the project call this rather than rely on it
+def forget(project_id):
+    with _lock:
+        for key in [k for k in _cache if k[0] == project_id]:
+            del _cache[key]
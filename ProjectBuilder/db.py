@@ -0,0 +1,158 @@
+# db.py - Pooled SQLite connection layer
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import blobs
+
+DB_PATH = os.environ.get('PROJECT_BUILDER_DB', 'project_builder.db')
+
+# Applied once to every new connection. WAL lets readers run alongside the single
+# writer, synchronous=NORMAL only fsyncs at checkpoints in WAL mode, and the cache /
+# mmap sizes keep hot pages of the projects table out of read() syscalls.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",      # ~16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",    # 128 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Size of sqlite3's per-connection prepared statement cache
+STATEMENT_CACHE_SIZE = 256
+
+# Connections left behind by finished threads that are kept around for reuse
+MAX_IDLE_CONNECTIONS = 8
+
+
+class ConnectionPool:
+    # One connection per live thread. Streamlit runs every rerun on a fresh script
+    # thread, so connections of finished threads go back to an idle list and are
+    # handed to the next thread instead of reopening the database file.
+    def __init__(self, path, max_idle=MAX_IDLE_CONNECTIONS):
+        self.path = path
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._in_use = {}   # {thread: connection}
+        self._idle = []
+        self._closed = False
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=5.0,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        # Code is stored compressed in the blobs table; SQL reads it through blob_text()
+        blobs.register(conn)
+        return conn
+
+    def _reap(self):
+        # Caller holds self._lock
+        for thread in [t for t in self._in_use if not t.is_alive()]:
+            conn = self._in_use.pop(thread)
+            if conn.in_transaction:
+                conn.rollback()
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+            else:
+                conn.close()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            self._reap()
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+            self._in_use[threading.current_thread()] = conn
+        self._local.conn = conn
+        self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        # Nested transaction() blocks join the outermost one, which commits once
+        conn = self.connection()
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0 and conn.in_transaction:
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {'in_use': len(self._in_use), 'idle': len(self._idle)}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in list(self._in_use.values()) + self._idle:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._in_use.clear()
+            self._idle.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+# Point the data layer at another database file (used by tests and tooling)
+def configure(path):
+    global _pool, DB_PATH
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        DB_PATH = path
+        _pool = ConnectionPool(path)
+    return _pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def transaction():
+    return get_pool().transaction()
+
+
+def query_one(sql, params=()):
+    return connection().execute(sql, params).fetchone()
+
+
+def query_all(sql, params=()):
+    return connection().execute(sql, params).fetchall()
+
+
+# Run a single write statement in its own transaction and return the cursor
+def execute(sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params)
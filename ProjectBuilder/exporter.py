@@ -0,0 +1,155 @@
+# exporter.py - Streaming export of projects (and optionally their history and runs)
+import contextlib
+import json
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+
+import blobs
+import db
+import project_files
+
+EXPORT_VERSION = 1
+
+# Rows fetched from the cursor at a time; only this many are in memory at once
+EXPORT_BATCH_ROWS = 200
+# Exports smaller than this stay in memory, larger ones spill to a temp file
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+EXPORT_FORMATS = ('zip', 'jsonl')
+
+PROJECT_COLUMNS = ('id', 'name', 'description', 'prompt', 'backend_code', 'frontend_code',
+                   'framework', 'owner_id', 'created_at', 'last_modified')
+HISTORY_COLUMNS = ('id', 'project_id', 'prompt', 'response', 'tokens_used', 'cache_key', 'created_at')
+RUN_COLUMNS = ('id', 'project_id', 'pid', 'port', 'started_at', 'stopped_at', 'status', 'limit_event')
+
+# Columns read from the blob store (falling back to rows with inline text)
+BLOB_COLUMNS = {
+    'backend_code': f"COALESCE({blobs.text_sql('backend_hash')}, backend_code)",
+    'frontend_code': f"COALESCE({blobs.text_sql('frontend_hash')}, frontend_code)",
+    'response': f"COALESCE({blobs.text_sql('response_hash')}, response)",
+}
+
+# Record types; in JSONL every line carries one of these as "type"
+RECORD_PROJECT = 'project'
+RECORD_HISTORY = 'generation_history'
+RECORD_RUN = 'project_run'
+
+# Files of a project folder in the ZIP export (projects/<id>-<slug>/...)
+ZIP_MANIFEST = 'manifest.json'
+ZIP_PROJECT_META = 'project.json'
+ZIP_HISTORY = 'generation_history.jsonl'
+ZIP_RUNS = 'project_runs.jsonl'
+
+
+@contextlib.contextmanager
+def _snapshot():
+    # One read transaction, so every table is exported as of the same moment
+    with db.transaction() as conn:
+        if not conn.in_transaction:
+            conn.execute('BEGIN')
+        yield conn
+
+
+def _rows(conn, table, columns, progress=None):
+    select = ', '.join(BLOB_COLUMNS.get(column, column) for column in columns)
+    cursor = conn.execute(f"SELECT {select} FROM {table} ORDER BY id")
+    done = 0
+    while True:
+        batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+        if not batch:
+            return
+        for row in batch:
+            yield dict(zip(columns, row))
+        done += len(batch)
+        if progress:
+            progress(table, done)
+
+
+def _line(record):
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _header(include_history, include_runs):
+    return {
+        'type': 'export',
+        'version': EXPORT_VERSION,
+        'exported_at': datetime.now().isoformat(),
+        'tables': ['projects']
+                  + (['generation_history'] if include_history else [])
+                  + (['project_runs'] if include_runs else []),
+    }
+
+
+def project_folder(record):
+    slug = re.sub(r'[^a-z0-9]+', '_', (record['name'] or '').lower()).strip('_')[:40]
+    return f"projects/{record['id']}-{slug or 'project'}/"
+
+
+# Write one JSON record per line to the binary stream out: a header line,
+# then projects, then generation_history and project_runs rows when asked.
+# progress(table, rows_done) is called after each batch. Returns row counts.
+def write_jsonl(out, include_history=False, include_runs=False, progress=None):
+    counts = {'projects': 0, 'generation_history': 0, 'project_runs': 0}
+    out.write(_line(_header(include_history, include_runs)))
+    sections = [('projects', PROJECT_COLUMNS, RECORD_PROJECT)]
+    if include_history:
+        sections.append(('generation_history', HISTORY_COLUMNS, RECORD_HISTORY))
+    if include_runs:
+        sections.append(('project_runs', RUN_COLUMNS, RECORD_RUN))
+    with _snapshot() as conn:
+        for table, columns, record_type in sections:
+            for record in _rows(conn, table, columns, progress):
+                out.write(_line({'type': record_type, **record}))
+                counts[table] += 1
+    return counts
+
+
+# Write a deflated ZIP to the binary stream out with a folder per project
+# (project.json, app.py, index.html, Dockerfile), optional
+# generation_history.jsonl / project_runs.jsonl and a manifest.json with
+# the counts. Entries are streamed, so memory stays flat however many
+# projects there are. Returns row counts.
+def write_zip(out, include_history=False, include_runs=False, progress=None):
+    counts = {'projects': 0, 'generation_history': 0, 'project_runs': 0}
+    manifest = _header(include_history, include_runs)
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as archive, _snapshot() as conn:
+        for record in _rows(conn, 'projects', PROJECT_COLUMNS, progress):
+            folder = project_folder(record)
+            backend = record.pop('backend_code') or ''
+            frontend = record.pop('frontend_code') or ''
+            archive.writestr(folder + ZIP_PROJECT_META, json.dumps(record, ensure_ascii=False, indent=2))
+            archive.writestr(folder + 'app.py', backend)
+            archive.writestr(folder + 'index.html', frontend)
+            archive.writestr(folder + 'Dockerfile', project_files.dockerfile(record))
+            counts['projects'] += 1
+        sections = []
+        if include_history:
+            sections.append(('generation_history', HISTORY_COLUMNS, ZIP_HISTORY))
+        if include_runs:
+            sections.append(('project_runs', RUN_COLUMNS, ZIP_RUNS))
+        for table, columns, name in sections:
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                for record in _rows(conn, table, columns, progress):
+                    entry.write(_line(record))
+                    counts[table] += 1
+        manifest['counts'] = counts
+        archive.writestr(ZIP_MANIFEST, json.dumps(manifest, indent=2))
+    return counts
+
+
+# Export into a spooled temp file (in memory while small, on disk beyond
+# EXPORT_SPOOL_BYTES), rewound and ready to read. Returns (file, counts).
+def export_to_tempfile(fmt='zip', include_history=False, include_runs=False, progress=None):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES, suffix=f'.{fmt}')
+    try:
+        writer = write_zip if fmt == 'zip' else write_jsonl
+        counts = writer(spool, include_history, include_runs, progress)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, counts
@@ -0,0 +1,201 @@
+# generation.py - Project generation pipeline (model request, parsing, caching)
+import ai_client
+import generation_cache
+import response_parser
+from response_parser import IncrementalParser
+
+# System prompt sent with every generation request
+SYSTEM_PROMPT = """You are an expert full-stack developer. Generate complete, production-ready code for the requested application.
+
+Requirements:
+1. Backend: Flask Python - single file (app.py)
+   - Include all necessary routes with TODO comments for database integration
+   - Add CORS support for frontend
+   - Include error handling and logging
+   - Add placeholder routes for CRUD operations, with placeholder data
+   - Use proper Flask best practices
+   - It is only provides rest api endpoints
+
+2. Frontend: Single index.html file with vanilla js
+- Tailwind CSS has to be used, through script tag
+- can use ajax if needed
+- Responsive design
+- Modern UI components
+- API integration ready
+- Include loading states and error handling
+- USE RELATIVE URLs for API calls (e.g., '/todos' not 'http://localhost:5000/todos')
+- Add this at top of scripts: const API_BASE_URL = window.location.origin;
+- Use fetch(`${API_BASE_URL}/endpoint`) for all API calls
+
+3. Return ONLY valid JSON with this structure:
+{
+    "project_name": "descriptive-project-name",
+    "description": "brief description",
+    "backend": "complete Flask app.py code",
+    "frontend": "complete index.html code",
+    "setup_instructions": "how to run",
+    "features": ["feature1", "feature2"]
+}
+
+Make the code production-ready, well-commented, and easy to extend."""
+
+# Model settings for generation requests (part of the generation cache key)
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_TEMPERATURE = 0.7
+GROQ_MAX_TOKENS = 7000
+
+# Fields a response must contain to be usable as a project
+REQUIRED_FIELDS = ('project_name', 'description', 'backend', 'frontend')
+
+
+class GenerationError(Exception):
+    # Raised when the model's answer can't be turned into a project
+    def __init__(self, message, response_text=None):
+        super().__init__(message)
+        self.response_text = response_text
+
+
+# Deterministic local stub used when no API key is configured, so the UI can be tested offline
+STUB_BACKEND = '''from flask import Flask, jsonify
+app = Flask(__name__)
+
+@app.route('/health')
+def health():
+    return jsonify({'status':'ok'})
+
+if __name__ == '__main__':
+    app.run(host='127.0.0.1', port=5000)
+'''
+STUB_FRONTEND = '''<!doctype html>
+<html>
+<head><meta charset="utf-8"><title>Stub App</title></head>
+<body>
+<h1>Stub Project</h1>
+<p>This is an offline stub project generated for testing.</p>
+</body>
+</html>'''
+
+# Project returned when there is no API client
+def stub_project():
+    return {
+        'project_name': 'stub-project',
+        'description': 'Offline stub project for testing (no AI key)',
+        'backend': STUB_BACKEND,
+        'frontend': STUB_FRONTEND,
+        'setup_instructions': 'Run `python app.py` in the project folder',
+        'features': ['stub-backend', 'stub-frontend']
+    }
+
+def is_complete(result):
+    return isinstance(result, dict) and all(field in result for field in REQUIRED_FIELDS)
+
+# Cache key for a generation request
+def cache_key(prompt, framework):
+    return generation_cache.cache_key(SYSTEM_PROMPT, prompt, framework, GROQ_MODEL, GROQ_TEMPERATURE)
+
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+# Parse a complete response; raises GenerationError unless every required field is present.
+# Returns (result, truncated).
+def parse_response(response_text):
+    result, truncated = response_parser.parse_response(response_text)
+    if not is_complete(result):
+        raise GenerationError("Failed to parse AI response", response_text)
+    return result, truncated
+
+# Send a chat completion through the API key's rate limiter, retrying 429/5xx
+# responses with backoff. The limiter reserves the prompt plus max_tokens, the
+# most the request can use, so concurrent jobs can't overrun the TPM limit.
+# Returns (response, limiter, estimated_tokens) so the caller can settle the
+# reservation once the real usage is known.
+def _create(client, prompt, **options):
+    limiter = ai_client.get_limiter(getattr(client, "api_key", None))
+    estimated_tokens = ai_client.estimate_tokens(SYSTEM_PROMPT, prompt) + GROQ_MAX_TOKENS
+    response = ai_client.call_with_retries(
+        lambda: client.chat.completions.create(
+            messages=build_messages(prompt),
+            model=GROQ_MODEL,
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=GROQ_MAX_TOKENS,
+            **options
+        ),
+        limiter=limiter,
+        estimated_tokens=estimated_tokens
+    )
+    return response, limiter, estimated_tokens
+
+# Blocking request; returns (result, tokens_used, truncated)
+def complete(client, prompt):
+    chat_completion, limiter, estimated_tokens = _create(client, prompt)
+    response_text = chat_completion.choices[0].message.content
+    tokens_used = getattr(getattr(chat_completion, "usage", None), "total_tokens", 0)
+    limiter.settle(estimated_tokens, tokens_used)
+    result, truncated = parse_response(response_text)
+    return result, tokens_used, truncated
+
+def _chunk_tokens(chunk):
+    # Groq reports usage on the final chunk under x_groq; OpenAI-style clients use .usage
+    usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None)
+    return getattr(usage, "total_tokens", 0) or 0
+
+# Streaming request; on_field(key, value) is called as soon as each top-level
+# field of the JSON answer is complete. Returns (result, tokens_used, truncated).
+def stream(client, prompt, on_field=None):
+    parser = IncrementalParser()
+    parts = []
+    tokens_used = 0
+    # Only opening the stream is retried; a failure mid-stream surfaces as an error
+    chunks, limiter, estimated_tokens = _create(client, prompt, stream=True)
+    try:
+        for chunk in chunks:
+            tokens_used = _chunk_tokens(chunk) or tokens_used
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            for key, value in parser.feed(delta):
+                if on_field:
+                    on_field(key, value)
+    finally:
+        limiter.settle(estimated_tokens, tokens_used)
+
+    result = parser.close()
+    if not is_complete(result):
+        raise GenerationError("Failed to parse AI response", ''.join(parts))
+    return result, tokens_used, parser.truncated
+
+def _replay(result, on_field):
+    if on_field:
+        for key, value in result.items():
+            on_field(key, value)
+
+# Generate a project for a prompt. Returns (result, tokens_used, cached, truncated).
+# With on_field set the request is streamed and fields are reported as they complete.
+def generate(client, prompt, framework='react', use_cache=True, on_field=None):
+    if client is None:
+        result = stub_project()
+        _replay(result, on_field)
+        return result, 0, False, False
+
+    key = cache_key(prompt, framework)
+    if use_cache:
+        cached = generation_cache.get(key)
+        if cached:
+            _replay(cached[0], on_field)
+            return cached[0], 0, True, False
+
+    if on_field:
+        result, tokens_used, truncated = stream(client, prompt, on_field)
+    else:
+        result, tokens_used, truncated = complete(client, prompt)
+    # A bypassed request still refreshes the cache entry; answers cut off at
+    # max_tokens are returned for editing but never cached
+    if not truncated:
+        generation_cache.put(key, result, tokens_used)
+    return result, tokens_used, False, truncated
@@ -0,0 +1,102 @@
+# generation_cache.py - Content-addressed cache of parsed AI generations
+import hashlib
+import json
+import threading
+
+import blobs
+import db
+
+# Eviction limits; least recently used entries go first
+MAX_ENTRIES = 500
+MAX_BYTES = 64 * 1024 * 1024
+
+# Next value of the LRU clock stored in generation_cache.last_used
+_NEXT_TICK = '(SELECT COALESCE(MAX(last_used), 0) + 1 FROM generation_cache)'
+
+_counters = {'hits': 0, 'misses': 0, 'history_hits': 0}
+_lock = threading.Lock()
+
+
+# Stable key over everything that influences the model's answer
+def cache_key(system_prompt, prompt, framework, model, temperature):
+    payload = json.dumps(
+        [system_prompt, prompt, framework, model, float(temperature)],
+        ensure_ascii=False, separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+# Cached (result, tokens_used) for a key, or None. Falls back to a
+# generation_history row recorded under the same key and re-caches it.
+def get(key):
+    row = db.query_one('SELECT response, tokens_used FROM generation_cache WHERE key = ?', (key,))
+    if row:
+        db.execute(f'''
+            UPDATE generation_cache SET hits = hits + 1, last_used = {_NEXT_TICK}
+            WHERE key = ?
+        ''', (key,))
+        _count('hits')
+        return json.loads(row[0]), row[1]
+
+    row = db.query_one(f'''
+        SELECT COALESCE({blobs.text_sql('response_hash')}, response), tokens_used FROM generation_history
+        WHERE cache_key = ? ORDER BY id DESC LIMIT 1
+    ''', (key,))
+    if row and row[0]:
+        try:
+            result = json.loads(row[0])
+        except ValueError:
+            result = None
+        if result:
+            put(key, result, row[1] or 0)
+            _count('history_hits')
+            return result, row[1] or 0
+
+    _count('misses')
+    return None
+
+
+def put(key, result, tokens_used):
+    response = json.dumps(result)
+    with db.transaction() as conn:
+        conn.execute(f'''
+            INSERT OR REPLACE INTO generation_cache (key, response, tokens_used, size, last_used)
+            VALUES (?, ?, ?, ?, {_NEXT_TICK})
+        ''', (key, response, tokens_used, len(response.encode('utf-8'))))
+        evict(conn)
+
+
+# Trim the cache back under MAX_ENTRIES and MAX_BYTES
+def evict(conn, max_entries=None, max_bytes=None):
+    max_entries = MAX_ENTRIES if max_entries is None else max_entries
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    conn.execute('''
+        DELETE FROM generation_cache WHERE key IN (
+            SELECT key FROM generation_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+        )
+    ''', (max_entries,))
+    # Keep the newest entries whose running total still fits in max_bytes
+    conn.execute('''
+        DELETE FROM generation_cache WHERE key IN (
+            SELECT key FROM (
+                SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS total
+                FROM generation_cache
+            ) WHERE total > ?
+        )
+    ''', (max_bytes,))
+
+
+def clear():
+    db.execute('DELETE FROM generation_cache')
+
+
+def cache_stats():
+    entries, size = db.query_one('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generation_cache')
+    with _lock:
+        counters = dict(_counters)
+    return {**counters, 'entries': entries, 'bytes': size}
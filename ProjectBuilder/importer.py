@@ -0,0 +1,279 @@
+# importer.py - Bulk import of exported projects (JSONL, JSON array or ZIP export)
+import io
+import json
+import zipfile
+
+import blobs
+import db
+import exporter
+import stats
+
+# Records written per transaction
+IMPORT_BATCH_ROWS = 500
+
+ZIP_MAGIC = b'PK\x03\x04'
+
+PROJECT_INSERT = '''
+    INSERT INTO projects (name, description, prompt, backend_hash, frontend_hash, framework, owner_id,
+                          created_at, last_modified)
+    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+'''
+HISTORY_INSERT = '''
+    INSERT INTO generation_history (project_id, prompt, response_hash, tokens_used, cache_key, created_at)
+    VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+RUN_INSERT = '''
+    INSERT INTO project_runs (project_id, pid, port, started_at, stopped_at, status, limit_event)
+    VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?)
+'''
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.duplicates = 0
+        self.history = 0
+        self.runs = 0
+        self.errors = []            # [(record number, message)]
+
+    def summary(self):
+        parts = [f"{self.imported} imported", f"{self.duplicates} duplicate(s) skipped"]
+        if self.history:
+            parts.append(f"{self.history} history record(s)")
+        if self.runs:
+            parts.append(f"{self.runs} run(s)")
+        if self.errors:
+            parts.append(f"{len(self.errors)} error(s)")
+        return ', '.join(parts)
+
+
+# Dedup key of a project: the blob hashes of its code, whatever it is called
+def code_hash(backend, frontend):
+    return f"{blobs.content_hash(backend or '')}:{blobs.content_hash(frontend or '')}"
+
+
+def _existing_hashes():
+    # Blob hashes are stored, so no code has to be read (or decompressed);
+    # the rare row with inline code is hashed directly
+    cursor = db.connection().execute('''
+        SELECT id, backend_hash, frontend_hash,
+               CASE WHEN backend_hash IS NULL THEN backend_code END,
+               CASE WHEN frontend_hash IS NULL THEN frontend_code END
+        FROM projects
+    ''')
+    hashes = {}
+    while True:
+        batch = cursor.fetchmany(exporter.EXPORT_BATCH_ROWS)
+        if not batch:
+            return hashes
+        for project_id, backend_hash, frontend_hash, backend, frontend in batch:
+            backend_hash = backend_hash or blobs.content_hash(backend or '')
+            frontend_hash = frontend_hash or blobs.content_hash(frontend or '')
+            hashes.setdefault(f'{backend_hash}:{frontend_hash}', project_id)
+
+
+def _zip_records(archive):
+    # Project folders hold project.json plus the code files; history and runs
+    # are JSONL files at the top level
+    folders = {}
+    for name in archive.namelist():
+        folder, _, file_name = name.rpartition('/')
+        if folder.startswith('projects/') and file_name == exporter.ZIP_PROJECT_META:
+            folders[folder] = name
+    for folder in sorted(folders, key=lambda f: (len(f), f)):
+        record = json.loads(archive.read(folders[folder]))
+        for key, file_name in (('backend_code', 'app.py'), ('frontend_code', 'index.html')):
+            try:
+                record[key] = archive.read(f'{folder}/{file_name}').decode('utf-8')
+            except KeyError:
+                record[key] = ''
+        yield {'type': exporter.RECORD_PROJECT, **record}
+    names = set(archive.namelist())
+    for file_name, record_type in ((exporter.ZIP_HISTORY, exporter.RECORD_HISTORY),
+                                   (exporter.ZIP_RUNS, exporter.RECORD_RUN)):
+        if file_name in names:
+            with archive.open(file_name) as f:
+                for line in io.TextIOWrapper(f, encoding='utf-8'):
+                    if line.strip():
+                        yield {'type': record_type, **json.loads(line)}
+
+
+def _text_records(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    try:
+        first = ''
+        for first in text:
+            if first.strip():
+                break
+        stripped = first.strip()
+        if stripped.startswith('{'):
+            try:
+                record = json.loads(stripped)
+            except ValueError:
+                record = None   # a pretty-printed single project, not JSONL
+            if record is not None:
+                yield record
+                for number, line in enumerate(text, 2):
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except ValueError as e:
+                            yield _BadRecord(f"line {number}: invalid JSON ({e})")
+                return
+        # A JSON array (the old "Export Database" format) or a single project
+        # export; neither can be parsed incrementally with the standard library
+        data = json.loads(first + text.read())
+        if isinstance(data, list):
+            yield from data
+        else:
+            yield data
+    finally:
+        # The stream belongs to the caller (who may still tell() it for progress)
+        text.detach()
+
+
+class _BadRecord:
+    def __init__(self, message):
+        self.message = message
+
+
+# Records of an export given as bytes or a binary file: JSONL, a JSON array,
+# a single-project JSON file or the ZIP export
+def read_records(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    start = source.read(len(ZIP_MAGIC))
+    source.seek(0)
+    if start == ZIP_MAGIC:
+        with zipfile.ZipFile(source) as archive:
+            yield from _zip_records(archive)
+    else:
+        yield from _text_records(source)
+
+
+def _project_row(record, default_owner_id):
+    name = record.get('name')
+    if not name:
+        raise ValueError("missing project name")
+    backend = record.get('backend_code', record.get('backend')) or ''
+    frontend = record.get('frontend_code', record.get('frontend')) or ''
+    owner_id = record.get('owner_id')
+    return (
+        name, record.get('description'), record.get('prompt') or 'Imported project',
+        backend, frontend, record.get('framework') or 'react',
+        owner_id if owner_id is not None else default_owner_id,
+        record.get('created_at'), record.get('last_modified'),
+    )
+
+
+class _Batch:
+    def __init__(self):
+        self.projects = []   # [(source id, row, hash)]
+        self.history = []    # [(record number, source project id, row)]
+        self.runs = []
+
+    def __len__(self):
+        return len(self.projects) + len(self.history) + len(self.runs)
+
+
+def _flush(batch, id_map, hashes, result):
+    with db.transaction() as conn:
+        if batch.projects:
+            conn.executemany(PROJECT_INSERT, [
+                (*row[:3], blobs.put(conn, row[3]), blobs.put(conn, row[4]), *row[5:])
+                for _, row, _ in batch.projects
+            ])
+            # The inserts ran back to back under the write lock, so their ids are consecutive
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            first_id = last_id - len(batch.projects) + 1
+            for offset, (_, _, digest) in enumerate(batch.projects):
+                hashes[digest] = first_id + offset
+            result.imported += len(batch.projects)
+        for rows, sql, counter in ((batch.history, HISTORY_INSERT, 'history'), (batch.runs, RUN_INSERT, 'runs')):
+            mapped = []
+            for number, source_id, row in rows:
+                if source_id is not None and source_id not in id_map:
+                    result.errors.append((number, f"unknown project id {source_id}"))
+                    continue
+                mapped.append((hashes[id_map[source_id]] if source_id is not None else None, *row))
+            if sql is HISTORY_INSERT:
+                mapped = [(project_id, prompt, blobs.put(conn, response), *rest)
+                          for project_id, prompt, response, *rest in mapped]
+            conn.executemany(sql, mapped)
+            setattr(result, counter, getattr(result, counter) + len(mapped))
+    batch.__init__()
+
+
+# Import records (see read_records) in transactions of batch_size. Projects
+# whose code matches an existing (or earlier imported) project are skipped;
+# their history and runs are attached to that project. owner_id and
+# timestamps are kept; default_owner_id is used where a record has no owner.
+# progress(records_done) is called after each transaction.
+def import_records(records, default_owner_id=None, progress=None, batch_size=IMPORT_BATCH_ROWS):
+    result = ImportResult()
+    hashes = _existing_hashes()   # {code hash: project id}, None until its batch is written
+    id_map = {}                   # {project id in the export: code hash}
+    batch = _Batch()
+    number = 0
+    records = iter(records)
+    while True:
+        try:
+            record = next(records, None)
+        except (ValueError, zipfile.BadZipFile, UnicodeDecodeError, KeyError) as e:
+            # Whatever was read before the file turned unreadable is still imported
+            result.errors.append((number + 1, f"Unreadable import data: {e}"))
+            break
+        if record is None:
+            break
+        number += 1
+        if isinstance(record, _BadRecord):
+            result.errors.append((number, record.message))
+            continue
+        if not isinstance(record, dict):
+            result.errors.append((number, "not a JSON object"))
+            continue
+        record_type = record.get('type', exporter.RECORD_PROJECT)
+        try:
+            if record_type == exporter.RECORD_PROJECT:
+                row = _project_row(record, default_owner_id)
+                digest = code_hash(row[3], row[4])
+                if record.get('id') is not None:
+                    id_map[record['id']] = digest
+                if digest in hashes:
+                    result.duplicates += 1
+                    continue
+                # Claimed now so a duplicate later in the same batch is caught
+                hashes[digest] = None
+                batch.projects.append((record.get('id'), row, digest))
+            elif record_type == exporter.RECORD_HISTORY:
+                batch.history.append((number, record.get('project_id'), (
+                    record.get('prompt'), record.get('response'), record.get('tokens_used'),
+                    record.get('cache_key'), record.get('created_at'),
+                )))
+            elif record_type == exporter.RECORD_RUN:
+                # Runs from another instance are history; their processes aren't ours
+                status = record.get('status')
+                batch.runs.append((number, record.get('project_id'), (
+                    record.get('pid'), record.get('port'), record.get('started_at'),
+                    record.get('stopped_at') or record.get('started_at'),
+                    'stopped' if status == 'running' else status, record.get('limit_event'),
+                )))
+            elif record_type != 'export':
+                result.errors.append((number, f"unknown record type {record_type!r}"))
+        except (ValueError, TypeError) as e:
+            result.errors.append((number, str(e)))
+        if len(batch) >= batch_size:
+            _flush(batch, id_map, hashes, result)
+            if progress:
+                progress(number)
+    if len(batch):
+        _flush(batch, id_map, hashes, result)
+    if progress:
+        progress(number)
+    stats.invalidate()
+    return result
+
+
+# Import an uploaded export (bytes or binary file)
+def import_file(source, default_owner_id=None, progress=None):
+    return import_records(read_records(source), default_owner_id, progress)
@@ -0,0 +1,156 @@
+# jobs.py - Background generation jobs
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import generation
+
+# Concurrency limits (override with env vars)
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', '4'))
+MAX_PENDING_JOBS = int(os.environ.get('MAX_PENDING_JOBS', '50'))
+MAX_ACTIVE_JOBS_PER_USER = int(os.environ.get('MAX_ACTIVE_JOBS_PER_USER', '3'))
+# Tokens a user may spend per UTC day (0 = unlimited)
+DAILY_TOKEN_BUDGET = int(os.environ.get('DAILY_TOKEN_BUDGET', '200000'))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+JOB_COLUMNS = ('id', 'owner_id', 'prompt', 'request_prompt', 'framework', 'cache_key', 'status',
+               'result', 'tokens_used', 'cached', 'truncated', 'error', 'created_at', 'started_at', 'finished_at')
+
+
+class JobQueue:
+    # Bounded worker pool that runs generation.generate off the Streamlit script
+    # thread. Job state lives in the generation_jobs table, so a rerun (or a new
+    # browser session) just polls get_job() and picks up the result; fields of
+    # streamed answers are kept in memory while the job runs.
+    def __init__(self, workers=GENERATION_WORKERS, max_pending=MAX_PENDING_JOBS,
+                 max_per_user=MAX_ACTIVE_JOBS_PER_USER, daily_token_budget=DAILY_TOKEN_BUDGET):
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.daily_token_budget = daily_token_budget
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='generation')
+        self._lock = threading.Lock()
+        self._active = {}     # {job_id: owner_id}
+        self._progress = {}   # {job_id: {field: value}} for running streamed jobs
+
+    # Queue a generation; returns (job_id, error)
+    def submit(self, client, prompt, request_prompt=None, framework='react', owner_id=None,
+               use_cache=True, stream=True):
+        request_prompt = request_prompt or prompt
+        with self._lock:
+            if len(self._active) >= self.max_pending:
+                return None, "Too many generations in progress, please try again shortly"
+            if owner_id is not None and list(self._active.values()).count(owner_id) >= self.max_per_user:
+                return None, f"You already have {self.max_per_user} generations in progress"
+            if (owner_id is not None and self.daily_token_budget
+                    and tokens_used_today(owner_id) >= self.daily_token_budget):
+                return None, f"Daily token budget of {self.daily_token_budget:,} tokens reached, try again tomorrow"
+            cursor = db.execute('''
+                INSERT INTO generation_jobs (owner_id, prompt, request_prompt, framework, cache_key, status)
+                VALUES (?, ?, ?, ?, ?, 'queued')
+            ''', (owner_id, prompt, request_prompt, framework, generation.cache_key(request_prompt, framework)))
+            job_id = cursor.lastrowid
+            self._active[job_id] = owner_id
+            self._progress[job_id] = {}
+        self._executor.submit(self._run, job_id, client, request_prompt, framework, use_cache, stream)
+        return job_id, None
+
+    def _run(self, job_id, client, prompt, framework, use_cache, stream):
+        # Everything after submit() is inside the try, so a job never stays
+        # 'queued' and its _active/_progress entries are always dropped
+        try:
+            db.execute('''
+                UPDATE generation_jobs SET status = 'running', started_at = CURRENT_TIMESTAMP WHERE id = ?
+            ''', (job_id,))
+            on_field = self._progress[job_id].__setitem__ if stream else None
+            result, tokens_used, cached, truncated = generation.generate(
+                client, prompt, framework, use_cache=use_cache, on_field=on_field
+            )
+            db.execute('''
+                UPDATE generation_jobs
+                SET status = 'done', result = ?, tokens_used = ?, cached = ?, truncated = ?,
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (json.dumps(result), tokens_used, int(cached), int(truncated), job_id))
+        except Exception as e:
+            if isinstance(e, generation.GenerationError):
+                error = str(e)
+            else:
+                error = f"Error generating code: {type(e).__name__}: {e}"
+            db.execute('''
+                UPDATE generation_jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (error, job_id))
+        finally:
+            with self._lock:
+                self._active.pop(job_id, None)
+                self._progress.pop(job_id, None)
+
+    # Fields streamed so far for a running job
+    def progress(self, job_id):
+        return dict(self._progress.get(job_id, {}))
+
+    def active_count(self):
+        with self._lock:
+            return len(self._active)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def _job_from_row(row):
+    if row is None:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job['cached'] = bool(job['cached'])
+    job['truncated'] = bool(job['truncated'])
+    return job
+
+
+def get_job(job_id):
+    row = db.query_one(f"SELECT {', '.join(JOB_COLUMNS)} FROM generation_jobs WHERE id = ?", (job_id,))
+    return _job_from_row(row)
+
+# Most recent jobs for a user, newest first (without results, which can be large)
+def list_jobs(owner_id, limit=10):
+    columns = ', '.join('NULL' if c == 'result' else c for c in JOB_COLUMNS)
+    rows = db.query_all(f'''
+        SELECT {columns} FROM generation_jobs
+        WHERE owner_id IS ? ORDER BY id DESC LIMIT ?
+    ''', (owner_id, limit))
+    return [_job_from_row(row) for row in rows]
+
+# Tokens spent on model calls by a user since midnight UTC. Every uncached
+# generation is a job, including ones never saved to generation_history.
+def tokens_used_today(owner_id):
+    return db.query_one('''
+        SELECT COALESCE(SUM(tokens_used), 0) FROM generation_jobs
+        WHERE owner_id = ? AND cached = 0 AND created_at >= date('now')
+    ''', (owner_id,))[0]
+
+# Jobs left queued or running by a previous process can never finish
+def fail_interrupted_jobs():
+    cursor = db.execute(f'''
+        UPDATE generation_jobs
+        SET status = 'failed', error = 'Interrupted by a server restart', finished_at = CURRENT_TIMESTAMP
+        WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})
+    ''', ACTIVE_STATUSES)
+    return cursor.rowcount
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+# Process-wide job queue, created on first use
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                fail_interrupted_jobs()
+                _queue = JobQueue()
+    return _queue
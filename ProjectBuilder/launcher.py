@@ -0,0 +1,170 @@
+# launcher.py - Starting and stopping generated projects, singly or in bulk
+import concurrent.futures
+import os
+import subprocess
+
+import ports
+import project_files
+import repository
+import resource_limits
+import run_modes
+import shared_host
+import supervisor
+
+# Projects prepared (files written, ports reserved) concurrently by start_many()
+BULK_WORKERS = int(os.environ.get('BULK_LAUNCH_WORKERS', '8'))
+
+
+def project_dir(project_id):
+    return f"./projects/project_{project_id}"
+
+
+class PreparedLaunch:
+    def __init__(self, project_id, port, project_dir, spawn=None, host=None):
+        self.project_id = project_id
+        self.port = port
+        self.project_dir = project_dir
+        self.spawn = spawn    # None for shared-host projects
+        self.host = host
+
+
+# Reserve a port and write a project's files. Returns (PreparedLaunch, error).
+def prepare(project_id):
+    project = repository.get_project(project_id)
+    if not project:
+        return None, "Project not found"
+
+    directory = project_dir(project_id)
+    os.makedirs(directory, exist_ok=True)
+
+    run_mode, workers, threads = repository.get_run_settings(project_id)
+    run_mode = run_mode or run_modes.DEFAULT_RUN_MODE
+
+    if run_mode == 'shared':
+        # Mounted in the in-process shared host under /p/<id>/; no process or port
+        # of its own, so no isolation either: refuse rather than ignore its limits
+        if resource_limits.Limits.from_row(repository.get_resource_limits(project_id)).any():
+            return None, "Shared mode can't enforce resource limits; clear this project's limits or pick another run mode"
+        try:
+            host = shared_host.get_host()
+        except OSError as e:
+            return None, f"Shared host failed to start: {e}"
+        port = host.port
+        api_base = f'/p/{project_id}'
+    else:
+        # Reserve a port (the previous one if it's free, so cached transforms
+        # still apply); stop() (or a failed launch) gives it back
+        host = None
+        port = ports.get_allocator().allocate(project_id, preferred=project[9])
+        if not port:
+            return None, "No available ports"
+        api_base = f'http://localhost:{port}'
+
+    # Transforms are cached per code hash (and port for the frontend), and files
+    # are only rewritten when their content changed, so re-running is nearly free
+    try:
+        project_files.materialize(directory, {
+            "app.py": project_files.transform_backend(project[4] or ''),
+            "index.html": project_files.transform_frontend(project[5] or '', port, api_base, run_mode == 'shared'),
+            "Dockerfile": project_files.dockerfile(project),
+            run_modes.SERVE_SCRIPT_NAME: run_modes.SERVE_SCRIPT,
+        })
+    except OSError as e:
+        if host is None:
+            ports.get_allocator().release(port)
+        return None, f"Failed to write project files: {e}"
+
+    if host is not None:
+        return PreparedLaunch(project_id, port, directory, host=host), None
+
+    # By default the app is served by a WSGI server without the reloader; debug mode is opt-in
+    argv, run_env = run_modes.command(port, run_mode, workers, threads)
+    # Memory, CPU and open-file limits (and a cgroup where available) keep one
+    # runaway app from starving the host and the other projects; an exec shim
+    # applies them in the child
+    limits = resource_limits.Limits.from_row(repository.get_resource_limits(project_id))
+    argv = resource_limits.wrap(argv, limits, resource_limits.prepare_cgroup(project_id, limits))
+
+    def spawn():
+        return subprocess.Popen(
+            argv,
+            cwd=directory,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env={**os.environ, **run_env, 'PYTHONUNBUFFERED': '1'}
+        )
+
+    return PreparedLaunch(project_id, port, directory, spawn=spawn), None
+
+
+# Start one project; returns (port, error)
+def start(project_id):
+    return start_many([project_id])[project_id]
+
+
+# Start many projects: their files are written on a thread pool, then every
+# app is spawned under the supervisor (which restarts crashed apps and frees
+# ports on stop) and waited on together. Returns {project_id: (port, error)}.
+def start_many(project_ids, max_workers=BULK_WORKERS):
+    project_ids = list(dict.fromkeys(project_ids))
+    if not project_ids:
+        return {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(project_ids))) as pool:
+        prepared = dict(zip(project_ids, pool.map(prepare, project_ids)))
+
+    results = {}
+    shared = []
+    launches = []
+    for project_id, (launch, error) in prepared.items():
+        if error:
+            results[project_id] = (None, error)
+        elif launch.host is not None:
+            shared.append(launch)
+        else:
+            launches.append(launch)
+
+    for launch in shared:
+        launch.host.register(launch.project_id, launch.project_dir)
+        results[launch.project_id] = (launch.port, None)
+    repository.record_runs([(l.project_id, os.getpid(), l.port) for l in shared])
+
+    started = supervisor.get_supervisor().start_many(
+        [(l.project_id, l.port, l.project_dir, l.spawn) for l in launches]
+    )
+    for launch in launches:
+        pid, error = started[launch.project_id]
+        if error:
+            ports.get_allocator().release(launch.port)
+            results[launch.project_id] = (None, error)
+        else:
+            results[launch.project_id] = (launch.port, None)
+    return results
+
+
+# URL of a running project; shared-host projects are mounted under /p/<id>/
+def url(project_id, port):
+    host = shared_host.current_host()
+    if host and host.is_registered(project_id):
+        return host.url(project_id).replace('127.0.0.1', 'localhost')
+    return f"http://localhost:{port}"
+
+
+# Stop one project; False if it wasn't running
+def stop(project_id):
+    return stop_many([project_id])[project_id]
+
+
+# Stop many projects with one shared SIGTERM grace period (see
+# Supervisor.stop_many). Returns {project_id: stopped}.
+def stop_many(project_ids):
+    project_ids = list(dict.fromkeys(project_ids))
+    host = shared_host.current_host()
+    unmounted = [pid for pid in project_ids if host and host.unregister(pid)]
+    repository.record_stops([(project_id, os.getpid()) for project_id in unmounted])
+    results = {project_id: True for project_id in unmounted}
+    results.update(supervisor.get_supervisor().stop_many(
+        [project_id for project_id in project_ids if project_id not in results]
+    ))
+    return results
@@ -0,0 +1,366 @@
+# migrations.py - Versioned schema migrations tracked with PRAGMA user_version
+import sqlite3
+import threading
+
+import blobs
+import db
+
+
+def _create_base_tables(conn):
+    # Projects table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            prompt TEXT NOT NULL,
+            backend_code TEXT,
+            frontend_code TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'created',
+            port INTEGER,
+            framework TEXT DEFAULT 'react'
+        )
+    ''')
+
+    # Project runs table for tracking deployments
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS project_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER,
+            pid INTEGER,
+            port INTEGER,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            stopped_at TIMESTAMP,
+            status TEXT DEFAULT 'running',
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+
+    # Template history for learning from past generations
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS generation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER,
+            prompt TEXT,
+            response TEXT,
+            tokens_used INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _add_project_owner(conn):
+    # Databases created before versioning may already have the column
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(projects)")]
+    if 'owner_id' not in columns:
+        conn.execute("ALTER TABLE projects ADD COLUMN owner_id INTEGER")
+
+
+def _add_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_owner_created ON projects (owner_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_project_runs_project_status ON project_runs (project_id, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_project_runs_pid ON project_runs (pid)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_history_project ON generation_history (project_id)")
+
+
+FTS_COLUMNS = 'name, description, prompt, backend_code, frontend_code'
+
+
+def _add_project_search(conn):
+    # External-content FTS5 index over projects; the triggers keep it in sync.
+    # SQLite builds without FTS5 skip this step and search falls back to LIKE.
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                {FTS_COLUMNS},
+                content='projects', content_rowid='id', tokenize='unicode61'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        if 'fts5' not in str(e):
+            raise
+        return
+    new_values = ', '.join(f'new.{c}' for c in FTS_COLUMNS.split(', '))
+    old_values = ', '.join(f'old.{c}' for c in FTS_COLUMNS.split(', '))
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS projects_fts_insert AFTER INSERT ON projects BEGIN
+            INSERT INTO projects_fts (rowid, {FTS_COLUMNS}) VALUES (new.id, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON projects BEGIN
+            INSERT INTO projects_fts (projects_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    # Only content columns re-index; status/port updates from run/stop don't touch the index
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS projects_fts_update AFTER UPDATE OF {FTS_COLUMNS} ON projects BEGIN
+            INSERT INTO projects_fts (projects_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO projects_fts (rowid, {FTS_COLUMNS}) VALUES (new.id, {new_values});
+        END
+    """)
+    conn.execute("INSERT INTO projects_fts (projects_fts) VALUES ('rebuild')")
+
+
+def _add_stats_indexes(conn):
+    # Lets the aggregate counters be answered without reading project rows
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_status ON projects (status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at)")
+
+
+def _add_generation_cache(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS generation_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            tokens_used INTEGER,
+            size INTEGER NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used INTEGER NOT NULL  -- logical LRU clock, larger is more recent
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_cache_last_used ON generation_cache (last_used)")
+    # History rows remember which cache entry produced them so they can refill it
+    conn.execute("ALTER TABLE generation_history ADD COLUMN cache_key TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_history_cache_key ON generation_history (cache_key)")
+
+
+def _add_generation_jobs(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS generation_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner_id INTEGER,
+            prompt TEXT NOT NULL,
+            request_prompt TEXT NOT NULL,
+            framework TEXT,
+            cache_key TEXT,
+            status TEXT DEFAULT 'queued',
+            result TEXT,
+            tokens_used INTEGER,
+            cached INTEGER DEFAULT 0,
+            truncated INTEGER DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_jobs_owner ON generation_jobs (owner_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs (status)")
+
+
+def _add_port_reservations(conn):
+    # A row per port handed to a launched project; the primary key makes
+    # reservation atomic across threads and processes
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS port_reservations (
+            port INTEGER PRIMARY KEY,
+            project_id INTEGER,
+            pid INTEGER,
+            reserved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_port_reservations_project ON port_reservations (project_id)")
+
+
+def _add_run_settings(conn):
+    # NULL means the defaults in run_modes.py
+    conn.execute("ALTER TABLE projects ADD COLUMN run_mode TEXT")
+    conn.execute("ALTER TABLE projects ADD COLUMN wsgi_workers INTEGER")
+    conn.execute("ALTER TABLE projects ADD COLUMN wsgi_threads INTEGER")
+
+
+def _add_resource_limits(conn):
+    # NULL means the defaults in resource_limits.py
+    for column in ('memory_mb', 'cpu_seconds', 'max_open_files', 'nice_level', 'cpu_percent'):
+        conn.execute(f"ALTER TABLE projects ADD COLUMN {column} INTEGER")
+    # Set when a run ended because it hit one of its limits ('cpu', 'memory', 'open_files')
+    conn.execute("ALTER TABLE project_runs ADD COLUMN limit_event TEXT")
+
+
+BLOB_BATCH_ROWS = 200
+
+
+def _move_to_blobs(conn, table, columns):
+    # Text columns -> hash references into blobs, a batch of rows at a time
+    last_id = 0
+    while True:
+        rows = conn.execute(f'''
+            SELECT id, {', '.join(text for text, _ in columns)} FROM {table}
+            WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, BLOB_BATCH_ROWS)).fetchall()
+        if not rows:
+            return
+        updates = [(*(blobs.put(conn, value) for value in row[1:]), row[0]) for row in rows]
+        assignments = ', '.join(f'{ref} = ?, {text} = NULL' for text, ref in columns)
+        conn.executemany(f'UPDATE {table} SET {assignments} WHERE id = ?', updates)
+        last_id = rows[-1][0]
+
+
+def _fts_values(row):
+    return (f"{row}.name, {row}.description, {row}.prompt, "
+            f"{blobs.text_sql(row + '.backend_hash')}, {blobs.text_sql(row + '.frontend_hash')}")
+
+
+def _add_blob_store(conn):
+    # Code and AI responses move into a content-addressed table of compressed
+    # blobs, so identical texts (shared boilerplate, a response saved twice)
+    # are stored once. The old text columns stay, NULL, for older readers.
+    blobs.register(conn)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,   -- sha256 of the text
+            data BLOB NOT NULL,      -- codec tag + compressed text (see blobs.py)
+            size INTEGER NOT NULL    -- uncompressed bytes
+        )
+    ''')
+    conn.execute("ALTER TABLE projects ADD COLUMN backend_hash TEXT")
+    conn.execute("ALTER TABLE projects ADD COLUMN frontend_hash TEXT")
+    conn.execute("ALTER TABLE generation_history ADD COLUMN response_hash TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_backend_hash ON projects (backend_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_frontend_hash ON projects (frontend_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_history_response_hash ON generation_history (response_hash)")
+
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'"
+    ).fetchone() is not None
+    for trigger in ('projects_fts_insert', 'projects_fts_delete', 'projects_fts_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    _move_to_blobs(conn, 'projects', [('backend_code', 'backend_hash'), ('frontend_code', 'frontend_hash')])
+    _move_to_blobs(conn, 'generation_history', [('response', 'response_hash')])
+    if not has_fts:
+        return
+
+    # The index reads code through a view that decompresses it
+    conn.execute("DROP TABLE projects_fts")
+    conn.execute(f'''
+        CREATE VIEW IF NOT EXISTS projects_content AS
+        SELECT id, name, description, prompt,
+               {blobs.text_sql('backend_hash')} AS backend_code,
+               {blobs.text_sql('frontend_hash')} AS frontend_code
+        FROM projects
+    ''')
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE projects_fts USING fts5(
+            {FTS_COLUMNS},
+            content='projects_content', content_rowid='id', tokenize='unicode61'
+        )
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER projects_fts_insert AFTER INSERT ON projects BEGIN
+            INSERT INTO projects_fts (rowid, {FTS_COLUMNS}) VALUES (new.id, {_fts_values('new')});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER projects_fts_delete AFTER DELETE ON projects BEGIN
+            INSERT INTO projects_fts (projects_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {_fts_values('old')});
+        END
+    """)
+    # Blobs a row stops using are released after its UPDATE, so the old text is still readable here
+    conn.execute(f"""
+        CREATE TRIGGER projects_fts_update
+        AFTER UPDATE OF name, description, prompt, backend_hash, frontend_hash ON projects BEGIN
+            INSERT INTO projects_fts (projects_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {_fts_values('old')});
+            INSERT INTO projects_fts (rowid, {FTS_COLUMNS}) VALUES (new.id, {_fts_values('new')});
+        END
+    """)
+    conn.execute("INSERT INTO projects_fts (projects_fts) VALUES ('rebuild')")
+
+
+def _add_project_versions(conn):
+    # Every save of a project's code; *_ref is a blob holding the full text
+    # when *_depth is 0, otherwise a delta against the previous version (see versions.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS project_versions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            source TEXT,
+            backend_ref TEXT,
+            backend_depth INTEGER NOT NULL DEFAULT 0,
+            backend_size INTEGER,
+            frontend_ref TEXT,
+            frontend_depth INTEGER NOT NULL DEFAULT 0,
+            frontend_size INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (project_id, version),
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_project_versions_backend_ref ON project_versions (backend_ref)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_project_versions_frontend_ref ON project_versions (frontend_ref)")
+
+
+# Ordered list of (version, migration). Append new steps; never edit applied ones.
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _add_project_owner),
+    (3, _add_indexes),
+    (4, _add_project_search),
+    (5, _add_stats_indexes),
+    (6, _add_generation_cache),
+    (7, _add_generation_jobs),
+    (8, _add_port_reservations),
+    (9, _add_run_settings),
+    (10, _add_resource_limits),
+    (11, _add_blob_store),
+    (12, _add_project_versions),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Apply every migration newer than the database's user_version
+def migrate(conn):
+    applied = []
+    # BEGIN IMMEDIATE takes the write lock up front so two processes starting
+    # together can't both run the same step
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = get_version(conn)
+        for version, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            applied.append(version)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return applied
+
+
+_migrated = set()
+_lock = threading.Lock()
+
+
+# Run migrations at most once per process and database file
+def ensure_schema():
+    path = db.get_pool().path
+    if path in _migrated:
+        return
+    with _lock:
+        if path in _migrated:
+            return
+        conn = db.connection()
+        if get_version(conn) < LATEST_VERSION:
+            migrate(conn)
+        _migrated.add(path)
@@ -0,0 +1,181 @@
+# ports.py - Port allocation for launched projects
+import collections
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+
+import db
+
+
+def _port_range():
+    start, _, end = os.environ.get('PROJECT_PORT_RANGE', '5000-5999').partition('-')
+    return int(start), int(end or start)
+
+
+# Ports handed to launched projects (override with PROJECT_PORT_RANGE=first-last)
+PORT_RANGE = _port_range()
+
+# A reservation that never got a PID after this long belongs to a failed launch
+STALE_RESERVATION_SECONDS = 120
+
+
+def pid_alive(pid):
+    if not pid:
+        return False
+    if sys.platform == 'win32':
+        # os.kill(pid, 0) would terminate the process on Windows
+        output = subprocess.run(['tasklist', '/FI', f'PID eq {pid}', '/NH'],
+                                capture_output=True, text=True).stdout
+        return str(pid) in output
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _can_bind(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(('127.0.0.1', port))
+        except OSError:
+            return False
+    return True
+
+
+class PortAllocator:
+    # Hands out ports from [start, end] without scanning. Free ports wait in a
+    # deque (entries no longer in _free_set are stale and skipped); the
+    # port_reservations table is the source of truth shared with other
+    # processes, and a port is only returned once its row is inserted, so two
+    # launches can never be given the same port.
+    def __init__(self, start=PORT_RANGE[0], end=PORT_RANGE[1]):
+        self.start = start
+        self.end = end
+        self._lock = threading.Lock()
+        self._free = collections.deque()
+        self._free_set = set()
+        self._load()
+
+    def _load(self):
+        reserved = {row[0] for row in db.query_all(
+            'SELECT port FROM port_reservations WHERE port BETWEEN ? AND ?', (self.start, self.end)
+        )}
+        self._free = collections.deque(p for p in range(self.start, self.end + 1) if p not in reserved)
+        self._free_set = set(self._free)
+
+    def _push(self, port):
+        if self.start <= port <= self.end and port not in self._free_set:
+            self._free.append(port)
+            self._free_set.add(port)
+
+    # Reserve a free port for a project, preferring `preferred` (e.g. the port
+    # it last ran on) when that is free; returns None when the range is exhausted
+    def allocate(self, project_id, preferred=None):
+        with self._lock:
+            if preferred in self._free_set and self._reserve(preferred, project_id):
+                return preferred
+            port = self._take(project_id)
+            if port is None:
+                # Reservations of crashed processes may be holding the range
+                self._reconcile()
+                port = self._take(project_id)
+            return port
+
+    def _take(self, project_id):
+        for _ in range(len(self._free)):
+            port = self._free.popleft()
+            if port in self._free_set and self._reserve(port, project_id):
+                return port
+        return None
+
+    # Reserve a port from the free set; False if another process or program has it
+    def _reserve(self, port, project_id):
+        self._free_set.discard(port)
+        try:
+            db.execute('INSERT INTO port_reservations (port, project_id) VALUES (?, ?)', (port, project_id))
+        except sqlite3.IntegrityError:
+            # Reserved by another process; reconcile() brings it back once released
+            return False
+        if not _can_bind(port):
+            # Taken by something outside the app; retry it later
+            db.execute('DELETE FROM port_reservations WHERE port = ?', (port,))
+            self._push(port)
+            return False
+        return True
+
+    # Record the PID serving a reserved port
+    def attach(self, port, pid):
+        self.attach_many([(port, pid)])
+
+    def attach_many(self, port_pids):
+        with db.transaction() as conn:
+            conn.executemany('UPDATE port_reservations SET pid = ? WHERE port = ?',
+                             [(pid, port) for port, pid in port_pids])
+
+    def release(self, port):
+        with self._lock:
+            db.execute('DELETE FROM port_reservations WHERE port = ?', (port,))
+            self._push(port)
+
+    # Release every port reserved for a project
+    def release_project(self, project_id):
+        return self.release_projects([project_id])
+
+    def release_projects(self, project_ids):
+        if not project_ids:
+            return []
+        placeholders = ', '.join('?' for _ in project_ids)
+        with self._lock:
+            with db.transaction() as conn:
+                ports = [row[0] for row in conn.execute(
+                    f'SELECT port FROM port_reservations WHERE project_id IN ({placeholders})', list(project_ids)
+                )]
+                conn.execute(f'DELETE FROM port_reservations WHERE project_id IN ({placeholders})', list(project_ids))
+            for port in ports:
+                self._push(port)
+            return ports
+
+    # Drop reservations whose process is gone (or never started) and rebuild
+    # the free list from the table. Returns the released ports.
+    def reconcile(self):
+        with self._lock:
+            return self._reconcile()
+
+    def _reconcile(self):
+        rows = db.query_all('''
+            SELECT port, pid, reserved_at < datetime('now', ?) FROM port_reservations
+        ''', (f'-{STALE_RESERVATION_SECONDS} seconds',))
+        stale = [port for port, pid, expired in rows if (pid and not pid_alive(pid)) or (not pid and expired)]
+        if stale:
+            with db.transaction() as conn:
+                conn.executemany('DELETE FROM port_reservations WHERE port = ?', [(p,) for p in stale])
+        self._load()
+        return stale
+
+    def free_count(self):
+        with self._lock:
+            return len(self._free_set)
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+# Process-wide allocator, reconciled against live PIDs when first created
+def get_allocator():
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                allocator = PortAllocator()
+                allocator.reconcile()
+                _allocator = allocator
+    return _allocator
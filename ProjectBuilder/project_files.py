@@ -0,0 +1,148 @@
+# project_files.py - Renders and writes a project's runnable files
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import backend_transform
+
+# Hashes of the files last written to a project directory
+MANIFEST_NAME = '.materialized.json'
+
+# Transformed frontends kept in memory, keyed by code hash and launch parameters
+MAX_CACHED_TRANSFORMS = 256
+
+_transforms = collections.OrderedDict()
+_manifests = {}   # {abs project dir: {file name: [sha256, size, mtime_ns]}}
+_lock = threading.Lock()
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _cached(key, build):
+    with _lock:
+        if key in _transforms:
+            _transforms.move_to_end(key)
+            return _transforms[key]
+    value = build()
+    with _lock:
+        _transforms[key] = value
+        while len(_transforms) > MAX_CACHED_TRANSFORMS:
+            _transforms.popitem(last=False)
+    return value
+
+
+# Point the generated page's API calls at api_base
+def _transform_frontend(frontend_code, port, api_base, shared):
+    if shared:
+        frontend_code = frontend_code.replace('http://localhost:5000', api_base)
+        frontend_code = frontend_code.replace('http://127.0.0.1:5000', api_base)
+        # The generator's own `const API_BASE_URL = window.location.origin;`
+        # has to point at the project's mount on the shared host
+        frontend_code = frontend_code.replace('window.location.origin', f"(window.location.origin + '{api_base}')")
+    frontend_code = frontend_code.replace('localhost:5000', f'localhost:{port}')
+    frontend_code = frontend_code.replace('127.0.0.1:5000', f'127.0.0.1:{port}')
+
+    # Also handle relative URLs like '/todos' -> need to update API base
+    if "fetch('/" in frontend_code or 'fetch("/' in frontend_code:
+        # Inject the API base at the top of script tags, as a window property so
+        # a page that declares its own `const API_BASE_URL` still parses (and wins)
+        if "<script" in frontend_code:
+            frontend_code = frontend_code.replace(
+                "<script",
+                f"<script>\nwindow.API_BASE_URL = '{api_base}';\n</script>\n<script",
+                1
+            )
+            # Update fetch calls to use API_BASE_URL, keeping each call's own quotes
+            frontend_code = frontend_code.replace("fetch('/", "fetch(API_BASE_URL + '/")
+            frontend_code = frontend_code.replace('fetch("/', 'fetch(API_BASE_URL + "/')
+    return frontend_code
+
+
+# The backend reads its port from the environment, so it only depends on the code
+# (backend_transform caches it by code hash)
+def transform_backend(backend_code):
+    return backend_transform.transform(backend_code)
+
+
+def transform_frontend(frontend_code, port, api_base, shared=False):
+    return _cached(('frontend', content_hash(frontend_code), port, api_base, shared),
+                   lambda: _transform_frontend(frontend_code, port, api_base, shared))
+
+
+def _atomic_write(path, data):
+    # Write to a temp file in the same directory and rename it into place, so
+    # a running app (or a crash mid-write) never sees a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _load_manifest(project_dir):
+    manifest = _manifests.get(project_dir)
+    if manifest is None:
+        try:
+            with open(os.path.join(project_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        _manifests[project_dir] = manifest
+    return manifest
+
+
+def _unchanged_on_disk(path, entry):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stat.st_size == entry[1] and stat.st_mtime_ns == entry[2]
+
+
+# Write {file name: text} into project_dir, skipping files whose content hash
+# matches the last write and that haven't been touched since. Returns the
+# names of the files actually written.
+def materialize(project_dir, files):
+    project_dir = os.path.abspath(project_dir)
+    os.makedirs(project_dir, exist_ok=True)
+    with _lock:
+        manifest = _load_manifest(project_dir)
+        written = []
+        for name, text in files.items():
+            data = text.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            path = os.path.join(project_dir, name)
+            entry = manifest.get(name)
+            if entry and entry[0] == digest and _unchanged_on_disk(path, entry):
+                continue
+            _atomic_write(path, data)
+            stat = os.stat(path)
+            manifest[name] = [digest, stat.st_size, stat.st_mtime_ns]
+            written.append(name)
+        if written:
+            _atomic_write(os.path.join(project_dir, MANIFEST_NAME), json.dumps(manifest).encode('utf-8'))
+    return written
+
+
+# Simple Dockerfile for a project (also included in exports)
+def dockerfile(project):
+    return '''# Simple Dockerfile for Flask app
+FROM python:3.12-slim
+WORKDIR /app
+COPY . /app
+RUN pip install --no-cache-dir flask flask_cors
+ENV PYTHONUNBUFFERED=1
+EXPOSE 5000
+CMD ["python","app.py"]
+'''
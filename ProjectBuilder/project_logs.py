@@ -0,0 +1,103 @@
+# project_logs.py - Output capture for launched projects
+import os
+import threading
+
+from readiness import OutputWatcher
+
+LOG_FILE_NAME = 'app.log'
+# The log file is rotated to app.log.1 ... app.log.<LOG_BACKUPS> past MAX_LOG_BYTES
+MAX_LOG_BYTES = int(os.environ.get('PROJECT_LOG_MAX_BYTES', str(1024 * 1024)))
+LOG_BACKUPS = 2
+# Most recent output kept in memory per process for the log panel
+BUFFER_BYTES = int(os.environ.get('PROJECT_LOG_BUFFER_BYTES', str(64 * 1024)))
+
+
+def log_path(project_dir):
+    return os.path.join(project_dir, LOG_FILE_NAME)
+
+
+class LogCapture(OutputWatcher):
+    # Drains a child's combined stdout/stderr so a chatty app can never block
+    # on a full pipe. Every line goes to a rotating log file in the project
+    # directory; the last buffer_bytes are kept in memory for tailing.
+    def __init__(self, stream, path, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS, buffer_bytes=BUFFER_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_bytes = buffer_bytes
+        self._lock = threading.Lock()
+        self._buffered = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        self._file_size = self._file.tell()
+        super().__init__(stream, max_lines=None)
+
+    def _handle(self, line):
+        with self._lock:
+            self.lines.append(line)
+            self._buffered += len(line)
+            while self._buffered > self.buffer_bytes and len(self.lines) > 1:
+                self._buffered -= len(self.lines.popleft())
+        try:
+            if self._file_size and self._file_size + len(line) > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._file.flush()
+            self._file_size += len(line)
+        except OSError:
+            # A full or missing disk must not stop the pipe from being drained
+            pass
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file_size = 0
+
+    def _finish(self):
+        self._file.close()
+
+    def text(self):
+        with self._lock:
+            return ''.join(self.lines)
+
+
+_captures = {}
+_lock = threading.Lock()
+
+
+# Start draining a launched process's stdout (stderr merged into it)
+def start_capture(project_id, process, project_dir):
+    capture = LogCapture(process.stdout, log_path(project_dir))
+    with _lock:
+        _captures[project_id] = capture
+    return capture
+
+
+def get_capture(project_id):
+    with _lock:
+        return _captures.get(project_id)
+
+
+# Last max_bytes of a project's output: from memory while this server captures
+# it, otherwise from the end of its log file
+def tail(project_id, project_dir, max_bytes=BUFFER_BYTES):
+    capture = get_capture(project_id)
+    if capture is not None:
+        return capture.text()[-max_bytes:]
+    try:
+        with open(log_path(project_dir), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - max_bytes))
+            data = f.read()
+    except OSError:
+        return ''
+    text = data.decode('utf-8', errors='replace')
+    if size > max_bytes:
+        # Drop the partial first line
+        text = text.partition('\n')[2]
+    return text
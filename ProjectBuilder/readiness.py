@@ -0,0 +1,113 @@
+# readiness.py - Wait for launched projects to start serving
+import collections
+import http.client
+import os
+import socket
+import threading
+import time
+
+# Overall time a launch may take before it is reported as failed
+READINESS_TIMEOUT = float(os.environ.get('READINESS_TIMEOUT', '15'))
+# Probe intervals grow from FIRST_INTERVAL, doubling up to MAX_INTERVAL
+FIRST_INTERVAL = 0.05
+MAX_INTERVAL = 0.5
+PROBE_TIMEOUT = 0.5
+
+# Printed by the Flask/werkzeug dev server once its socket is bound
+READY_MARKER = 'Running on'
+
+
+class OutputWatcher:
+    # Drains a child's output stream on a daemon thread, keeping the last lines
+    # and setting .ready when the server announces it is listening
+    def __init__(self, stream, max_lines=200):
+        self.lines = collections.deque(maxlen=max_lines)
+        self.ready = threading.Event()
+        self.closed = threading.Event()
+        self._thread = threading.Thread(target=self._drain, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def _drain(self, stream):
+        try:
+            for line in stream:
+                self._handle(line)
+                if READY_MARKER in line:
+                    self.ready.set()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._finish()
+            self.closed.set()
+
+    # Called for every line read; subclasses add their own sinks
+    def _handle(self, line):
+        self.lines.append(line)
+
+    def _finish(self):
+        pass
+
+    def text(self):
+        return ''.join(self.lines)
+
+
+def port_open(port, host='127.0.0.1', timeout=PROBE_TIMEOUT):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+# True once path answers with anything but a server error
+def health_ok(port, path, host='127.0.0.1', timeout=PROBE_TIMEOUT):
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        return conn.getresponse().status < 500
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+
+def _probe(port, health_path):
+    return health_ok(port, health_path) if health_path else port_open(port)
+
+
+# Block until every launch serves, exits or times out. launches is a list of
+# (port, process, watcher); watcher may be None. Returns {port: (ready, error)}.
+def wait_for_launches(launches, timeout=READINESS_TIMEOUT, health_path=None):
+    deadline = time.monotonic() + timeout
+    pending = {port: (process, watcher) for port, process, watcher in launches}
+    results = {}
+    interval = FIRST_INTERVAL
+    while pending:
+        for port, (process, watcher) in list(pending.items()):
+            if _probe(port, health_path):
+                results[port] = (True, None)
+            elif process is not None and process.poll() is not None:
+                results[port] = (False, f"exited with code {process.returncode}")
+            else:
+                continue
+            del pending[port]
+        if not pending:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            for port in pending:
+                results[port] = (False, f"not serving after {timeout:g}s")
+            break
+        # Sleep until the next probe, waking early when a server reports it is up
+        wait = min(interval, remaining)
+        watchers = [w for _, w in pending.values() if w is not None and not w.ready.is_set()]
+        if len(watchers) == 1 and len(pending) == 1:
+            watchers[0].ready.wait(wait)
+        else:
+            time.sleep(wait)
+        interval = min(interval * 2, MAX_INTERVAL)
+    return results
+
+
+# Wait for a single launch; returns (ready, error)
+def wait_until_ready(port, process=None, watcher=None, timeout=READINESS_TIMEOUT, health_path=None):
+    return wait_for_launches([(port, process, watcher)], timeout, health_path)[port]
@@ -0,0 +1,306 @@
+# repository.py - Data access helpers for users, projects, runs and history
+import re
+import sqlite3
+
+from werkzeug.security import generate_password_hash
+
+import blobs
+import db
+import stats
+import versions
+
+
+# Create user; returns None if the email is already registered
+def create_user(email, password):
+    pw_hash = generate_password_hash(password)
+    try:
+        cursor = db.execute('INSERT INTO users (email, password_hash) VALUES (?, ?)', (email, pw_hash))
+    except sqlite3.IntegrityError:
+        return None
+    return cursor.lastrowid
+
+def get_user_by_email(email):
+    return db.query_one('SELECT id, email, password_hash FROM users WHERE email = ?', (email,))
+
+# Save project to database; the code goes to the blob store
+def save_project(name, description, prompt, backend, frontend, framework='react', owner_id=None):
+    with db.transaction() as conn:
+        cursor = conn.execute('''
+            INSERT INTO projects (name, description, prompt, backend_hash, frontend_hash, framework, owner_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (name, description, prompt, blobs.put(conn, backend), blobs.put(conn, frontend),
+              framework, owner_id or None))
+        versions.record(conn, cursor.lastrowid, backend, frontend, source='created')
+    stats.invalidate()
+    return cursor.lastrowid
+
+# Full project rows: id, name, description, prompt, backend_code, frontend_code,
+# created_at, last_modified, status, port, framework, owner_id. Rows written
+# before the blob store (or by older code) still have their code inline.
+PROJECT_COLUMNS = ('id, name, description, prompt, backend_hash, frontend_hash, created_at, last_modified, '
+                   'status, port, framework, owner_id, backend_code, frontend_code')
+
+def _with_code(conn, row):
+    if row is None:
+        return None
+    backend = blobs.get(conn, row[4]) if row[4] else row[12]
+    frontend = blobs.get(conn, row[5]) if row[5] else row[13]
+    return (*row[:4], backend, frontend, *row[6:12])
+
+# Get all projects
+def get_all_projects():
+    conn = db.connection()
+    rows = conn.execute(f'SELECT {PROJECT_COLUMNS} FROM projects ORDER BY created_at DESC').fetchall()
+    return [_with_code(conn, row) for row in rows]
+
+# Columns needed to render a project in a list (no code blobs)
+PROJECT_SUMMARY_COLUMNS = 'id, name, description, created_at, last_modified, status, port, framework, owner_id'
+_SUMMARY_SELECT = ', '.join(f'p.{c}' for c in PROJECT_SUMMARY_COLUMNS.split(', '))
+
+PROJECT_SORTS = {
+    'recent': 'p.created_at DESC, p.id DESC',
+    'oldest': 'p.created_at ASC, p.id ASC',
+    'name': 'p.name COLLATE NOCASE ASC, p.id ASC',
+}
+
+# Full-text column weights for bm25: name, description, prompt, backend, frontend
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 1.0)
+
+def has_fts():
+    return db.query_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'") is not None
+
+# Turn free text into an FTS5 query: every word must match, as a prefix
+def fts_query(text):
+    terms = re.findall(r'\w+', text or '')
+    return ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _project_filters(owner_id=None, search=None, status=None):
+    clauses, params = [], []
+    if owner_id is not None:
+        # Projects created before sign-in existed have no owner and stay visible to everyone
+        clauses.append('(p.owner_id = ? OR p.owner_id IS NULL)')
+        params.append(owner_id)
+    if search:
+        match = fts_query(search) if has_fts() else ''
+        if match:
+            clauses.append('p.id IN (SELECT rowid FROM projects_fts WHERE projects_fts MATCH ?)')
+            params.append(match)
+        else:
+            pattern = f"%{_escape_like(search)}%"
+            clauses.append("(p.name LIKE ? ESCAPE '\\' OR p.description LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+    if status == 'running':
+        clauses.append("p.status = 'running'")
+    elif status == 'stopped':
+        clauses.append("(p.status IS NULL OR p.status != 'running')")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, params
+
+# One page of project summaries; status is 'running', 'stopped' or None for all
+def list_projects(owner_id=None, search=None, status=None, sort='recent', limit=20, offset=0):
+    where, params = _project_filters(owner_id, search, status)
+    order_by = PROJECT_SORTS.get(sort, PROJECT_SORTS['recent'])
+    return db.query_all(
+        f'SELECT {_SUMMARY_SELECT} FROM projects p {where} ORDER BY {order_by} LIMIT ? OFFSET ?',
+        (*params, limit, offset),
+    )
+
+# Number of projects matching the same filters as list_projects
+def count_projects(owner_id=None, search=None, status=None):
+    where, params = _project_filters(owner_id, search, status)
+    return db.query_one(f'SELECT COUNT(*) FROM projects p {where}', params)[0]
+
+# Ranked full-text search over name, description, prompt and code.
+# Rows are the summary columns followed by a highlighted snippet of the best matching column.
+def search_projects(query, owner_id=None, status=None, sort='relevance', limit=20, offset=0):
+    match = fts_query(query)
+    if not match:
+        return []
+    where, params = _project_filters(owner_id, None, status)
+    where = f"{where} AND projects_fts MATCH ?" if where else "WHERE projects_fts MATCH ?"
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    order_by = f'bm25(projects_fts, {weights})' if sort == 'relevance' else PROJECT_SORTS.get(sort, PROJECT_SORTS['recent'])
+    return db.query_all(f'''
+        SELECT {_SUMMARY_SELECT}, snippet(projects_fts, -1, '**', '**', '…', 16)
+        FROM projects_fts JOIN projects p ON p.id = projects_fts.rowid
+        {where}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+    ''', (*params, match, limit, offset))
+
+# Get project by ID
+def get_project(project_id):
+    conn = db.connection()
+    return _with_code(conn, conn.execute(f'SELECT {PROJECT_COLUMNS} FROM projects WHERE id = ?', (project_id,)).fetchone())
+
+def _blob_hashes(conn, project_id):
+    hashes = list(conn.execute('SELECT backend_hash, frontend_hash FROM projects WHERE id = ?', (project_id,)).fetchone() or ())
+    hashes += [row[0] for row in conn.execute(
+        'SELECT response_hash FROM generation_history WHERE project_id = ?', (project_id,)
+    )]
+    return hashes + versions.blob_refs(conn, project_id)
+
+# Delete project
+def delete_project(project_id):
+    with db.transaction() as conn:
+        hashes = _blob_hashes(conn, project_id)
+        conn.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+        conn.execute('DELETE FROM project_runs WHERE project_id = ?', (project_id,))
+        conn.execute('DELETE FROM generation_history WHERE project_id = ?', (project_id,))
+        conn.execute('DELETE FROM project_versions WHERE project_id = ?', (project_id,))
+        blobs.release(conn, hashes)
+    stats.invalidate()
+
+# Update project; every save becomes a new version (see versions.py).
+# Returns the new version number, or None if the code didn't change.
+def update_project(project_id, backend_code, frontend_code, source='edit'):
+    with db.transaction() as conn:
+        old = conn.execute('SELECT backend_hash, frontend_hash FROM projects WHERE id = ?', (project_id,)).fetchone()
+        if old and not versions.latest_version(conn, project_id):
+            # Projects saved before versioning (or imported) get their current code as version 1
+            current = _with_code(conn, conn.execute(
+                f'SELECT {PROJECT_COLUMNS} FROM projects WHERE id = ?', (project_id,)
+            ).fetchone())
+            versions.record(conn, project_id, current[4], current[5], source='baseline')
+        version = versions.record(conn, project_id, backend_code, frontend_code, source=source)
+        conn.execute('''
+            UPDATE projects
+            SET backend_hash = ?, frontend_hash = ?, backend_code = NULL, frontend_code = NULL,
+                last_modified = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (blobs.put(conn, backend_code), blobs.put(conn, frontend_code), project_id))
+        if old:
+            blobs.release(conn, old)
+    return version
+
+# Replace a project's code with one of its versions (recorded as a new version).
+# Returns (new version or None if the code already matched it, error).
+def restore_project_version(project_id, version):
+    texts = versions.get_version(project_id, version)
+    if texts is None:
+        return None, "That version is no longer available"
+    return update_project(project_id, texts[0], texts[1], source=f'restore v{version}'), None
+
+# Record generation history for a saved project
+def save_generation_history(project_id, prompt, response, tokens_used, cache_key=None):
+    with db.transaction() as conn:
+        cursor = conn.execute('''
+            INSERT INTO generation_history (project_id, prompt, response_hash, tokens_used, cache_key)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (project_id, prompt, blobs.put(conn, response), tokens_used, cache_key))
+    stats.invalidate()
+    return cursor.lastrowid
+
+# (run_mode, wsgi_workers, wsgi_threads) for a project; None values mean the defaults
+def get_run_settings(project_id):
+    return db.query_one('SELECT run_mode, wsgi_workers, wsgi_threads FROM projects WHERE id = ?', (project_id,))
+
+def update_run_settings(project_id, run_mode, workers, threads):
+    db.execute('''
+        UPDATE projects SET run_mode = ?, wsgi_workers = ?, wsgi_threads = ? WHERE id = ?
+    ''', (run_mode, workers, threads, project_id))
+
+# (memory_mb, cpu_seconds, max_open_files, nice_level, cpu_percent); NULLs mean the defaults
+def get_resource_limits(project_id):
+    return db.query_one('''
+        SELECT memory_mb, cpu_seconds, max_open_files, nice_level, cpu_percent FROM projects WHERE id = ?
+    ''', (project_id,))
+
+def update_resource_limits(project_id, memory_mb, cpu_seconds, max_open_files, nice_level, cpu_percent):
+    db.execute('''
+        UPDATE projects
+        SET memory_mb = ?, cpu_seconds = ?, max_open_files = ?, nice_level = ?, cpu_percent = ?
+        WHERE id = ?
+    ''', (memory_mb, cpu_seconds, max_open_files, nice_level, cpu_percent, project_id))
+
+# Limit that ended the project's most recent run, if any
+def get_last_limit_event(project_id):
+    row = db.query_one('''
+        SELECT limit_event FROM project_runs WHERE project_id = ? ORDER BY id DESC LIMIT 1
+    ''', (project_id,))
+    return row[0] if row else None
+
+# Record a launched process and mark the project as running
+def record_run(project_id, pid, port):
+    record_runs([(project_id, pid, port)])
+
+# Record many (project_id, pid, port) launches in one transaction
+def record_runs(runs):
+    if not runs:
+        return
+    with db.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO project_runs (project_id, pid, port, status)
+            VALUES (?, ?, ?, 'running')
+        ''', runs)
+        conn.executemany('UPDATE projects SET port = ?, status = ? WHERE id = ?',
+                         [(port, 'running', project_id) for project_id, _, port in runs])
+    stats.invalidate()
+
+# {project_id: pid} of the most recent running process of each project
+def get_running_pids(project_ids):
+    if not project_ids:
+        return {}
+    rows = db.query_all(f'''
+        SELECT project_id, pid FROM project_runs
+        WHERE status = 'running' AND project_id IN ({', '.join('?' for _ in project_ids)})
+        ORDER BY started_at, id
+    ''', list(project_ids))
+    return dict(rows)
+
+# Mark a run and its project as stopped; status 'crashed' records an unexpected
+# exit and limit_event the resource limit that caused it
+def record_stop(project_id, pid, status='stopped', limit_event=None):
+    record_stops([(project_id, pid)], status, limit_event)
+
+# Mark many (project_id, pid) runs as stopped in one transaction. Both are
+# matched: every shared-host run is recorded under the server's own pid.
+def record_stops(stops, status='stopped', limit_event=None):
+    if not stops:
+        return
+    with db.transaction() as conn:
+        conn.executemany('''
+            UPDATE project_runs
+            SET status = ?, limit_event = ?, stopped_at = CURRENT_TIMESTAMP
+            WHERE project_id = ? AND pid = ? AND status = 'running'
+        ''', [(status, limit_event, project_id, pid) for project_id, pid in stops])
+        conn.executemany('UPDATE projects SET status = ? WHERE id = ?',
+                         [('stopped', project_id) for project_id, _ in stops])
+    stats.invalidate()
+
+# Mark runs whose process is gone as crashed and projects without a live run as
+# stopped. is_alive(pid) decides; returns the (project_id, pid) pairs marked.
+def reconcile_runs(is_alive):
+    with db.transaction() as conn:
+        runs = conn.execute('''
+            SELECT id, project_id, pid FROM project_runs WHERE status = 'running'
+        ''').fetchall()
+        dead = [(run_id, project_id, pid) for run_id, project_id, pid in runs if not is_alive(pid)]
+        conn.executemany('''
+            UPDATE project_runs SET status = 'crashed', stopped_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', [(run_id,) for run_id, _, _ in dead])
+        conn.execute('''
+            UPDATE projects SET status = 'stopped'
+            WHERE status = 'running' AND id NOT IN (
+                SELECT project_id FROM project_runs WHERE status = 'running' AND project_id IS NOT NULL
+            )
+        ''')
+    stats.invalidate()
+    return [(project_id, pid) for _, project_id, pid in dead]
+
+# (blob count, stored bytes, uncompressed bytes) of the code blob store
+def get_blob_usage():
+    return blobs.usage(db.connection())
+
+# Remove all projects, runs and history
+def clear_all_data():
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM projects")
+        conn.execute("DELETE FROM project_runs")
+        conn.execute("DELETE FROM generation_history")
+        conn.execute("DELETE FROM project_versions")
+        conn.execute("DELETE FROM blobs")
+    stats.invalidate()
@@ -0,0 +1,191 @@
+# resource_limits.py - CPU, memory and file limits for launched projects
+import json
+import os
+import signal
+import sys
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+
+def _env_int(name, default):
+    value = os.environ.get(name, default)
+    return int(value) if value else None
+
+
+# Defaults for projects without their own limits (empty or 0 means unlimited).
+# All are off unless the operator sets them, so existing projects run as
+# before until limits are configured here or in a project's Run settings.
+# Without a cgroup, memory is capped as address space (RLIMIT_AS), which counts
+# reserved as well as used memory, so leave headroom (1024 MB suits a small
+# Flask app). CPU seconds are the total a process may use, so they suit
+# runaway-loop protection more than steady-state serving; cpu_percent needs
+# cgroup v2.
+DEFAULT_MEMORY_MB = _env_int('PROJECT_MEMORY_MB', '')
+DEFAULT_CPU_SECONDS = _env_int('PROJECT_CPU_SECONDS', '')
+DEFAULT_MAX_OPEN_FILES = _env_int('PROJECT_MAX_OPEN_FILES', '')
+DEFAULT_NICE = _env_int('PROJECT_NICE', '')
+DEFAULT_CPU_PERCENT = _env_int('PROJECT_CPU_PERCENT', '')
+# Processes (and threads) allowed per project's cgroup
+CGROUP_MAX_PIDS = _env_int('PROJECT_MAX_PIDS', '64')
+
+# Parent cgroup (v2) each project gets a child of, e.g. /sys/fs/cgroup/project_builder;
+# it must exist and be writable (delegated) for cgroup placement to happen
+CGROUP_ROOT = os.environ.get('PROJECT_CGROUP_ROOT', '')
+CGROUP_PERIOD_US = 100000
+
+# Seconds of CPU between the soft limit (SIGXCPU) and the hard limit (SIGKILL)
+CPU_GRACE_SECONDS = 5
+
+# Values of project_runs.limit_event
+LIMIT_CPU = 'cpu'
+LIMIT_MEMORY = 'memory'
+LIMIT_FILES = 'open_files'
+
+
+class Limits:
+    def __init__(self, memory_mb=None, cpu_seconds=None, max_open_files=None, nice=None, cpu_percent=None):
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.max_open_files = max_open_files
+        self.nice = nice
+        self.cpu_percent = cpu_percent
+
+    # From a (memory_mb, cpu_seconds, max_open_files, nice, cpu_percent) row;
+    # NULL columns fall back to the defaults
+    @classmethod
+    def from_row(cls, row):
+        row = row or (None,) * 5
+        defaults = (DEFAULT_MEMORY_MB, DEFAULT_CPU_SECONDS, DEFAULT_MAX_OPEN_FILES, DEFAULT_NICE, DEFAULT_CPU_PERCENT)
+        return cls(*(default if value is None else value for value, default in zip(row, defaults)))
+
+    # Whether any limit is set (None and 0 mean unlimited)
+    def any(self):
+        return any((self.memory_mb, self.cpu_seconds, self.max_open_files, self.nice, self.cpu_percent))
+
+
+def _cgroup_write(path, name, value):
+    with open(os.path.join(path, name), 'w') as f:
+        f.write(value)
+
+
+def _cgroup_dir(project_id):
+    return os.path.join(CGROUP_ROOT, f'project_{project_id}')
+
+
+# A project's existing cgroup, if it has one
+def cgroup_path(project_id):
+    if not CGROUP_ROOT:
+        return None
+    path = _cgroup_dir(project_id)
+    return path if os.path.isdir(path) else None
+
+
+# Create (or update) a project's cgroup under CGROUP_ROOT; returns its path,
+# or None when cgroup v2 isn't available to this process
+def prepare_cgroup(project_id, limits):
+    if not CGROUP_ROOT or not sys.platform.startswith('linux'):
+        return None
+    path = _cgroup_dir(project_id)
+    try:
+        os.makedirs(path, exist_ok=True)
+        if limits.memory_mb:
+            _cgroup_write(path, 'memory.max', str(limits.memory_mb * 1024 * 1024))
+        if limits.cpu_percent:
+            quota = CGROUP_PERIOD_US * limits.cpu_percent // 100
+            _cgroup_write(path, 'cpu.max', f'{quota} {CGROUP_PERIOD_US}')
+        if CGROUP_MAX_PIDS:
+            _cgroup_write(path, 'pids.max', str(CGROUP_MAX_PIDS))
+    except OSError:
+        return None
+    return path
+
+
+# OOM kills the kernel has made in a project's cgroup
+def cgroup_oom_kills(cgroup):
+    if not cgroup:
+        return 0
+    try:
+        with open(os.path.join(cgroup, 'memory.events')) as f:
+            for line in f:
+                key, _, value = line.partition(' ')
+                if key == 'oom_kill':
+                    return int(value)
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+# This file doubles as the exec shim that applies limits to a launched app
+SHIM = os.path.abspath(__file__)
+
+
+# argv wrapped in the exec shim (`python resource_limits.py <spec> <argv...>`),
+# which joins the cgroup, renices and sets rlimits in its own process and then
+# execs the app, keeping the same pid. Nothing runs between fork and exec in
+# the (heavily threaded) parent, unlike a preexec_fn. argv is returned as is
+# when there is nothing to apply or the platform has no rlimits.
+def wrap(argv, limits, cgroup=None):
+    if resource is None:
+        return list(argv)
+    rlimits = []
+    # A cgroup caps actual memory use, which is the better measure
+    if limits.memory_mb and not cgroup:
+        size = limits.memory_mb * 1024 * 1024
+        rlimits.append(('RLIMIT_AS', size, size))
+    if limits.cpu_seconds:
+        rlimits.append(('RLIMIT_CPU', limits.cpu_seconds, limits.cpu_seconds + CPU_GRACE_SECONDS))
+    if limits.max_open_files:
+        rlimits.append(('RLIMIT_NOFILE', limits.max_open_files, limits.max_open_files))
+    spec = {'cgroup': cgroup, 'nice': limits.nice or 0, 'rlimits': rlimits}
+    if not (cgroup or spec['nice'] or rlimits):
+        return list(argv)
+    return [sys.executable, SHIM, json.dumps(spec), *argv]
+
+
+# Apply a wrap() spec to this process; a limit the host can't grant is
+# skipped rather than failing the launch
+def _apply(spec):
+    if spec.get('cgroup'):
+        try:
+            _cgroup_write(spec['cgroup'], 'cgroup.procs', str(os.getpid()))
+        except OSError:
+            pass
+    if spec.get('nice'):
+        try:
+            os.nice(spec['nice'])
+        except OSError:
+            pass
+    for name, soft, hard in spec.get('rlimits', ()):
+        try:
+            resource.setrlimit(getattr(resource, name), (soft, hard))
+        except (OSError, ValueError):
+            pass
+
+
+def main(args):
+    spec, argv = json.loads(args[0]), args[1:]
+    _apply(spec)
+    os.execvp(argv[0], argv)
+
+
+# Which limit (if any) ended a process, judged from its exit status, the
+# tail of its output and the cgroup's OOM counter (oom_kills_before is the
+# counter when the process started)
+def limit_event(returncode, output='', cgroup=None, oom_kills_before=0):
+    sigxcpu = getattr(signal, 'SIGXCPU', None)
+    if sigxcpu is not None and returncode == -sigxcpu:
+        return LIMIT_CPU
+    if cgroup_oom_kills(cgroup) > oom_kills_before:
+        return LIMIT_MEMORY
+    if 'MemoryError' in output or 'Cannot allocate memory' in output:
+        return LIMIT_MEMORY
+    if 'Too many open files' in output:
+        return LIMIT_FILES
+    return None
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
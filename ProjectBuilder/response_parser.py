@@ -0,0 +1,270 @@
+# response_parser.py - Incremental JSON parsing of model responses
+import json
+import re
+
+# A run of string content whose escapes can be decoded in one json.loads call:
+# plain characters, simple escapes, BMP \u escapes and complete surrogate pairs.
+# Anything else (a run cut mid-escape, lone surrogates) takes the slow path.
+_STRING_RUN = re.compile(
+    r'(?:[^"\\]+'
+    r'|\\["\\/bfnrt]'
+    r'|\\u(?![dD][89a-fA-F])[0-9a-fA-F]{4}'
+    r'|\\u[dD][89abAB][0-9a-fA-F]{2}\\u[dD][c-fC-F][0-9a-fA-F]{2})+'
+)
+_WHITESPACE = ' \t\r\n'
+_LITERAL_END = ',:}] \t\r\n'
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+# Characters that may follow a closing quote; any other quote is part of the string
+_AFTER_STRING = ',:}]'
+# Python-style literals some models emit instead of JSON ones
+_PY_LITERALS = {'True': True, 'False': False, 'None': None}
+
+
+class IncrementalParser:
+    # Resumable parser for the JSON object in a model response. Text is fed in
+    # arbitrary chunks (e.g. streamed deltas); every call to feed() returns the
+    # top-level (key, value) pairs that were completed by that chunk, so the UI
+    # can show "project_name" long before "frontend" has arrived.
+    #
+    # The parser is deliberately tolerant of what models get wrong:
+    # - anything before the first '{' (prose, a ```json fence) and after the
+    #   closing '}' is ignored
+    # - raw newlines and tabs inside strings are kept as-is
+    # - trailing or repeated commas are skipped
+    # - a '"' that isn't followed by , : } ] or the end of input is an
+    #   unescaped quote inside the string, not its end
+    # - truncated output keeps every field parsed so far, including the
+    #   partial string that was cut off (see close() and .truncated)
+
+    def __init__(self):
+        self.state = 'start'
+        self.stack = []        # [[container, pending key], ...]
+        self.root = None
+        self._buf = []         # pieces of the current string or literal
+        self._is_key = False
+        self._hex = ''
+        self._high_surrogate = None
+        self._pending_quote = ''   # closing-quote candidate plus whitespace seen after it
+        self.truncated = False
+
+    @property
+    def done(self):
+        return self.state == 'done'
+
+    # Top-level object parsed so far (complete fields only until done)
+    @property
+    def result(self):
+        if self.root is not None:
+            return self.root
+        return self.stack[0][0] if self.stack else None
+
+    def feed(self, chunk):
+        completed = []
+        i, n = 0, len(chunk)
+        while i < n:
+            state = self.state
+            if state == 'string':
+                run = _STRING_RUN.match(chunk, i)
+                if run:
+                    self._flush_surrogate()
+                    text = run.group()
+                    if '\\' in text:
+                        text = json.loads('"' + text + '"', strict=False)
+                    self._buf.append(text)
+                    i = run.end()
+                elif chunk[i] == '"':
+                    self._pending_quote = '"'
+                    self.state = 'quote'
+                    i += 1
+                else:
+                    self.state = 'escape'
+                    i += 1
+                continue
+            c = chunk[i]
+            if state == 'quote':
+                # Decide whether the last quote closed the string
+                if c in _WHITESPACE:
+                    self._pending_quote += c
+                    i += 1
+                elif c in _AFTER_STRING:
+                    self._pending_quote = ''
+                    self._end_string(completed)
+                else:
+                    self._buf.append(self._pending_quote)
+                    self._pending_quote = ''
+                    self.state = 'string'
+                continue
+            if state == 'escape':
+                if c == 'u':
+                    self.state = 'unicode'
+                    self._hex = ''
+                else:
+                    self._flush_surrogate()
+                    self._buf.append(_ESCAPES.get(c, c))
+                    self.state = 'string'
+                i += 1
+            elif state == 'unicode':
+                self._hex += c
+                i += 1
+                if len(self._hex) == 4:
+                    self._add_code_unit(self._hex)
+                    self.state = 'string'
+            elif state == 'literal':
+                if c in _LITERAL_END:
+                    self._end_literal(completed)
+                else:
+                    self._buf.append(c)
+                    i += 1
+            elif state == 'done':
+                break
+            elif c in _WHITESPACE:
+                i += 1
+            elif state == 'start':
+                if c == '{':
+                    self._open({})
+                i += 1
+            elif state == 'key':
+                if c == '"':
+                    self._start_string(is_key=True)
+                elif c == '}':
+                    self._close(completed)
+                i += 1
+            elif state == 'colon':
+                if c == ':':
+                    self.state = 'value'
+                i += 1
+            elif state == 'value':
+                self._start_value(c, completed)
+                i += 1 if self.state != 'literal' else 0
+            elif state == 'after':
+                if c == ',':
+                    self.state = 'key' if isinstance(self.stack[-1][0], dict) else 'value'
+                elif c in '}]':
+                    self._close(completed)
+                i += 1
+        return completed
+
+    # Finish parsing at end of input and return the parsed object (or None).
+    # If the input stopped inside the object, whatever was open is closed and
+    # .truncated is set.
+    def close(self):
+        if self.state == 'quote':
+            self._pending_quote = ''
+            self._end_string([])
+        elif self.state == 'literal':
+            self._end_literal([])
+        elif self.state in ('string', 'escape', 'unicode') and self.stack:
+            self.truncated = True
+            if not self._is_key:
+                self._end_string([])
+        if self.stack:
+            self.truncated = True
+            while self.stack:
+                self._close([])
+        return self.result
+
+    def _start_value(self, c, completed):
+        if c == '"':
+            self._start_string(is_key=False)
+        elif c == '{':
+            self._open({})
+        elif c == '[':
+            self._open([])
+        elif c == ']' and self.stack and isinstance(self.stack[-1][0], list):
+            self._close(completed)
+        elif c not in ',}]':
+            self.state = 'literal'
+            self._buf = []
+
+    def _start_string(self, is_key):
+        self.state = 'string'
+        self._is_key = is_key
+        self._buf = []
+
+    def _end_string(self, completed):
+        self._flush_surrogate()
+        text = ''.join(self._buf)
+        self._buf = []
+        if self._is_key:
+            self.stack[-1][1] = text
+            self.state = 'colon'
+        else:
+            self._add_value(text, completed)
+
+    def _end_literal(self, completed):
+        token = ''.join(self._buf)
+        self._buf = []
+        if token in _PY_LITERALS:
+            value = _PY_LITERALS[token]
+        else:
+            try:
+                value = json.loads(token)
+            except ValueError:
+                value = token
+        self._add_value(value, completed)
+
+    def _add_code_unit(self, hex_digits):
+        try:
+            unit = int(hex_digits, 16)
+        except ValueError:
+            self._flush_surrogate()
+            self._buf.append('\\u' + hex_digits)
+            return
+        if 0xD800 <= unit < 0xDC00:
+            self._flush_surrogate()
+            self._high_surrogate = unit
+        elif 0xDC00 <= unit < 0xE000 and self._high_surrogate is not None:
+            self._buf.append(chr(0x10000 + ((self._high_surrogate - 0xD800) << 10) + (unit - 0xDC00)))
+            self._high_surrogate = None
+        else:
+            self._flush_surrogate()
+            self._buf.append(chr(unit))
+
+    def _flush_surrogate(self):
+        # A high surrogate not followed by a low one can't be decoded
+        if self._high_surrogate is not None:
+            self._buf.append('\ufffd')
+            self._high_surrogate = None
+
+    def _open(self, container):
+        self.stack.append([container, None])
+        self.state = 'key' if isinstance(container, dict) else 'value'
+
+    def _close(self, completed):
+        container = self.stack.pop()[0]
+        if not self.stack:
+            self.root = container
+            self.state = 'done'
+        else:
+            self._add_value(container, completed)
+
+    def _add_value(self, value, completed):
+        if not self.stack:
+            return
+        container, key = self.stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+            if len(self.stack) == 1:
+                completed.append((key, value))
+        else:
+            container.append(value)
+        self.state = 'after'
+
+
+# Parse a complete model response. Valid JSON takes the fast path through
+# json.loads; anything else gets one tolerant pass of IncrementalParser.
+# Returns (result, truncated); result is None if no object was found.
+def parse_response(text):
+    cleaned = text.strip()
+    if cleaned.startswith('{'):
+        try:
+            result = json.loads(cleaned)
+        except ValueError:
+            pass
+        else:
+            if isinstance(result, dict):
+                return result, False
+    parser = IncrementalParser()
+    parser.feed(text)
+    result = parser.close()
+    return (result if isinstance(result, dict) else None), parser.truncated
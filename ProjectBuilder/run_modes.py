@@ -0,0 +1,93 @@
+# run_modes.py - How a generated project's Flask app is served
+import importlib.util
+import os
+import sys
+
+# 'wsgi' serves the app with a production WSGI server and no reloader;
+# 'debug' runs app.py directly (Flask debug server with the reloader);
+# 'shared' mounts the app in the in-process shared host (see shared_host.py)
+RUN_MODES = ('wsgi', 'debug', 'shared')
+DEFAULT_RUN_MODE = os.environ.get('PROJECT_RUN_MODE', 'wsgi')
+DEFAULT_WORKERS = int(os.environ.get('PROJECT_WSGI_WORKERS', '1'))
+DEFAULT_THREADS = int(os.environ.get('PROJECT_WSGI_THREADS', '4'))
+
+SERVE_SCRIPT_NAME = 'serve.py'
+
+# Written next to app.py; imports the generated `app` object and serves it
+# with waitress when installed, otherwise werkzeug's threaded server (and says
+# so in the app's log)
+SERVE_SCRIPT = '''# serve.py - Serves app.py without the debug reloader (generated by Project Builder)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app import app
+
+host = os.environ.get('HOST', '127.0.0.1')
+port = int(os.environ.get('PORT', '5000'))
+threads = int(os.environ.get('WSGI_THREADS', '4'))
+if int(os.environ.get('WSGI_WORKERS', '1')) > 1:
+    print(" * Serving in one process: several workers need gunicorn", file=sys.stderr, flush=True)
+
+try:
+    from waitress import serve
+except ImportError:
+    print(" * waitress is not installed; falling back to werkzeug's threaded server", file=sys.stderr, flush=True)
+    from werkzeug.serving import run_simple
+    run_simple(host, port, app, threaded=True, use_reloader=False, use_debugger=False)
+else:
+    print(f" * Running on http://{host}:{port} (waitress, {threads} threads)", file=sys.stderr, flush=True)
+    serve(app, host=host, port=port, threads=threads)
+'''
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def _use_gunicorn(workers):
+    return workers > 1 and sys.platform != 'win32' and _installed('gunicorn')
+
+
+# (server description, warning or None) for the Run settings panel: which
+# server command() will use, and which settings it can't honour here
+def describe(run_mode=None, workers=None, threads=None):
+    run_mode = run_mode or DEFAULT_RUN_MODE
+    workers = workers or DEFAULT_WORKERS
+    threads = threads or DEFAULT_THREADS
+    if run_mode == 'debug':
+        return "Flask debug server with the reloader", None
+    if run_mode == 'shared':
+        return "shared in-process host", None
+    if _use_gunicorn(workers):
+        return f"gunicorn, {workers} workers × {threads} threads", None
+    warnings = []
+    if workers > 1:
+        warnings.append(f"{workers} workers need gunicorn (not available here); serving in one process")
+    if _installed('waitress'):
+        server = f"waitress, {threads} threads"
+    else:
+        server = "werkzeug threaded server"
+        warnings.append("waitress is not installed, so the development server is used")
+    return server, '; '.join(warnings) or None
+
+
+# (argv, extra environment) that serves a project on port. Several workers use
+# gunicorn's threaded workers where it is available (not on Windows).
+def command(port, run_mode=None, workers=None, threads=None):
+    run_mode = run_mode or DEFAULT_RUN_MODE
+    workers = workers or DEFAULT_WORKERS
+    threads = threads or DEFAULT_THREADS
+    env = {'PORT': str(port), 'HOST': '127.0.0.1', 'WSGI_THREADS': str(threads), 'WSGI_WORKERS': str(workers)}
+    if run_mode == 'debug':
+        return [sys.executable, 'app.py'], env
+    if _use_gunicorn(workers):
+        return [
+            sys.executable, '-m', 'gunicorn',
+            '--workers', str(workers),
+            '--threads', str(threads),
+            '--worker-class', 'gthread',
+            '--bind', f'127.0.0.1:{port}',
+            'app:app',
+        ], env
+    return [sys.executable, SERVE_SCRIPT_NAME], env
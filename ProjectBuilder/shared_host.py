@@ -0,0 +1,201 @@
+# shared_host.py - One in-process WSGI server hosting many generated projects
+import importlib.util
+import os
+import socketserver
+import sys
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+# Port of the shared host (override with SHARED_HOST_PORT; 0 picks a free one)
+SHARED_HOST_PORT = int(os.environ.get('SHARED_HOST_PORT', '8600'))
+# Loaded apps unused for this long are unloaded; they load again on the next request
+SHARED_IDLE_TIMEOUT = float(os.environ.get('SHARED_IDLE_TIMEOUT', '600'))
+UNLOAD_CHECK_INTERVAL = 30.0
+
+MOUNT_PREFIX = '/p/'
+
+
+class LoadError(Exception):
+    pass
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LoadedApp:
+    def __init__(self, app, module_name):
+        self.app = app
+        self.module_name = module_name
+        self.last_used = time.monotonic()
+
+
+def module_name(project_id):
+    return f'project_builder_app_{project_id}'
+
+
+# Import projects/project_<id>/app.py as its own module and return its Flask `app`
+def load_app(project_id, project_dir):
+    name = module_name(project_id)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(project_dir, 'app.py'))
+    if spec is None:
+        raise LoadError(f"No app.py in {project_dir}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException as e:
+        sys.modules.pop(name, None)
+        raise LoadError(f"Failed to import app.py: {type(e).__name__}: {e}") from e
+    app = getattr(module, 'app', None)
+    if not callable(app):
+        sys.modules.pop(name, None)
+        raise LoadError("app.py does not define a WSGI `app`")
+    return app
+
+
+def _respond(start_response, status, body, content_type='text/plain; charset=utf-8', headers=()):
+    start_response(status, [('Content-Type', content_type), ('Content-Length', str(len(body))), *headers])
+    return [body]
+
+
+class SharedHost:
+    # WSGI dispatcher mounting each registered project under /p/<id>/. The
+    # project's index.html is served straight from its directory; everything
+    # else goes to its Flask app, imported on first use (SCRIPT_NAME carries the
+    # mount point, so url_for works) and unloaded again when idle.
+    def __init__(self, idle_timeout=SHARED_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.server = None
+        self.port = None
+        self._projects = {}     # {project_id: project_dir}
+        self._apps = {}         # {project_id: LoadedApp}
+        self._load_locks = {}   # {project_id: Lock} so an app is imported once
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def register(self, project_id, project_dir):
+        with self._lock:
+            self._projects[project_id] = os.path.abspath(project_dir)
+            # Re-registering picks up rewritten code on the next request
+            self._unload(project_id)
+
+    def unregister(self, project_id):
+        with self._lock:
+            self._unload(project_id)
+            self._load_locks.pop(project_id, None)
+            return self._projects.pop(project_id, None) is not None
+
+    def is_registered(self, project_id):
+        with self._lock:
+            return project_id in self._projects
+
+    def loaded(self):
+        with self._lock:
+            return sorted(self._apps)
+
+    def url(self, project_id):
+        return f'http://127.0.0.1:{self.port}{MOUNT_PREFIX}{project_id}/'
+
+    def _unload(self, project_id):
+        loaded = self._apps.pop(project_id, None)
+        if loaded:
+            sys.modules.pop(loaded.module_name, None)
+
+    def unload_idle(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [pid for pid, loaded in self._apps.items() if now - loaded.last_used > self.idle_timeout]
+            for project_id in idle:
+                self._unload(project_id)
+        return idle
+
+    def _get_app(self, project_id, project_dir):
+        with self._lock:
+            loaded = self._apps.get(project_id)
+            if loaded:
+                loaded.last_used = time.monotonic()
+                return loaded.app
+            load_lock = self._load_locks.setdefault(project_id, threading.Lock())
+        with load_lock:
+            with self._lock:
+                loaded = self._apps.get(project_id)
+            if loaded:
+                return loaded.app
+            app = load_app(project_id, project_dir)
+            with self._lock:
+                if self._projects.get(project_id) == project_dir:
+                    self._apps[project_id] = LoadedApp(app, module_name(project_id))
+            return app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO') or '/'
+        if not path.startswith(MOUNT_PREFIX):
+            return _respond(start_response, '404 Not Found', b'Not found')
+        project_key, slash, rest = path[len(MOUNT_PREFIX):].partition('/')
+        project_id = int(project_key) if project_key.isdigit() else None
+        with self._lock:
+            project_dir = self._projects.get(project_id)
+        if project_dir is None:
+            return _respond(start_response, '404 Not Found', b'Project is not running')
+        mount = f'{MOUNT_PREFIX}{project_id}'
+        if not slash:
+            # Relative URLs in index.html need the trailing slash
+            return _respond(start_response, '301 Moved Permanently', b'', headers=[('Location', mount + '/')])
+
+        rest = '/' + rest
+        if rest in ('/', '/index.html') and environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            index_path = os.path.join(project_dir, 'index.html')
+            if os.path.exists(index_path):
+                with open(index_path, 'rb') as f:
+                    return _respond(start_response, '200 OK', f.read(), 'text/html; charset=utf-8')
+
+        try:
+            app = self._get_app(project_id, project_dir)
+        except LoadError as e:
+            return _respond(start_response, '500 Internal Server Error', str(e).encode('utf-8'))
+        environ = dict(environ, SCRIPT_NAME=environ.get('SCRIPT_NAME', '') + mount, PATH_INFO=rest)
+        return app(environ, start_response)
+
+    def start(self, port=SHARED_HOST_PORT, host='127.0.0.1'):
+        self.server = make_server(host, port, self, server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, name='shared-host', daemon=True).start()
+        threading.Thread(target=self._unload_loop, name='shared-host-unload', daemon=True).start()
+
+    def _unload_loop(self):
+        while not self._stopping.wait(UNLOAD_CHECK_INTERVAL):
+            self.unload_idle()
+
+    def shutdown(self):
+        self._stopping.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+_host = None
+_host_lock = threading.Lock()
+
+
+# Process-wide shared host, started on first use
+def get_host():
+    global _host
+    if _host is None:
+        with _host_lock:
+            if _host is None:
+                host = SharedHost()
+                host.start()
+                _host = host
+    return _host
+
+
+# The shared host if it has been started, without starting it
+def current_host():
+    return _host
@@ -0,0 +1,53 @@
+# stats.py - Cached aggregate counters for Home, sidebar and Settings
+import threading
+import time
+
+import db
+
+# Seconds a computed snapshot is served before it is recomputed
+STATS_TTL = 5.0
+
+# All counters in one statement. Each sub-select is answered from an index,
+# so no row (and no code blob overflow page) of projects is read.
+STATS_QUERY = '''
+    SELECT
+        (SELECT COUNT(*) FROM projects),
+        (SELECT COUNT(*) FROM projects WHERE status = 'running'),
+        (SELECT COUNT(*) FROM projects WHERE created_at >= datetime('now', '-7 days')),
+        (SELECT COUNT(*) FROM project_runs),
+        (SELECT COUNT(*) FROM generation_history)
+'''
+
+STATS_KEYS = ('projects', 'running', 'created_this_week', 'project_runs', 'generation_history')
+
+_cache = {}   # {db path: (expires_at, stats)}
+_generation = 0
+_lock = threading.Lock()
+
+
+def compute_stats():
+    return dict(zip(STATS_KEYS, db.query_one(STATS_QUERY)))
+
+
+# Counters for the current database, recomputed at most once per STATS_TTL
+def get_stats():
+    path = db.get_pool().path
+    now = time.monotonic()
+    cached = _cache.get(path)
+    if cached and cached[0] > now:
+        return cached[1]
+    generation = _generation
+    stats = compute_stats()
+    with _lock:
+        # Don't cache a snapshot that raced with a write
+        if generation == _generation:
+            _cache[path] = (now + STATS_TTL, stats)
+    return stats
+
+
+# Drop the cached snapshot after writes that change any counter
+def invalidate():
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.clear()
@@ -0,0 +1,317 @@
+# supervisor.py - Process-wide owner of launched project processes
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import ports
+import project_logs
+import readiness
+import repository
+import resource_limits
+
+# Seconds between health checks of running apps
+HEALTH_CHECK_INTERVAL = float(os.environ.get('SUPERVISOR_INTERVAL', '5'))
+# Consecutive failed port probes before a hung app is restarted
+MAX_FAILED_CHECKS = 3
+# Restarts allowed before a crash-looping app is given up on; the count
+# resets once an app has stayed up for STABLE_AFTER seconds
+MAX_RESTARTS = 5
+STABLE_AFTER = 60.0
+RESTART_BACKOFF_BASE = 1.0
+RESTART_BACKOFF_CAP = 60.0
+# Grace period between SIGTERM and SIGKILL
+STOP_TIMEOUT = 5.0
+# How often a process we didn't start is checked for exit while stopping it
+PID_POLL_INTERVAL = 0.05
+
+
+class ManagedProcess:
+    def __init__(self, project_id, port, project_dir, spawn, process, capture):
+        self.project_id = project_id
+        self.port = port
+        self.project_dir = project_dir
+        self.spawn = spawn
+        self.process = process
+        self.capture = capture
+        self.started_at = time.monotonic()
+        self.restarts = 0
+        self.failed_checks = 0
+        self.restart_at = None   # set while waiting to restart after a crash
+        self.cgroup = resource_limits.cgroup_path(project_id)
+        self.oom_kills = resource_limits.cgroup_oom_kills(self.cgroup)
+
+    # The resource limit (if any) that ended the current process
+    def limit_event(self):
+        return resource_limits.limit_event(self.process.returncode, self.capture.text()[-2000:],
+                                           self.cgroup, self.oom_kills)
+
+
+def terminate(process, timeout=STOP_TIMEOUT):
+    terminate_all([process], timeout)
+
+
+# SIGTERM every process at once, then SIGKILL whatever hasn't exited when the
+# shared grace period ends; wait() reaps the children
+def terminate_all(processes, timeout=STOP_TIMEOUT):
+    running = [p for p in processes if p.poll() is None]
+    for process in running:
+        process.terminate()
+    deadline = time.monotonic() + timeout
+    for process in running:
+        try:
+            process.wait(max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def _force_kill(pid):
+    if sys.platform == 'win32':
+        subprocess.run(['taskkill', '/F', '/PID', str(pid)], capture_output=True)
+        return
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+# Same shutdown as terminate_all() for PIDs without a Popen handle: SIGTERM,
+# poll until they are gone, SIGKILL the stragglers
+def kill_pids(pids, timeout=STOP_TIMEOUT):
+    _reap_pids(_signal_pids(pids), time.monotonic() + timeout)
+
+
+# SIGTERM each PID; returns the ones that still need waiting for
+def _signal_pids(pids):
+    pending = []
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            continue
+        except OSError:
+            _force_kill(pid)
+            continue
+        pending.append(pid)
+    return pending
+
+
+def _reap_pids(pending, deadline):
+    while pending and time.monotonic() < deadline:
+        time.sleep(PID_POLL_INTERVAL)
+        pending = [pid for pid in pending if ports.pid_alive(pid)]
+    for pid in pending:
+        _force_kill(pid)
+
+
+def restart_delay(restarts):
+    return min(RESTART_BACKOFF_CAP, RESTART_BACKOFF_BASE * 2 ** restarts)
+
+
+class Supervisor:
+    # Owns the Popen handle of every app launched by this server process, no
+    # matter which browser session started it. A daemon thread reaps exited
+    # children, probes each app's port and restarts crashed or hung apps with
+    # exponential backoff; project_runs and projects.status follow along.
+    def __init__(self, interval=HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self._procs = {}   # {project_id: ManagedProcess}
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # Launch spawn() (which returns a Popen with stdout piped) on a reserved
+    # port and wait until it serves. Returns (pid, error).
+    def start(self, project_id, port, project_dir, spawn):
+        return self.start_many([(project_id, port, project_dir, spawn)])[project_id]
+
+    # start() for many (project_id, port, project_dir, spawn) launches: every
+    # app is spawned first and all of them are waited on together, so the
+    # batch takes about as long as its slowest app. Runs are recorded in one
+    # transaction. Returns {project_id: (pid, error)}.
+    def start_many(self, launches):
+        results = {}
+        spawned = []
+        for project_id, port, project_dir, spawn in launches:
+            try:
+                process = spawn()
+            except Exception as e:
+                results[project_id] = (None, f"Error starting Flask: {str(e)}")
+                continue
+            # Output is drained in the background into projects/project_<id>/app.log
+            capture = project_logs.start_capture(project_id, process, project_dir)
+            spawned.append(ManagedProcess(project_id, port, project_dir, spawn, process, capture))
+
+        # Return as soon as the apps accept connections instead of sleeping a fixed time
+        outcomes = readiness.wait_for_launches([(m.port, m.process, m.capture) for m in spawned])
+        failed = [m for m in spawned if not outcomes[m.port][0]]
+        terminate_all([m.process for m in failed])
+        for managed in failed:
+            managed.capture.closed.wait(1)
+            reason = outcomes[managed.port][1]
+            limit = managed.limit_event()
+            if limit:
+                reason = f"{reason}; hit its {limit} limit"
+            results[managed.project_id] = (
+                None, f"Flask failed to start ({reason}): {managed.capture.text()[-500:]}"
+            )
+
+        started = [m for m in spawned if outcomes[m.port][0]]
+        if started:
+            with self._lock:
+                for managed in started:
+                    managed.started_at = time.monotonic()
+                    self._procs[managed.project_id] = managed
+            ports.get_allocator().attach_many([(m.port, m.process.pid) for m in started])
+            repository.record_runs([(m.project_id, m.process.pid, m.port) for m in started])
+            self._ensure_monitor()
+        for managed in started:
+            results[managed.project_id] = (managed.process.pid, None)
+        return results
+
+    # Stop a project's app and release its port; False if nothing was running
+    def stop(self, project_id):
+        return self.stop_many([project_id])[project_id]
+
+    # stop() for many projects: all apps get SIGTERM at once and share one
+    # grace period before SIGKILL; runs and ports are updated in one
+    # transaction each. Returns {project_id: stopped}.
+    def stop_many(self, project_ids, timeout=STOP_TIMEOUT):
+        with self._lock:
+            managed = [self._procs.pop(pid) for pid in project_ids if pid in self._procs]
+        stops = [(m.project_id, m.process.pid) for m in managed]
+        managed_ids = {m.project_id for m in managed}
+        others = repository.get_running_pids([pid for pid in project_ids if pid not in managed_ids])
+        stops.extend(others.items())
+        # Shared-host runs are recorded under this server's own PID
+        foreign = [pid for pid in others.values() if pid != os.getpid()]
+
+        # Both kinds are signalled before either is waited on
+        deadline = time.monotonic() + timeout
+        pending = _signal_pids(foreign)
+        terminate_all([m.process for m in managed], timeout)
+        _reap_pids(pending, deadline)
+        repository.record_stops(stops)
+        ports.get_allocator().release_projects([project_id for project_id, _ in stops])
+        stopped = {project_id for project_id, _ in stops}
+        return {project_id: project_id in stopped for project_id in project_ids}
+
+    def is_managed(self, project_id):
+        with self._lock:
+            return project_id in self._procs
+
+    # {project_id: port} of managed apps that are currently up
+    def running(self):
+        with self._lock:
+            return {project_id: m.port for project_id, m in self._procs.items() if m.restart_at is None}
+
+    # One pass over every managed app (normally run by the monitor thread)
+    def check(self):
+        now = time.monotonic()
+        with self._lock:
+            managed_list = list(self._procs.values())
+        for managed in managed_list:
+            if managed.restart_at is not None:
+                if now >= managed.restart_at:
+                    self._restart(managed)
+                continue
+            process = managed.process
+            if process.poll() is not None:
+                self._crashed(managed, now)
+            elif readiness.port_open(managed.port):
+                managed.failed_checks = 0
+                if managed.restarts and now - managed.started_at > STABLE_AFTER:
+                    managed.restarts = 0
+            elif now - managed.started_at > readiness.READINESS_TIMEOUT:
+                managed.failed_checks += 1
+                if managed.failed_checks >= MAX_FAILED_CHECKS:
+                    terminate(process)
+                    self._crashed(managed, now)
+
+    def _crashed(self, managed, now):
+        with self._lock:
+            if self._procs.get(managed.project_id) is not managed:
+                return   # stopped meanwhile
+            given_up = managed.restarts >= MAX_RESTARTS
+            if given_up:
+                del self._procs[managed.project_id]
+            else:
+                managed.restart_at = now + restart_delay(managed.restarts)
+        # Output drains on its own thread; give it a moment to catch the last lines
+        managed.capture.closed.wait(1)
+        repository.record_stop(managed.project_id, managed.process.pid, status='crashed',
+                               limit_event=managed.limit_event())
+        if given_up:
+            ports.get_allocator().release_project(managed.project_id)
+
+    def _restart(self, managed):
+        # The port stays reserved; the new process is given READINESS_TIMEOUT
+        # to come up before health checks count against it
+        try:
+            process = managed.spawn()
+        except Exception:
+            managed.restarts += 1
+            managed.restart_at = None
+            self._crashed(managed, time.monotonic())
+            return
+        with self._lock:
+            if self._procs.get(managed.project_id) is not managed:
+                terminate(process)
+                return
+            managed.process = process
+            managed.capture = project_logs.start_capture(managed.project_id, process, managed.project_dir)
+            managed.oom_kills = resource_limits.cgroup_oom_kills(managed.cgroup)
+            managed.started_at = time.monotonic()
+            managed.restarts += 1
+            managed.failed_checks = 0
+            managed.restart_at = None
+        ports.get_allocator().attach(managed.port, process.pid)
+        repository.record_run(managed.project_id, process.pid, managed.port)
+
+    def _ensure_monitor(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._monitor, name='supervisor', daemon=True)
+                self._thread.start()
+
+    def _monitor(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # A transient error (e.g. a locked database) must not end supervision
+                pass
+
+    # Stop monitoring; with stop_apps, also stop every managed app
+    def shutdown(self, stop_apps=False):
+        self._stopping.set()
+        if stop_apps:
+            self.stop_many(list(self._procs))
+
+
+# Mark runs whose PID is gone as crashed, stop showing their projects as
+# running and free their ports. Apps left running by a previous server
+# process keep their 'running' rows and can still be stopped by PID.
+def reconcile():
+    dead = repository.reconcile_runs(ports.pid_alive)
+    ports.get_allocator().reconcile()
+    return dead
+
+
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+
+# Process-wide supervisor; the first call reconciles the database with reality
+def get_supervisor():
+    global _supervisor
+    if _supervisor is None:
+        with _supervisor_lock:
+            if _supervisor is None:
+                reconcile()
+                _supervisor = Supervisor()
+    return _supervisor
@@ -0,0 +1,121 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import ai_client
+import generation
+import jobs
+import migrations
+from test_generation import PROJECT, FakeStreamingClient
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        headers = {'retry-after': retry_after} if retry_after else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+def test_retries_rate_limits_and_server_errors_with_backoff():
+    errors = [APIStatusError(429, retry_after='7'), APIStatusError(503)]
+    sleeps = []
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+
+    assert ai_client.call_with_retries(call, sleep=sleeps.append) == 'ok'
+    assert sleeps[0] == 7.0
+    assert 1.0 <= sleeps[1] <= 3.0
+
+
+def test_client_errors_are_not_retried():
+    sleeps = []
+
+    def call():
+        raise APIStatusError(400)
+
+    with pytest.raises(APIStatusError):
+        ai_client.call_with_retries(call, sleep=sleeps.append)
+    assert sleeps == []
+
+
+def test_rate_limiter_waits_for_request_and_token_capacity():
+    limiter = ai_client.RateLimiter(requests_per_minute=2, tokens_per_minute=600)
+    waits = []
+    limiter.acquire(100, sleep=waits.append)
+    limiter.acquire(100, sleep=waits.append)
+    assert waits == []
+
+    with pytest.raises(ai_client.RateLimitExceeded):
+        limiter.acquire(100, max_wait=1, sleep=waits.append)
+
+    # A completion that used more than estimated puts the token bucket in debt
+    limiter = ai_client.RateLimiter(requests_per_minute=0, tokens_per_minute=600)
+    limiter.acquire(100)
+    limiter.settle(100, 1100)
+    with pytest.raises(ai_client.RateLimitExceeded) as exc:
+        limiter.acquire(10, max_wait=30)
+    assert 'rate limit' in str(exc.value)
+
+
+def test_daily_token_budget_blocks_new_jobs(database):
+    migrations.ensure_schema()
+    queue = jobs.JobQueue(workers=1, daily_token_budget=300)
+    job_id, error = queue.submit(FakeStreamingClient(json.dumps(PROJECT)), 'todo', owner_id=5)
+    queue.shutdown()
+    assert error is None and jobs.tokens_used_today(5) == 321
+
+    job_id, error = queue.submit(FakeStreamingClient('{}'), 'again', owner_id=5)
+    assert job_id is None and 'budget' in error
+    assert jobs.tokens_used_today(6) == 0
+
+
+def test_concurrent_generations_reserve_max_tokens_until_settled(database, monkeypatch):
+    migrations.ensure_schema()
+    limiter = ai_client.RateLimiter(requests_per_minute=0, tokens_per_minute=12000)
+    reserved = []
+    acquire = limiter.acquire
+    monkeypatch.setattr(limiter, 'acquire', lambda tokens, **kw: reserved.append(tokens) or acquire(tokens, **kw))
+    monkeypatch.setattr(ai_client, 'get_limiter', lambda api_key: limiter)
+    generation.generate(FakeStreamingClient(json.dumps(PROJECT)), 'todo', on_field=lambda k, v: None)
+    assert reserved[0] > generation.GROQ_MAX_TOKENS
+
+    # Four workers starting together: only one reservation fits in the minute's budget
+    outcomes = []
+
+    def start():
+        try:
+            acquire(reserved[0], max_wait=0)
+            outcomes.append('started')
+        except ai_client.RateLimitExceeded:
+            outcomes.append('waiting')
+
+    threads = [threading.Thread(target=start) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes) == ['started', 'waiting', 'waiting', 'waiting']
+
+    # Settling refunds the unused part, so the next generation can start
+    limiter.settle(reserved[0], 321)
+    acquire(reserved[0], max_wait=0)
+
+
+def test_failed_attempts_give_their_reservation_back():
+    limiter = ai_client.RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+    errors = [APIStatusError(503), APIStatusError(503)]
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+
+    assert ai_client.call_with_retries(call, limiter, estimated_tokens=900, sleep=lambda s: None) == 'ok'
+    limiter.settle(900, 100)
+    limiter.acquire(850, max_wait=0)
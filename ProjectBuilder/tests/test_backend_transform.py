@@ -0,0 +1,66 @@
+import ast
+
+import pytest
+
+import backend_transform
+
+CASES = {
+    'explicit-port': "from flask import Flask\napp = Flask(__name__)\n\nif __name__ == '__main__':\n    app.run(port=5000, debug=False)\n",
+    'multiline-import': "from flask import (\n    Flask,\n    jsonify,\n)\napp = Flask(__name__)\n\n@app.route('/api')\ndef api():\n    return jsonify([])\n\nif __name__ == '__main__':\n    app.run('0.0.0.0', 8080)\n",
+    'positional-debug': "from flask import Flask\napp = Flask(__name__)\n\nif __name__ == '__main__':\n    app.run('0.0.0.0', 8080, False, True)\n",
+    'no-main': "import flask\napp = flask.Flask(__name__)  # comment kept\n",
+    'unguarded-run': "from flask import Flask\napp = Flask(__name__)\napp.run()\n",
+}
+
+
+def _run_calls(tree):
+    return [n for n in ast.walk(tree) if isinstance(n, ast.Call) and getattr(n.func, 'attr', None) == 'run']
+
+
+def _kwargs(call):
+    return {kw.arg: ast.unparse(kw.value) for kw in call.keywords}
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_index_route_and_env_port_are_injected(name):
+    code = backend_transform.transform(CASES[name])
+    tree = ast.parse(code)
+    calls = _run_calls(tree)
+    assert len(calls) == 1 and not calls[0].args
+    kwargs = _kwargs(calls[0])
+    assert kwargs['port'].startswith("int(_pb_os.environ.get('PORT'")
+    assert kwargs['host'] == "_pb_os.environ.get('HOST', '127.0.0.1')"
+    assert code.count("@app.route('/')") == 1
+    # Everything the injected code uses is defined before the __main__ block runs
+    guard = next(n for n in tree.body if isinstance(n, ast.If))
+    assert code.index('import os as _pb_os') < code.index('if __name__')
+    assert all(not isinstance(n, ast.Expr) for n in tree.body[tree.body.index(guard):])
+
+
+def test_existing_forms_are_preserved():
+    code = backend_transform.transform(CASES['explicit-port'])
+    assert _kwargs(_run_calls(ast.parse(code))[0])['debug'] == 'False'
+    assert "PORT', '5000'" in code
+
+    code = backend_transform.transform(CASES['multiline-import'])
+    assert "PORT', '8080'" in code and "from flask import (\n    Flask," in code
+
+    # Positionals after host and port keep their meaning as keywords
+    kwargs = _kwargs(_run_calls(ast.parse(backend_transform.transform(CASES['positional-debug'])))[0])
+    assert (kwargs['debug'], kwargs['load_dotenv']) == ('False', 'True')
+
+    assert '# comment kept' in backend_transform.transform(CASES['no-main'])
+
+
+def test_existing_index_route_and_other_app_names():
+    code = "from flask import Flask\nserver = Flask(__name__)\n\n@server.get('/')\ndef home():\n    return 'hi'\n"
+    result = backend_transform.transform(code)
+    assert '_pb_index' not in result and 'app = server' in result
+    assert 'server.run(debug=True' in result
+
+
+def test_unparseable_or_factory_code_is_left_alone():
+    assert backend_transform.transform('def broken(:\n') == 'def broken(:\n'
+    factory = "from flask import Flask\ndef create_app():\n    return Flask(__name__)\n"
+    assert backend_transform.transform(factory) == factory
+    assert backend_transform.transform(factory) is backend_transform.transform(factory)
@@ -0,0 +1,46 @@
+import blobs
+import db
+import migrations
+import repository
+
+BACKEND = "from flask import Flask\napp = Flask(__name__)\n" + "# boilerplate\n" * 200
+
+
+def test_identical_code_is_stored_once_and_compressed(database):
+    migrations.ensure_schema()
+    first = repository.save_project('a', '', 'p', BACKEND, '<h1>a</h1>')
+    second = repository.save_project('b', '', 'p', BACKEND, '<h1>b</h1>')
+    repository.save_generation_history(first, 'p', '{"backend": "x"}', 10)
+
+    assert repository.get_project(second)[4] == BACKEND
+    count, stored, original = blobs.usage(db.connection())
+    assert count == 4   # one backend, two frontends, one response
+    assert stored < original / 5
+
+    # Unreferenced blobs go away with the last project using them
+    repository.update_project(first, BACKEND, '<h1>a2</h1>')
+    repository.delete_project(second)
+    assert repository.get_project(first)[5] == '<h1>a2</h1>'
+    # backend, response, a2, plus version 1's '<h1>a</h1>' and the delta to version 2
+    assert blobs.usage(db.connection())[0] == 5
+    assert repository.search_projects('boilerplate')[0][0] == first
+
+
+def test_migration_moves_inline_code_into_blobs(database):
+    conn = db.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    for version, step in migrations.MIGRATIONS:
+        if version < 11:
+            step(conn)
+    conn.execute("PRAGMA user_version = 10")
+    conn.execute("INSERT INTO projects (name, prompt, backend_code, frontend_code) VALUES ('old', 'p', ?, 'f')",
+                 (BACKEND,))
+    conn.execute("INSERT INTO generation_history (project_id, prompt, response) VALUES (1, 'p', 'r')")
+    conn.commit()
+
+    migrations.ensure_schema()
+    project = repository.get_project(1)
+    assert (project[4], project[5]) == (BACKEND, 'f')
+    assert db.query_one('SELECT backend_code, backend_hash IS NOT NULL FROM projects')[0:2] == (None, 1)
+    assert db.query_one('SELECT response, response_hash FROM generation_history') == (None, blobs.content_hash('r'))
+    assert [row[0] for row in repository.search_projects('boilerplate')] == [1]
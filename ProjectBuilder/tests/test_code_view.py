@@ -0,0 +1,25 @@
+import code_view
+import db
+import migrations
+import repository
+
+
+def test_code_is_cached_until_the_project_changes(database, monkeypatch):
+    migrations.ensure_schema()
+    backend = ''.join(f'print({i})\n' for i in range(1000))
+    project_id = repository.save_project('p', '', 'p', backend, '<h1>hi</h1>')
+    fetches = []
+    original = repository.get_project
+    monkeypatch.setattr(repository, 'get_project', lambda pid: fetches.append(pid) or original(pid))
+
+    code = code_view.get(project_id)
+    assert code_view.get(project_id) is code and fetches == [project_id]
+    text, total = code.window('backend')
+    assert total == 1000 and text.count('\n') == code_view.PAGE_LINES
+    assert code.window('frontend') == ('<h1>hi</h1>', 1)
+
+    repository.update_project(project_id, 'print(1)\n', '')
+    db.execute("UPDATE projects SET last_modified = '2000-01-01 00:00:00' WHERE id = ?", (project_id,))
+    assert code_view.get(project_id).backend == 'print(1)\n'
+    assert len(fetches) == 2
+    assert code_view.get(project_id + 1) is None
@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+import db
+
+
+def test_connection_reused_within_thread(database):
+    assert db.connection() is db.connection()
+    assert db.query_one('PRAGMA journal_mode')[0] == 'wal'
+
+
+def test_connection_of_finished_thread_is_recycled(database):
+    seen = []
+    for _ in range(3):
+        t = threading.Thread(target=lambda: seen.append(id(db.connection())))
+        t.start()
+        t.join()
+    assert len(set(seen)) == 1
+
+
+def test_nested_transaction_commits_once(database):
+    db.execute('CREATE TABLE t (x INTEGER)')
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            conn.execute('INSERT INTO t VALUES (1)')
+            with db.transaction() as inner:
+                inner.execute('INSERT INTO t VALUES (2)')
+            raise RuntimeError
+    assert db.query_one('SELECT COUNT(*) FROM t')[0] == 0
+    with db.transaction() as conn:
+        conn.execute('INSERT INTO t VALUES (1)')
+        with db.transaction() as inner:
+            inner.execute('INSERT INTO t VALUES (2)')
+    assert db.query_one('SELECT COUNT(*) FROM t')[0] == 2
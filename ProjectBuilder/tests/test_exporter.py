@@ -0,0 +1,69 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import exporter
+import migrations
+import repository
+
+
+def _populate():
+    migrations.ensure_schema()
+    first = repository.save_project('Todo App', 'd', 'p', 'print(1)\n', '<h1>todo</h1>', owner_id=7)
+    second = repository.save_project('Notes', 'd', 'p', 'print(2)\n', '<h1>notes</h1>')
+    repository.save_generation_history(first, 'p', '{"backend": "..."}', 120)
+    repository.record_run(second, 4242, 5001)
+    return first, second
+
+
+def test_jsonl_export_streams_one_record_per_line(database, monkeypatch):
+    first, second = _populate()
+    monkeypatch.setattr(exporter, 'EXPORT_BATCH_ROWS', 1)
+    batches = []
+    out = io.BytesIO()
+    counts = exporter.write_jsonl(out, include_history=True, progress=lambda table, done: batches.append((table, done)))
+
+    lines = [json.loads(line) for line in out.getvalue().decode('utf-8').splitlines()]
+    assert lines[0]['type'] == 'export' and lines[0]['tables'] == ['projects', 'generation_history']
+    assert [(r['type'], r.get('name')) for r in lines[1:]] == [
+        ('project', 'Todo App'), ('project', 'Notes'), ('generation_history', None)
+    ]
+    assert lines[1]['owner_id'] == 7 and lines[1]['backend_code'] == 'print(1)\n' and lines[1]['created_at']
+    assert counts == {'projects': 2, 'generation_history': 1, 'project_runs': 0}
+    assert batches == [('projects', 1), ('projects', 2), ('generation_history', 1)]
+
+
+def test_zip_export_has_a_folder_per_project(database):
+    first, second = _populate()
+    spool, counts = exporter.export_to_tempfile('zip', include_runs=True)
+    with zipfile.ZipFile(spool) as archive:
+        names = set(archive.namelist())
+        folder = f'projects/{first}-todo_app/'
+        assert {folder + name for name in ('project.json', 'app.py', 'index.html', 'Dockerfile')} <= names
+        assert archive.read(folder + 'app.py') == b'print(1)\n'
+        meta = json.loads(archive.read(folder + 'project.json'))
+        assert meta['name'] == 'Todo App' and 'backend_code' not in meta
+        runs = [json.loads(line) for line in archive.read(exporter.ZIP_RUNS).splitlines()]
+        assert [(r['project_id'], r['pid']) for r in runs] == [(second, 4242)]
+        assert json.loads(archive.read(exporter.ZIP_MANIFEST))['counts'] == counts
+        assert exporter.ZIP_HISTORY not in names
+    assert counts['projects'] == 2
+
+
+def test_database_export_is_accepted_by_download_button(database):
+    pytest.importorskip('streamlit')
+    from streamlit.elements.widgets.button import marshall_file
+    from streamlit.proto.DownloadButton_pb2 import DownloadButton
+
+    import app
+
+    migrations.ensure_schema()
+    repository.save_project('todo', '', 'p', 'print(1)', '<h1>hi</h1>')
+    for fmt, mime in (('zip', 'application/zip'), ('jsonl', 'application/x-ndjson')):
+        data, counts = app.export_database(fmt, include_history=True)
+        assert counts['projects'] == 1
+        marshall_file('export', data, DownloadButton(), mime, f'all_projects.{fmt}')
+    with zipfile.ZipFile(io.BytesIO(app.export_database('zip')[0])) as archive:
+        assert any(name.endswith('/app.py') for name in archive.namelist())
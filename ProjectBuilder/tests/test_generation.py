@@ -0,0 +1,72 @@
+import json
+from types import SimpleNamespace
+
+import generation
+import migrations
+from response_parser import IncrementalParser
+
+PROJECT = {
+    'project_name': 'todo-app',
+    'description': 'Tasks with "priorities" — and emoji \U0001F680',
+    'backend': "from flask import Flask\napp = Flask(__name__)\n\n@app.route('/todos')\ndef todos():\n    return '\\\\n'\n",
+    'frontend': '<script>\n\tconst API_BASE_URL = window.location.origin;\n</script>',
+    'setup_instructions': 'python app.py',
+    'features': ['add', 'delete', {'nested': [1, 2.5, True, None]}],
+}
+
+
+class FakeStreamingClient:
+    # Mimics client.chat.completions.create(stream=True) by yielding small deltas
+    def __init__(self, text, chunk_size=7):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, stream=False, **kwargs):
+        self.calls += 1
+        pieces = [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+        chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=p))]) for p in pieces]
+        chunks.append(SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=SimpleNamespace(total_tokens=321))))
+        return iter(chunks)
+
+
+def test_incremental_parser_handles_every_chunk_boundary():
+    text = 'Here you go:\n```json\n' + json.dumps(PROJECT, indent=2) + '\n```'
+    for size in (1, 2, 3, 5, 64, len(text)):
+        parser = IncrementalParser()
+        fields = []
+        for i in range(0, len(text), size):
+            fields.extend(key for key, _ in parser.feed(text[i:i + size]))
+        assert parser.close() == PROJECT
+        assert parser.done
+        assert fields == list(PROJECT)
+
+
+def test_fields_are_reported_before_the_answer_is_complete():
+    text = json.dumps(PROJECT)
+    parser = IncrementalParser()
+    cut = text.index('"frontend"')
+    assert [key for key, _ in parser.feed(text[:cut])] == ['project_name', 'description', 'backend']
+    assert not parser.done
+
+
+def test_streaming_generation_with_fake_client(database):
+    migrations.ensure_schema()
+    client = FakeStreamingClient(json.dumps(PROJECT))
+    seen = []
+    result, tokens, cached, truncated = generation.generate(client, 'todo', on_field=lambda k, v: seen.append(k))
+    assert (result, tokens, cached, truncated) == (PROJECT, 321, False, False)
+    assert seen == list(PROJECT)
+
+    seen.clear()
+    result, tokens, cached, _ = generation.generate(client, 'todo', on_field=lambda k, v: seen.append(k))
+    assert cached and tokens == 0 and client.calls == 1
+    assert seen == list(PROJECT)
+
+
+def test_offline_stub_streams_its_fields(database):
+    seen = []
+    result, tokens, cached, _ = generation.generate(None, 'anything', on_field=lambda k, v: seen.append(k))
+    assert result['project_name'] == 'stub-project'
+    assert seen == list(result)
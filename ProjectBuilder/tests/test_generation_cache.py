@@ -0,0 +1,35 @@
+import db
+import generation_cache
+import migrations
+
+
+def test_cache_round_trip_and_history_fallback(database):
+    migrations.ensure_schema()
+    key = generation_cache.cache_key('system', 'todo app', 'react', 'model', 0.7)
+    assert key != generation_cache.cache_key('system', 'todo app', 'vanilla-js', 'model', 0.7)
+    assert generation_cache.get(key) is None
+
+    generation_cache.put(key, {'project_name': 'todo'}, 1234)
+    assert generation_cache.get(key) == ({'project_name': 'todo'}, 1234)
+
+    generation_cache.clear()
+    db.execute(
+        "INSERT INTO generation_history (project_id, prompt, response, tokens_used, cache_key) VALUES (1, 'p', ?, 99, ?)",
+        ('{"project_name": "from-history"}', key),
+    )
+    assert generation_cache.get(key) == ({'project_name': 'from-history'}, 99)
+    assert generation_cache.cache_stats()['entries'] == 1
+
+
+def test_eviction_keeps_most_recently_used(database):
+    migrations.ensure_schema()
+    for i in range(5):
+        generation_cache.put(f'k{i}', {'i': i, 'pad': 'x' * 100}, 0)
+    generation_cache.get('k0')
+    with db.transaction() as conn:
+        generation_cache.evict(conn, max_entries=3)
+    keys = {row[0] for row in db.query_all('SELECT key FROM generation_cache')}
+    assert keys == {'k0', 'k3', 'k4'}
+    with db.transaction() as conn:
+        generation_cache.evict(conn, max_bytes=250)
+    assert {row[0] for row in db.query_all('SELECT key FROM generation_cache')} == {'k0', 'k4'}
@@ -0,0 +1,81 @@
+import io
+import json
+
+import db
+import exporter
+import importer
+import migrations
+import repository
+
+
+def _source_database(database):
+    migrations.ensure_schema()
+    first = repository.save_project('Todo App', 'd', 'p', 'print(1)\n', '<h1>todo</h1>', owner_id=7)
+    second = repository.save_project('Notes', 'd', 'p', 'print(2)\n', '<h1>notes</h1>')
+    db.execute("UPDATE projects SET created_at = '2024-01-02 03:04:05' WHERE id = ?", (first,))
+    repository.save_generation_history(first, 'p', '{"backend": "..."}', 120)
+    repository.record_run(second, 4242, 5001)
+
+
+def _export(fmt):
+    spool, _ = exporter.export_to_tempfile(fmt, include_history=True, include_runs=True)
+    return spool.read()
+
+
+def _projects():
+    return sorted((p[1], p[11], p[6], p[4]) for p in repository.get_all_projects())
+
+
+def test_zip_and_jsonl_exports_round_trip(database, tmp_path):
+    _source_database(database)
+    exports = {fmt: _export(fmt) for fmt in exporter.EXPORT_FORMATS}
+    expected = _projects()
+
+    for fmt, data in exports.items():
+        db.configure(str(tmp_path / f'{fmt}.db'))
+        migrations.ensure_schema()
+        done = []
+        result = importer.import_records(importer.read_records(io.BytesIO(data)), progress=done.append, batch_size=2)
+        assert (result.imported, result.duplicates, result.history, result.runs, result.errors) == (2, 0, 1, 1, [])
+        assert _projects() == expected
+        history_project = db.query_one('SELECT project_id FROM generation_history')[0]
+        assert db.query_one('SELECT name FROM projects WHERE id = ?', (history_project,))[0] == 'Todo App'
+        # Runs from the exporting instance are never taken as live processes
+        assert db.query_one('SELECT status FROM project_runs')[0] == 'stopped'
+        # The JSONL export starts with a header record
+        assert done[-1] == (5 if fmt == 'jsonl' else 4)
+
+        # Importing the same file again only finds duplicates
+        again = importer.import_file(data)
+        assert (again.imported, again.duplicates) == (0, 2)
+
+
+def test_legacy_formats_and_bad_records(database):
+    migrations.ensure_schema()
+    legacy = json.dumps([
+        {'id': 1, 'name': 'A', 'description': '', 'backend': 'a', 'frontend': 'x'},
+        {'id': 2, 'name': 'B', 'description': '', 'backend': 'a', 'frontend': 'x'},
+        {'id': 3, 'description': 'no name', 'backend': 'c', 'frontend': 'y'},
+    ], indent=2).encode('utf-8')
+    result = importer.import_file(legacy, default_owner_id=9)
+    assert (result.imported, result.duplicates) == (1, 1)
+    assert result.errors == [(3, 'missing project name')]
+    assert db.query_one('SELECT owner_id FROM projects')[0] == 9
+
+    single = json.dumps({'name': 'Single', 'description': '', 'backend': 'b', 'frontend': 'z'}, indent=2)
+    assert importer.import_file(single.encode('utf-8')).imported == 1
+
+    jsonl = b'{"type": "project", "name": "C", "backend_code": "c2"}\nnot json\n'
+    result = importer.import_file(jsonl)
+    assert result.imported == 1 and result.errors[0][0] == 2
+
+
+def test_progress_can_tell_the_callers_stream(database):
+    migrations.ensure_schema()
+    for data in (b'{"type": "project", "name": "A", "backend_code": "a"}\n{"name": "B", "backend_code": "b"}\n',
+                 json.dumps([{'name': 'C', 'backend': 'c'}]).encode('utf-8')):
+        upload = io.BytesIO(data)
+        positions = []
+        result = importer.import_file(upload, progress=lambda done: positions.append(upload.tell()))
+        assert not result.errors and positions[-1] == len(data)
+        assert not upload.closed
@@ -0,0 +1,76 @@
+import json
+import threading
+
+import jobs
+import migrations
+from test_generation import PROJECT, FakeStreamingClient
+
+
+class BlockingClient(FakeStreamingClient):
+    # Streams the first fields, then waits until released
+    def __init__(self, text):
+        super().__init__(text, chunk_size=len(text))
+        self.release = threading.Event()
+
+    def create(self, stream=False, **kwargs):
+        chunks = list(super().create(stream=stream, **kwargs))
+        cut = self.text.index('"frontend"')
+        head, tail = self.text[:cut], self.text[cut:]
+        delta = chunks[0].choices[0].delta
+        delta.content = head
+        yield chunks[0]
+        self.release.wait(5)
+        delta.content = tail
+        yield chunks[0]
+        yield chunks[-1]
+
+
+def test_job_runs_in_background_and_reports_progress(database):
+    migrations.ensure_schema()
+    queue = jobs.JobQueue(workers=2, max_per_user=1)
+    client = BlockingClient(json.dumps(PROJECT))
+    job_id, error = queue.submit(client, 'todo', owner_id=1)
+    assert error is None
+
+    assert queue.submit(client, 'another', owner_id=1) == (None, "You already have 1 generations in progress")
+
+    for _ in range(500):
+        if 'backend' in queue.progress(job_id):
+            break
+        threading.Event().wait(0.01)
+    assert jobs.get_job(job_id)['status'] == 'running'
+    assert set(queue.progress(job_id)) >= {'project_name', 'description', 'backend'}
+
+    client.release.set()
+    queue.shutdown()
+    job = jobs.get_job(job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == PROJECT and job['tokens_used'] == 321
+    assert [j['id'] for j in jobs.list_jobs(1)] == [job_id]
+
+
+def test_failed_job_and_restart_recovery(database):
+    migrations.ensure_schema()
+    queue = jobs.JobQueue(workers=1)
+    job_id, _ = queue.submit(FakeStreamingClient('no json here'), 'broken', owner_id=2)
+    queue.shutdown()
+    assert jobs.get_job(job_id)['status'] == 'failed'
+    assert jobs.get_job(job_id)['error'] == 'Failed to parse AI response'
+
+    jobs.db.execute("INSERT INTO generation_jobs (prompt, request_prompt, status) VALUES ('p', 'p', 'running')")
+    assert jobs.fail_interrupted_jobs() == 1
+
+
+def test_job_that_fails_before_generating_is_not_left_queued(database):
+    migrations.ensure_schema()
+
+    class Unreadable(dict):
+        def __getitem__(self, key):
+            raise KeyError(key)
+
+    queue = jobs.JobQueue(workers=1)
+    queue._progress = Unreadable()
+    job_id, _ = queue.submit(FakeStreamingClient('{}'), 'p', owner_id=3)
+    queue.shutdown()
+    assert jobs.get_job(job_id)['status'] == 'failed'
+    assert queue.active_count() == 0 and not queue._progress
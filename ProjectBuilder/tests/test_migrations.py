@@ -0,0 +1,38 @@
+import sqlite3
+
+import db
+import migrations
+
+
+def test_fresh_database_migrates_to_latest(database):
+    conn = db.connection()
+    assert migrations.migrate(conn) == [v for v, _ in migrations.MIGRATIONS]
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert 'idx_projects_owner_created' in indexes
+    assert 'idx_project_runs_pid' in indexes
+    assert migrations.migrate(conn) == []
+
+
+def test_legacy_database_with_owner_column_is_adopted(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    legacy = sqlite3.connect(path)
+    legacy.execute('''
+        CREATE TABLE projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, description TEXT, prompt TEXT NOT NULL,
+            backend_code TEXT, frontend_code TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP, status TEXT DEFAULT 'created', port INTEGER,
+            framework TEXT DEFAULT 'react', owner_id INTEGER
+        )
+    ''')
+    legacy.execute("INSERT INTO projects (name, prompt, owner_id) VALUES ('p', 'x', 7)")
+    legacy.commit()
+    legacy.close()
+
+    pool = db.configure(path)
+    try:
+        migrations.ensure_schema()
+        assert db.query_one("SELECT owner_id FROM projects")[0] == 7
+        assert migrations.get_version(db.connection()) == migrations.LATEST_VERSION
+    finally:
+        pool.close()
@@ -0,0 +1,57 @@
+import os
+import socket
+import threading
+
+import migrations
+import ports
+
+
+def test_concurrent_allocations_get_distinct_ports(database):
+    migrations.ensure_schema()
+    allocator = ports.PortAllocator(47100, 47139)
+    allocated = []
+    threads = [threading.Thread(target=lambda i=i: allocated.append(allocator.allocate(i))) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(allocated)) == 20 and None not in allocated
+    assert allocator.free_count() == 20
+
+    allocator.release_project(3)
+    assert allocator.free_count() == 21
+
+
+def test_ports_in_use_elsewhere_are_skipped(database):
+    migrations.ensure_schema()
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as busy:
+        busy.bind(('127.0.0.1', 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        allocator = ports.PortAllocator(port, port + 1)
+        assert allocator.allocate(1) == port + 1
+        assert allocator.allocate(2) is None
+
+
+def test_reconcile_releases_ports_of_dead_processes(database):
+    migrations.ensure_schema()
+    allocator = ports.PortAllocator(47200, 47201)
+    live, dead = allocator.allocate(1), allocator.allocate(2)
+    allocator.attach(live, os.getpid())
+    allocator.attach(dead, 2 ** 22 + 1)
+    assert allocator.free_count() == 0
+
+    # A fresh process sees the reservations and frees the dead one
+    assert ports.PortAllocator(47200, 47201).reconcile() == [dead]
+    assert allocator.allocate(3) == dead
+
+
+def test_previous_port_is_preferred_when_free(database):
+    migrations.ensure_schema()
+    allocator = ports.PortAllocator(47250, 47259)
+    first = allocator.allocate(1)
+    allocator.release(first)
+    assert allocator.allocate(2) != first
+    assert allocator.allocate(1, preferred=first) == first
+    assert allocator.allocate(3, preferred=first) != first
+    assert allocator.free_count() == 7
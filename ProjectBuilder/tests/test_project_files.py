@@ -0,0 +1,46 @@
+import os
+
+import project_files
+
+BACKEND = "from flask import Flask\napp = Flask(__name__)\n\nif __name__ == '__main__':\n    app.run(debug=True)\n"
+FRONTEND = "<script>fetch('/todos')</script>"
+
+
+def test_transforms_are_cached_per_code_hash():
+    backend = project_files.transform_backend(BACKEND)
+    assert "_pb_os.environ.get('PORT'" in backend and "@app.route('/')" in backend
+    assert project_files.transform_backend(BACKEND) is backend
+
+    frontend = project_files.transform_frontend(FRONTEND, 5123, '/p/7', shared=True)
+    assert "window.API_BASE_URL = '/p/7';" in frontend and "fetch(API_BASE_URL + '/todos')" in frontend
+
+
+def test_shared_frontend_calls_go_to_the_mount():
+    # The shape generation.SYSTEM_PROMPT asks for
+    generated = ("<script>\nconst API_BASE_URL = window.location.origin;\n"
+                 "fetch(`${API_BASE_URL}/todos`);\nfetch('/stats');\n</script>")
+    frontend = project_files.transform_frontend(generated, 5123, '/p/7', shared=True)
+    assert "const API_BASE_URL = (window.location.origin + '/p/7');" in frontend
+    assert "fetch(`${API_BASE_URL}/todos`)" in frontend and "fetch(API_BASE_URL + '/stats')" in frontend
+    assert frontend.count('const API_BASE_URL') == 1
+
+    # Served by the app itself, the page's origin is already right
+    assert 'window.location.origin;' in project_files.transform_frontend(generated, 5123, 'http://localhost:5123')
+
+
+def test_unchanged_files_are_not_rewritten(tmp_path):
+    files = {'app.py': 'print(1)\n', 'index.html': '<h1>hi</h1>'}
+    assert project_files.materialize(str(tmp_path), files) == ['app.py', 'index.html']
+    assert project_files.materialize(str(tmp_path), files) == []
+
+    # Only the changed file is written, atomically and without leftovers
+    assert project_files.materialize(str(tmp_path), {**files, 'app.py': 'print(2)\n'}) == ['app.py']
+    assert (tmp_path / 'app.py').read_text() == 'print(2)\n'
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-')]
+
+    # A file edited or deleted on disk is restored; the manifest survives a restart
+    (tmp_path / 'index.html').write_text('edited by hand')
+    project_files._manifests.clear()
+    assert project_files.materialize(str(tmp_path), {**files, 'app.py': 'print(2)\n'}) == ['index.html']
+    (tmp_path / 'index.html').unlink()
+    assert project_files.materialize(str(tmp_path), {**files, 'app.py': 'print(2)\n'}) == ['index.html']
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import project_logs
+
+CHATTY = 'import sys\nfor i in range(20000):\n    print("request %05d" % i, file=sys.stderr if i % 2 else sys.stdout)\n'
+
+
+def test_chatty_output_is_drained_rotated_and_bounded(tmp_path):
+    process = subprocess.Popen([sys.executable, '-c', CHATTY], stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True, bufsize=1)
+    capture = project_logs.LogCapture(process.stdout, project_logs.log_path(str(tmp_path)),
+                                      max_bytes=64 * 1024, buffer_bytes=4096)
+    # 280 KB of output is far more than a pipe holds; the child must still finish
+    assert process.wait(timeout=20) == 0
+    assert capture.closed.wait(10)
+
+    text = capture.text()
+    assert len(text) <= 4096 and text.endswith('request 19999\n')
+    assert os.path.getsize(capture.path) <= 64 * 1024
+    assert os.path.exists(capture.path + '.1') and os.path.exists(capture.path + '.2')
+    assert not os.path.exists(capture.path + '.3')
+
+    # Without a live capture the tail comes from the log file, starting at a line boundary
+    tail = project_logs.tail(-1, str(tmp_path), max_bytes=100)
+    assert tail.startswith('request ') and tail.endswith('request 19999\n')
+    assert project_logs.tail(-1, str(tmp_path / 'missing')) == ''
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import time
+
+import readiness
+
+SERVER = '''
+import socket, sys, time
+time.sleep(0.2)
+s = socket.socket()
+s.bind(("127.0.0.1", 0))
+s.listen()
+print(" * Running on http://127.0.0.1:%d" % s.getsockname()[1], file=sys.stderr, flush=True)
+while True:
+    s.accept()[0].close()
+'''
+
+
+def _launch(code):
+    return subprocess.Popen([sys.executable, '-c', code], stderr=subprocess.PIPE, text=True, bufsize=1)
+
+
+def test_ready_as_soon_as_the_port_serves():
+    process = _launch(SERVER)
+    try:
+        watcher = readiness.OutputWatcher(process.stderr)
+        assert watcher.ready.wait(10)
+        port = int(watcher.text().rsplit(':', 1)[1])
+        started = time.monotonic()
+        assert readiness.wait_until_ready(port, process, watcher, timeout=5) == (True, None)
+        assert time.monotonic() - started < 1
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_crashed_and_silent_launches_fail_fast():
+    crashed = _launch('import sys; sys.exit("boom")')
+    watcher = readiness.OutputWatcher(crashed.stderr)
+    ready, error = readiness.wait_until_ready(1, crashed, watcher, timeout=10)
+    assert not ready and error == 'exited with code 1'
+    watcher.closed.wait(1)
+    assert 'boom' in watcher.text()
+
+    started = time.monotonic()
+    results = readiness.wait_for_launches([(1, None, None), (2, None, None)], timeout=0.3)
+    assert results == {1: (False, 'not serving after 0.3s'), 2: (False, 'not serving after 0.3s')}
+    assert time.monotonic() - started < 2
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip('werkzeug')
+
+import migrations
+import repository
+
+
+@pytest.fixture
+def schema(database):
+    migrations.ensure_schema()
+    return database
+
+
+def test_list_projects_filters_sorts_and_pages_in_sql(schema):
+    repository.save_project('Beta', 'todo list', 'p', 'b' * 1000, 'f', owner_id=1)
+    repository.save_project('alpha', 'weather', 'p', 'b', 'f', owner_id=1)
+    repository.save_project('Gamma', 'other user', 'p', 'b', 'f', owner_id=2)
+    running = repository.save_project('Delta', '100% legacy', 'p', 'b', 'f')
+    repository.record_run(running, 4242, 5001)
+
+    rows = repository.list_projects(owner_id=1, sort='name')
+    assert [r[1] for r in rows] == ['alpha', 'Beta', 'Delta']
+    assert len(rows[0]) == len(repository.PROJECT_SUMMARY_COLUMNS.split(','))
+
+    assert [r[1] for r in repository.list_projects(owner_id=1, status='running')] == ['Delta']
+    assert [r[1] for r in repository.list_projects(owner_id=1, search='100%')] == ['Delta']
+    assert repository.count_projects(owner_id=1, status='stopped') == 2
+    assert [r[1] for r in repository.list_projects(sort='oldest', limit=2, offset=1)] == ['alpha', 'Gamma']
+
+
+def test_full_text_search_tracks_inserts_updates_and_deletes(schema):
+    todo = repository.save_project('Todo app', 'tasks', 'p', "@app.route('/todos')", '<h1>Todos</h1>')
+    weather = repository.save_project('Weather', 'forecast dashboard', 'p', 'import requests', '<div>todo widget</div>')
+
+    results = repository.search_projects('todo')
+    assert [r[0] for r in results] == [todo, weather]  # name match outranks a frontend match
+    assert '**' in results[0][-1]
+
+    repository.update_project(weather, 'import requests', '<div>radar</div>')
+    assert [r[0] for r in repository.search_projects('todo')] == [todo]
+    assert [r[0] for r in repository.search_projects('rad')] == [weather]
+
+    repository.delete_project(todo)
+    assert repository.search_projects('todo') == []
+    assert repository.count_projects(search='forecast') == 1
+
+
+def test_stats_are_cached_and_invalidated_by_writes(schema):
+    import stats
+    assert stats.get_stats()['projects'] == 0
+
+    project_id = repository.save_project('p', 'd', 'p', 'b', 'f')
+    assert stats.get_stats()['projects'] == 1
+    assert stats.get_stats()['created_this_week'] == 1
+
+    repository.record_run(project_id, 999, 5005)
+    assert stats.get_stats()['running'] == 1
+    assert stats.get_stats()['project_runs'] == 1
+
+    # Writes that bypass the repository are only picked up after the TTL
+    repository.db.execute("DELETE FROM project_runs")
+    assert stats.get_stats()['project_runs'] == 1
+    assert stats.compute_stats()['project_runs'] == 0
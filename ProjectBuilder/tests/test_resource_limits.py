@@ -0,0 +1,49 @@
+import signal
+import subprocess
+import sys
+
+import pytest
+
+import migrations
+import repository
+import resource_limits
+
+pytestmark = pytest.mark.skipif(resource_limits.resource is None, reason='needs the resource module')
+
+REPORT = 'import os, resource; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0], os.nice(0))'
+
+
+def test_exec_shim_applies_limits_in_the_child():
+    limits = resource_limits.Limits(memory_mb=2048, max_open_files=64, nice=5)
+    argv = resource_limits.wrap([sys.executable, '-c', REPORT], limits)
+    assert argv[:2] == [sys.executable, resource_limits.SHIM]
+    output = subprocess.run(argv, capture_output=True, text=True).stdout.split()
+    base_nice = subprocess.run([sys.executable, '-c', REPORT], capture_output=True, text=True).stdout.split()[1]
+    assert output == ['64', str(min(19, int(base_nice) + 5))]
+
+
+def test_cpu_limit_is_reported_as_a_limit_event():
+    limits = resource_limits.Limits(cpu_seconds=1)
+    process = subprocess.run(resource_limits.wrap([sys.executable, '-c', 'while True: pass'], limits), timeout=30)
+    assert process.returncode == -signal.SIGXCPU
+    assert resource_limits.limit_event(process.returncode) == resource_limits.LIMIT_CPU
+    assert resource_limits.limit_event(1, 'OSError: [Errno 24] Too many open files') == resource_limits.LIMIT_FILES
+    assert resource_limits.limit_event(1, 'Traceback ...\nMemoryError') == resource_limits.LIMIT_MEMORY
+    assert resource_limits.limit_event(-signal.SIGTERM, '') is None
+
+
+def test_limits_are_stored_per_project(database):
+    migrations.ensure_schema()
+    project_id = repository.save_project('app', '', 'p', 'b', 'f')
+    limits = resource_limits.Limits.from_row(repository.get_resource_limits(project_id))
+    assert limits.memory_mb == resource_limits.DEFAULT_MEMORY_MB
+    # Without any limits the app is launched unwrapped
+    assert resource_limits.wrap(['app'], resource_limits.Limits()) == ['app']
+
+    repository.update_resource_limits(project_id, 256, 0, 128, 5, 50)
+    limits = resource_limits.Limits.from_row(repository.get_resource_limits(project_id))
+    assert (limits.memory_mb, limits.cpu_seconds, limits.max_open_files, limits.nice) == (256, 0, 128, 5)
+
+    repository.record_run(project_id, 4242, 5001)
+    repository.record_stop(project_id, 4242, status='crashed', limit_event=resource_limits.LIMIT_MEMORY)
+    assert repository.get_last_limit_event(project_id) == 'memory'
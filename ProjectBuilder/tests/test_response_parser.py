@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.parser_corpus import CASES, matches
+from response_parser import IncrementalParser, parse_response
+
+
+@pytest.mark.parametrize('name, text, expected, truncated', CASES, ids=[case[0] for case in CASES])
+def test_corpus_parses(name, text, expected, truncated):
+    result, was_truncated = parse_response(text)
+    assert matches(result, expected, truncated)
+    assert was_truncated == truncated
+
+
+@pytest.mark.parametrize('name, text, expected, truncated', CASES, ids=[case[0] for case in CASES])
+def test_corpus_parses_when_streamed(name, text, expected, truncated):
+    parser = IncrementalParser()
+    for i in range(0, len(text), 97):
+        parser.feed(text[i:i + 97])
+    assert matches(parser.close(), expected, truncated)
+
+
+def test_escapes_are_decoded_exactly():
+    text = r'{"code": "print(\"a\\nb\")\n\ttab \u00e9 \ud83d\ude80 \ud83d x \/"}'
+    for size in (1, 3, len(text)):
+        parser = IncrementalParser()
+        for i in range(0, len(text), size):
+            parser.feed(text[i:i + size])
+        assert parser.close() == {'code': 'print("a\\nb")\n\ttab é 🚀 \ufffd x /'}
+
+
+def test_truncation_inside_escape_keeps_decoded_prefix():
+    result, truncated = parse_response('{"name": "x", "code": "line1\\nline2\\')
+    assert truncated
+    assert result == {'name': 'x', 'code': 'line1\nline2'}
+
+
+def test_no_object_returns_none():
+    assert parse_response('Sorry, I cannot help with that.') == (None, False)
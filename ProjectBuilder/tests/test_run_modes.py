@@ -0,0 +1,46 @@
+import subprocess
+
+import pytest
+
+import readiness
+import run_modes
+
+WSGI_APP = '''
+def app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'ok']
+'''
+
+
+def test_command_for_each_mode(monkeypatch):
+    argv, env = run_modes.command(5123, 'debug')
+    assert argv[1:] == ['app.py'] and env['PORT'] == '5123'
+
+    argv, env = run_modes.command(5123, 'wsgi', workers=1, threads=8)
+    assert argv[1:] == [run_modes.SERVE_SCRIPT_NAME] and env['WSGI_THREADS'] == '8'
+
+    monkeypatch.setattr(run_modes, '_installed', lambda module: True)
+    monkeypatch.setattr(run_modes.sys, 'platform', 'linux')
+    argv, _ = run_modes.command(5123, 'wsgi', workers=3, threads=2)
+    assert argv[1:3] == ['-m', 'gunicorn'] and '3' in argv and '127.0.0.1:5123' in argv
+    assert run_modes.describe('wsgi', 3, 2) == ("gunicorn, 3 workers × 2 threads", None)
+
+    monkeypatch.setattr(run_modes, '_installed', lambda module: False)
+    server, warning = run_modes.describe('wsgi', 3, 2)
+    assert server == "werkzeug threaded server"
+    assert 'gunicorn' in warning and 'waitress' in warning
+
+
+def test_serve_script_serves_the_app_without_reloader(tmp_path):
+    if not (run_modes._installed('waitress') or run_modes._installed('werkzeug')):
+        pytest.skip('needs waitress or werkzeug')
+    (tmp_path / 'app.py').write_text(WSGI_APP)
+    (tmp_path / run_modes.SERVE_SCRIPT_NAME).write_text(run_modes.SERVE_SCRIPT)
+    argv, env = run_modes.command(47401, 'wsgi', workers=1)
+    process = subprocess.Popen(argv, cwd=tmp_path, env={**env, 'PATH': ''}, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True)
+    try:
+        assert readiness.wait_until_ready(47401, process, timeout=10, health_path='/') == (True, None)
+    finally:
+        process.kill()
+        process.wait()
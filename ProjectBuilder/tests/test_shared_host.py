@@ -0,0 +1,116 @@
+import os
+import sys
+import urllib.error
+import urllib.request
+
+import pytest
+
+import db
+import launcher
+import migrations
+import repository
+import shared_host
+
+APP = '''
+LOADS = globals().setdefault('LOADS', 0) + 1
+
+def app(environ, start_response):
+    body = ('%s %s' % (environ['SCRIPT_NAME'], environ['PATH_INFO'])).encode()
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [body]
+'''
+
+
+@pytest.fixture
+def host():
+    host = shared_host.SharedHost(idle_timeout=60)
+    host.start(port=0)
+    yield host
+    host.shutdown()
+
+
+def _get(host, path):
+    with urllib.request.urlopen(f'http://127.0.0.1:{host.port}{path}', timeout=5) as response:
+        return response.read().decode()
+
+
+def _project(tmp_path, project_id):
+    project_dir = tmp_path / f'project_{project_id}'
+    project_dir.mkdir()
+    (project_dir / 'app.py').write_text(APP)
+    (project_dir / 'index.html').write_text(f'<h1>project {project_id}</h1>')
+    return str(project_dir)
+
+
+def test_apps_are_mounted_lazily_under_their_prefix(host, tmp_path):
+    host.register(1, _project(tmp_path, 1))
+    host.register(2, _project(tmp_path, 2))
+
+    assert _get(host, '/p/1/') == '<h1>project 1</h1>'
+    assert host.loaded() == []          # index.html is static; the app isn't imported yet
+    assert _get(host, '/p/2/api/todos?x=1') == '/p/2 /api/todos'
+    assert _get(host, '/p/1') == '<h1>project 1</h1>'   # redirected to /p/1/
+    assert host.loaded() == [2]
+    assert sys.modules[shared_host.module_name(2)].LOADS == 1
+
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _get(host, '/p/3/')
+    assert exc.value.code == 404
+
+    assert host.unregister(2) and host.loaded() == []
+    assert shared_host.module_name(2) not in sys.modules
+    with pytest.raises(urllib.error.HTTPError):
+        _get(host, '/p/2/api/todos')
+
+
+def test_idle_apps_are_unloaded_and_broken_apps_report_errors(host, tmp_path):
+    host.register(1, _project(tmp_path, 1))
+    _get(host, '/p/1/api')
+    assert host.unload_idle(now=float('inf')) == [1] and host.loaded() == []
+    assert _get(host, '/p/1/api') == '/p/1 /api'
+
+    broken = _project(tmp_path, 4)
+    with open(broken + '/app.py', 'w') as f:
+        f.write('raise RuntimeError("bad code")')
+    host.register(4, broken)
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _get(host, '/p/4/api')
+    assert exc.value.code == 500 and b'bad code' in exc.value.read()
+
+
+def test_shared_run_goes_through_the_launcher(database, host, tmp_path, monkeypatch):
+    migrations.ensure_schema()
+    monkeypatch.setattr(shared_host, '_host', host)
+    monkeypatch.setattr(launcher, 'project_dir', lambda project_id: str(tmp_path / f'project_{project_id}'))
+    project_id = repository.save_project('shared', '', 'p', APP, '<h1>shared</h1>')
+    repository.update_run_settings(project_id, 'shared', 1, 1)
+
+    assert launcher.start(project_id) == (host.port, None)
+    assert repository.get_project(project_id)[8] == 'running'
+    assert db.query_one('SELECT pid FROM project_runs WHERE project_id = ?', (project_id,))[0] == os.getpid()
+    assert _get(host, f'/p/{project_id}/api') == f'/p/{project_id} /api'
+
+    assert launcher.stop(project_id) is True
+    assert repository.get_project(project_id)[8] == 'stopped'
+
+    # Shared apps run in this process, so projects with limits are refused
+    repository.update_resource_limits(project_id, 256, 0, 0, 0, 0)
+    port, error = launcher.start(project_id)
+    assert port is None and 'resource limits' in error
+    assert not host.is_registered(project_id)
+
+
+def test_stopping_one_shared_project_leaves_the_others_running(database, host, tmp_path, monkeypatch):
+    migrations.ensure_schema()
+    monkeypatch.setattr(shared_host, '_host', host)
+    monkeypatch.setattr(launcher, 'project_dir', lambda project_id: str(tmp_path / f'project_{project_id}'))
+    first = repository.save_project('a', '', 'p', APP, '<h1>a</h1>')
+    second = repository.save_project('b', '', 'p', APP, '<h1>b</h1>')
+    for project_id in (first, second):
+        repository.update_run_settings(project_id, 'shared', 1, 1)
+    launcher.start_many([first, second])
+
+    assert launcher.stop(first) is True
+    runs = dict(db.query_all('SELECT project_id, status FROM project_runs'))
+    assert runs == {first: 'stopped', second: 'running'}
+    assert repository.get_project(second)[8] == 'running' and host.is_registered(second)
@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('werkzeug')
+
+import db
+import migrations
+import ports
+import repository
+import supervisor
+
+SERVER = '''
+import http.server, sys
+server = http.server.HTTPServer(("127.0.0.1", int(sys.argv[1])), http.server.SimpleHTTPRequestHandler)
+print(" * Running on http://127.0.0.1:%s" % sys.argv[1], file=sys.stderr, flush=True)
+server.serve_forever()
+'''
+
+
+@pytest.fixture
+def schema(database, monkeypatch):
+    migrations.ensure_schema()
+    monkeypatch.setattr(ports, '_allocator', ports.PortAllocator(47300, 47309))
+    monkeypatch.setattr(supervisor, 'RESTART_BACKOFF_BASE', 0.01)
+    return database
+
+
+def _spawner(port):
+    return lambda: subprocess.Popen([sys.executable, '-c', SERVER, str(port)], stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True, bufsize=1)
+
+
+def _status(project_id):
+    return db.query_one('SELECT status FROM projects WHERE id = ?', (project_id,))[0]
+
+
+def test_crashed_app_is_restarted_and_stop_releases_port(schema, tmp_path):
+    project_id = repository.save_project('app', '', 'p', 'b', 'f')
+    port = ports.get_allocator().allocate(project_id)
+    sup = supervisor.Supervisor(interval=3600)
+    pid, error = sup.start(project_id, port, str(tmp_path), _spawner(port))
+    assert error is None and _status(project_id) == 'running'
+
+    os.kill(pid, 9)
+    sup._procs[project_id].process.wait()
+    sup.check()          # notices the crash and schedules a restart
+    assert _status(project_id) == 'stopped'
+    time.sleep(0.05)
+    sup.check()          # restarts on the same port
+    new_pid = repository.get_running_pids([project_id]).get(project_id)
+    assert new_pid not in (None, pid) and _status(project_id) == 'running'
+    assert db.query_one('SELECT status FROM project_runs WHERE pid = ?', (pid,))[0] == 'crashed'
+
+    assert sup.stop(project_id)
+    assert _status(project_id) == 'stopped' and sup.running() == {}
+    assert ports.get_allocator().free_count() == 10
+    sup.shutdown()
+
+
+def test_reconcile_marks_dead_runs_crashed(schema):
+    alive = repository.save_project('alive', '', 'p', 'b', 'f')
+    dead = repository.save_project('dead', '', 'p', 'b', 'f')
+    repository.record_run(alive, os.getpid(), 47301)
+    repository.record_run(dead, 2 ** 22 + 1, 47302)
+
+    assert supervisor.reconcile() == [(dead, 2 ** 22 + 1)]
+    assert _status(alive) == 'running' and _status(dead) == 'stopped'
+    assert db.query_one("SELECT COUNT(*) FROM project_runs WHERE status = 'crashed'")[0] == 1
+
+
+def test_start_many_and_stop_many_share_one_pass(schema, tmp_path):
+    project_ids = [repository.save_project(f'app{i}', '', 'p', 'b', 'f') for i in range(3)]
+    allocator = ports.get_allocator()
+    launches = []
+    for project_id in project_ids:
+        port = allocator.allocate(project_id)
+        spawn = _spawner(port) if project_id != project_ids[-1] else \
+            (lambda: subprocess.Popen([sys.executable, '-c', 'raise SystemExit(3)'], stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT, text=True))
+        launches.append((project_id, port, str(tmp_path), spawn))
+    sup = supervisor.Supervisor(interval=3600)
+    results = sup.start_many(launches)
+
+    assert [results[pid][1] is None for pid in project_ids] == [True, True, False]
+    assert 'exited with code 3' in results[project_ids[-1]][1]
+    assert [_status(pid) for pid in project_ids[:2]] == ['running', 'running']
+
+    assert sup.stop_many(project_ids) == {project_ids[0]: True, project_ids[1]: True, project_ids[2]: False}
+    assert sup.running() == {} and [_status(pid) for pid in project_ids[:2]] == ['stopped', 'stopped']
+    assert db.query_one("SELECT COUNT(*) FROM project_runs WHERE status = 'running'")[0] == 0
+    sup.shutdown()
+
+
+def test_kill_pids_escalates_to_sigkill(monkeypatch):
+    stubborn = subprocess.Popen([sys.executable, '-c',
+                                 'import signal, sys, time\n'
+                                 'signal.signal(signal.SIGTERM, signal.SIG_IGN)\n'
+                                 'print("ready", flush=True)\n'
+                                 'time.sleep(60)'], stdout=subprocess.PIPE, text=True)
+    assert stubborn.stdout.readline().strip() == 'ready'
+    # Reap the child as soon as it dies so pid_alive() sees it gone
+    monkeypatch.setattr(ports, 'pid_alive', lambda pid: stubborn.poll() is None)
+
+    started = time.monotonic()
+    supervisor.kill_pids([stubborn.pid], timeout=0.3)
+    assert stubborn.wait(5) == -9
+    assert time.monotonic() - started >= 0.3
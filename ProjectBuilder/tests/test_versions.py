@@ -0,0 +1,53 @@
+import db
+import migrations
+import repository
+import versions
+
+
+def _code(n):
+    return ''.join(f'line {i}\n' for i in range(200)) + f'edit {n}\n'
+
+
+def test_delta_round_trip():
+    old = 'a\nb\nc\n'
+    for new in ('a\nc\nd\n', '', 'a\nb\nc', 'x\n' + old):
+        assert versions.apply_delta(old, versions.make_delta(old, new)) == new
+
+
+def test_saves_are_deltas_with_periodic_snapshots(database):
+    migrations.ensure_schema()
+    project_id = repository.save_project('p', '', 'p', _code(0), '<h1>0</h1>')
+    for n in range(1, 25):
+        repository.update_project(project_id, _code(n), f'<h1>{n}</h1>')
+    repository.update_project(project_id, _code(24), '<h1>24</h1>')   # unchanged, not recorded
+
+    rows = db.query_all('SELECT version, backend_depth FROM project_versions WHERE project_id = ? ORDER BY version',
+                        (project_id,))
+    assert [version for version, _ in rows] == list(range(1, 26))
+    assert max(depth for _, depth in rows) == versions.SNAPSHOT_EVERY - 1
+    assert [version for version, depth in rows if depth == 0] == [1, 11, 21]
+    assert versions.get_version(project_id, 7) == (_code(6), '<h1>6</h1>')
+    assert '+edit 9' in versions.diff(project_id, 7, 10)
+
+    assert repository.restore_project_version(project_id, 3) == (26, None)
+    assert repository.get_project(project_id)[4:6] == (_code(2), '<h1>2</h1>')
+    assert versions.list_versions(project_id)[0][:3:2] == (26, 'restore v3')
+    # Restoring identical code records nothing
+    assert repository.restore_project_version(project_id, 3) == (None, None)
+    assert repository.restore_project_version(project_id, 99)[0] is None
+
+
+def test_prune_keeps_remaining_versions_readable(database, monkeypatch):
+    migrations.ensure_schema()
+    monkeypatch.setattr(versions, 'KEEP_VERSIONS', 5)
+    project_id = repository.save_project('p', '', 'p', _code(0), '')
+    for n in range(1, 13):
+        repository.update_project(project_id, _code(n), '')
+
+    listed = [row[0] for row in versions.list_versions(project_id)]
+    assert listed == [13, 12, 11, 10, 9]
+    assert versions.get_version(project_id, 8) is None
+    assert versions.get_version(project_id, 9) == (_code(8), '')
+
+    repository.delete_project(project_id)
+    assert db.query_one('SELECT COUNT(*) FROM blobs')[0] == 0
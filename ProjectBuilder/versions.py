@@ -0,0 +1,184 @@
+# versions.py - Saved versions of a project's code, stored as line deltas
+import difflib
+import json
+import os
+
+import blobs
+import db
+
+# Versions of a field are stored as deltas against the previous version; every
+# SNAPSHOT_EVERY-th one is a full snapshot, so rebuilding any version applies
+# at most SNAPSHOT_EVERY - 1 deltas
+SNAPSHOT_EVERY = 10
+# Versions kept per project (older ones are pruned when a new one is saved; 0 keeps all)
+KEEP_VERSIONS = int(os.environ.get('PROJECT_VERSIONS_KEEP', '50'))
+# A delta bigger than this share of the full text is stored as a snapshot instead
+MAX_DELTA_RATIO = 0.5
+
+FIELDS = ('backend', 'frontend')
+
+VERSION_COLUMNS = 'version, backend_ref, backend_depth, frontend_ref, frontend_depth'
+
+
+# Delta turning old into new: a JSON list of ["=", start, end] (copy those
+# lines of old) and ["+", [lines]] (insert lines)
+def make_delta(old, new):
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(['=', i1, i2])
+        elif j2 > j1:
+            ops.append(['+', new_lines[j1:j2]])
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    old_lines = old.splitlines(keepends=True)
+    out = []
+    for op in json.loads(delta):
+        if op[0] == '=':
+            out.extend(old_lines[op[1]:op[2]])
+        else:
+            out.extend(op[1])
+    return ''.join(out)
+
+
+def _rows_back_to_snapshots(conn, project_id, version):
+    # Newest first, down to the snapshot every field of `version` is built from
+    return conn.execute(f'''
+        SELECT {VERSION_COLUMNS} FROM project_versions
+        WHERE project_id = ? AND version <= ?
+        ORDER BY version DESC LIMIT ?
+    ''', (project_id, version, SNAPSHOT_EVERY)).fetchall()
+
+
+def _field_text(conn, rows, field_index):
+    # rows are newest first; walk back to a snapshot, then replay deltas forward
+    chain = []
+    for row in rows:
+        ref, depth = row[field_index], row[field_index + 1]
+        chain.append(ref)
+        if not depth:
+            break
+    else:
+        raise LookupError("version chain is missing its snapshot")
+    base = chain.pop()
+    text = blobs.get(conn, base) if base else None
+    for ref in reversed(chain):
+        text = apply_delta(text or '', blobs.get(conn, ref))
+    return text
+
+
+def _texts(conn, project_id, version):
+    rows = _rows_back_to_snapshots(conn, project_id, version)
+    if not rows or rows[0][0] != version:
+        return None
+    return _field_text(conn, rows, 1), _field_text(conn, rows, 3)
+
+
+def latest_version(conn, project_id):
+    row = conn.execute('SELECT MAX(version) FROM project_versions WHERE project_id = ?', (project_id,)).fetchone()
+    return row[0] or 0
+
+
+def _field_entry(conn, text, previous_text, previous_depth):
+    # (ref, depth): a delta against the previous version's text, or a snapshot
+    if text is None:
+        return None, 0
+    if previous_text is not None and previous_depth + 1 < SNAPSHOT_EVERY:
+        delta = make_delta(previous_text, text)
+        if len(delta) <= len(text) * MAX_DELTA_RATIO:
+            return blobs.put(conn, delta), previous_depth + 1
+    # Snapshots share the blob of the project's own code, so they cost nothing extra
+    return blobs.put(conn, text), 0
+
+
+# Record backend/frontend as the project's next version (inside the caller's
+# transaction). Nothing is recorded if the code is unchanged. Returns the
+# version number, or None.
+def record(conn, project_id, backend, frontend, source='edit'):
+    latest = latest_version(conn, project_id)
+    previous = (None, None)
+    depths = (0, 0)
+    if latest:
+        rows = _rows_back_to_snapshots(conn, project_id, latest)
+        previous = (_field_text(conn, rows, 1), _field_text(conn, rows, 3))
+        depths = (rows[0][2], rows[0][4])
+        if previous == (backend, frontend):
+            return None
+    backend_ref, backend_depth = _field_entry(conn, backend, previous[0], depths[0])
+    frontend_ref, frontend_depth = _field_entry(conn, frontend, previous[1], depths[1])
+    version = latest + 1
+    conn.execute('''
+        INSERT INTO project_versions (project_id, version, source, backend_ref, backend_depth, backend_size,
+                                      frontend_ref, frontend_depth, frontend_size)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (project_id, version, source, backend_ref, backend_depth, len(backend or ''),
+          frontend_ref, frontend_depth, len(frontend or '')))
+    prune(conn, project_id)
+    return version
+
+
+# Drop versions beyond the newest KEEP_VERSIONS. The oldest kept version is
+# first turned into a snapshot, since its deltas may point at dropped ones.
+def prune(conn, project_id, keep=None):
+    keep = KEEP_VERSIONS if keep is None else keep
+    if not keep:
+        return 0
+    cutoff = latest_version(conn, project_id) - keep + 1
+    if cutoff <= 1 or not conn.execute(
+        'SELECT 1 FROM project_versions WHERE project_id = ? AND version < ? LIMIT 1', (project_id, cutoff)
+    ).fetchone():
+        return 0
+    texts = _texts(conn, project_id, cutoff)
+    replaced = conn.execute('''
+        SELECT backend_ref, frontend_ref FROM project_versions WHERE project_id = ? AND version = ?
+    ''', (project_id, cutoff)).fetchall()
+    if texts is not None:
+        conn.execute('''
+            UPDATE project_versions
+            SET backend_ref = ?, backend_depth = 0, frontend_ref = ?, frontend_depth = 0
+            WHERE project_id = ? AND version = ?
+        ''', (blobs.put(conn, texts[0]), blobs.put(conn, texts[1]), project_id, cutoff))
+    refs = conn.execute('''
+        SELECT backend_ref, frontend_ref FROM project_versions WHERE project_id = ? AND version < ?
+    ''', (project_id, cutoff)).fetchall()
+    conn.execute('DELETE FROM project_versions WHERE project_id = ? AND version < ?', (project_id, cutoff))
+    blobs.release(conn, [ref for row in refs + replaced for ref in row])
+    return len(refs)
+
+
+# Blob hashes used by a project's versions (for cleanup when it is deleted)
+def blob_refs(conn, project_id):
+    return [ref for row in conn.execute(
+        'SELECT backend_ref, frontend_ref FROM project_versions WHERE project_id = ?', (project_id,)
+    ) for ref in row]
+
+
+# [(version, created_at, source, backend_size, frontend_size)], newest first
+def list_versions(project_id):
+    return db.query_all('''
+        SELECT version, created_at, source, backend_size, frontend_size FROM project_versions
+        WHERE project_id = ? ORDER BY version DESC
+    ''', (project_id,))
+
+
+# (backend, frontend) of a version, or None if it doesn't exist (or was pruned)
+def get_version(project_id, version):
+    return _texts(db.connection(), project_id, version)
+
+
+# Unified diff of one field between two versions (version None = None text)
+def diff(project_id, from_version, to_version, field='backend'):
+    index = FIELDS.index(field)
+    old = get_version(project_id, from_version)
+    new = get_version(project_id, to_version)
+    old_text = (old[index] if old else None) or ''
+    new_text = (new[index] if new else None) or ''
+    return ''.join(difflib.unified_diff(
+        old_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+        fromfile=f'v{from_version}', tofile=f'v{to_version}',
+    ))